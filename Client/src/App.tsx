@@ -32,8 +32,15 @@ const AppContent: React.FC = () => {
   const [statisticsOpen, setStatisticsOpen] = useState(false);
 
   const { loadInitialData } = useInitialData();
-  const { submissions, refreshSubmissions, handleDeleteAllSubmissions } =
-    useSubmissions();
+  const {
+    submissions,
+    submissionsTotal,
+    hasMoreSubmissions,
+    loadingMore,
+    refreshSubmissions,
+    loadMoreSubmissions,
+    handleDeleteAllSubmissions,
+  } = useSubmissions();
 
   // Load initial data on component mount
   useEffect(() => {
@@ -50,8 +57,7 @@ const AppContent: React.FC = () => {
 
       if (result.success) {
         displayMessage(result.message, "success");
-        // Refresh submissions after successful submit
-        await refreshSubmissions(true); // Force refresh
+        // The new submission arrives through the live event stream
         return result;
       } else {
         displayMessage(result.message, "error");
@@ -120,8 +126,12 @@ const AppContent: React.FC = () => {
         <Grid item xs={12} md={6}>
           <SubmissionsList
             submissions={submissions}
+            total={submissionsTotal}
+            hasMore={hasMoreSubmissions}
+            onLoadMore={loadMoreSubmissions}
             onDeleteAll={handleDeleteAllSubmissions}
             loading={loading}
+            loadingMore={loadingMore}
           />
         </Grid>
       </Grid>
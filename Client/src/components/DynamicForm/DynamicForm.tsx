@@ -4,14 +4,16 @@
  * This component provides:
  * - Dynamic field rendering based on schema
  * - Form validation and submission
+ * - Conditional and computed fields, evaluated on the server as answers change
  * - Error handling and display
  */
 
-import React, { useState, useEffect } from "react";
-import { Button, Box, Typography, Paper, Grid } from "@mui/material";
+import React, { useState, useEffect, useRef } from "react";
+import { Button, Box, Typography, Paper, Grid, TextField } from "@mui/material";
 import { useFormik } from "formik";
 import * as yup from "yup";
-import { DynamicFormProps } from "@/types/typesExports";
+import { DynamicFormProps, FieldState } from "@/types/typesExports";
+import { validateFields } from "../../services/formService";
 import { createValidationSchema } from "./validation/validationExports";
 import { FieldRenderer } from "./fieldRenderer";
 
@@ -22,6 +24,16 @@ const DynamicForm: React.FC<DynamicFormProps> = ({
 }) => {
   const [validationSchema, setValidationSchema] = useState<any>(null);
   const [formErrors, setFormErrors] = useState<Record<string, string[]>>({});
+  const [fieldStates, setFieldStates] = useState<Record<string, FieldState>>(
+    {}
+  );
+  const previousValues = useRef<Record<string, any> | null>(null);
+
+  const hasDynamicFields = Boolean(
+    schema?.fields.some(
+      (field) => field.visibleWhen || field.requiredWhen || field.compute
+    )
+  );
 
   useEffect(() => {
     if (schema) {
@@ -30,6 +42,8 @@ const DynamicForm: React.FC<DynamicFormProps> = ({
 
       // Reset form errors when schema changes
       setFormErrors({});
+      setFieldStates({});
+      previousValues.current = null;
     }
     // eslint-disable-next-line
   }, [schema]);
@@ -46,6 +60,8 @@ const DynamicForm: React.FC<DynamicFormProps> = ({
         return ""; // To avoid uncontrolled state, keep empty string (formik will handle conversion)
       case "dropdown":
         return "";
+      case "multiselect":
+        return [];
       default:
         return "";
     }
@@ -76,6 +92,50 @@ const DynamicForm: React.FC<DynamicFormProps> = ({
     },
   });
 
+  // Re-evaluate the fields downstream of the changed answers; the server
+  // reads the other fields, computed values included, from the values sent
+  useEffect(() => {
+    if (!schema || !hasDynamicFields) return;
+    const values = formik.values;
+    const previous = previousValues.current;
+    const changed = schema.fields
+      .map((field) => field.name)
+      .filter(
+        (name) => !previous || !Object.is(previous[name], values[name])
+      );
+    previousValues.current = values;
+    if (changed.length === 0) return;
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const result = await validateFields(schema.title, values, changed);
+        if (cancelled || !result.fields) return;
+        const states = result.fields;
+        setFieldStates((current) => ({ ...current, ...states }));
+        schema.fields.forEach((field) => {
+          const state = states[field.name];
+          if (field.compute && state) {
+            const value = state.value ?? "";
+            // Known before the effect runs again, so it is not sent back as a change
+            previousValues.current = {
+              ...previousValues.current,
+              [field.name]: value,
+            };
+            formik.setFieldValue(field.name, value, false);
+          }
+        });
+      } catch (error) {
+        // Field states are kept as they were; submit validates the whole form
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+    // eslint-disable-next-line
+  }, [formik.values, schema, hasDynamicFields]);
+
   const handleReset = () => {
     formik.resetForm();
     setFormErrors({});
@@ -100,15 +160,34 @@ const DynamicForm: React.FC<DynamicFormProps> = ({
 
       <Box component="form" onSubmit={formik.handleSubmit} sx={{ mt: 2 }}>
         <Grid container spacing={3}>
-          {schema.fields.map((field) => (
-            <Grid item xs={12} sm={6} key={field.name}>
-              <FieldRenderer
-                field={field}
-                formik={formik}
-                formErrors={formErrors}
-              />
-            </Grid>
-          ))}
+          {schema.fields.map((field) => {
+            const state = fieldStates[field.name];
+            if (state && !state.visible) return null;
+            return (
+              <Grid item xs={12} sm={6} key={field.name}>
+                {field.compute ? (
+                  <TextField
+                    fullWidth
+                    id={field.name}
+                    label={field.label}
+                    value={formik.values[field.name] ?? ""}
+                    error={Boolean(formErrors[field.name])}
+                    helperText={formErrors[field.name]}
+                    InputProps={{ readOnly: true }}
+                  />
+                ) : (
+                  <FieldRenderer
+                    field={
+                      state ? { ...field, required: state.required } : field
+                    }
+                    formik={formik}
+                    formErrors={formErrors}
+                    formId={schema.title}
+                  />
+                )}
+              </Grid>
+            );
+          })}
         </Grid>
 
         <Box sx={{ mt: 3, display: "flex", gap: 2, justifyContent: "center" }}>
@@ -18,4 +18,5 @@ export interface FieldRendererProps {
   field: FormField;
   formik: any;
   formErrors: Record<string, string[]>;
+  formId?: string;
 }
@@ -31,6 +31,7 @@ export const FieldRenderer: React.FC<FieldRendererProps> = (props) => {
     case "number":
       return <NumberFieldRenderer {...props} />;
     case "dropdown":
+    case "multiselect":
       return <SelectFieldRenderer {...props} />;
     default:
       return null;
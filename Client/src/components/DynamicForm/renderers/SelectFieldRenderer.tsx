@@ -3,24 +3,141 @@
  *
  * This component handles:
  * - Single-select dropdown fields
+ * - Multi-select fields
  * - Dynamic option rendering
  * - Proper Material-UI FormControl integration
+ * - Large dropdowns whose options are searched on the server
  */
 
-import React from "react";
+import React, { useEffect, useState } from "react";
 import {
+  Autocomplete,
   FormControl,
   InputLabel,
   Select,
   MenuItem,
   FormHelperText,
+  TextField,
 } from "@mui/material";
 import { FieldRendererProps } from "../dynamicFormTypes";
+import { DropdownOption } from "@/types/typesExports";
+import { searchFieldOptions } from "../../../services/formService";
+
+const OPTION_SEARCH_DELAY_MS = 250;
+const OPTION_SEARCH_LIMIT = 50;
+
+/**
+ * Render a dropdown whose options are loaded from the server as the user types
+ */
+const LazySelectFieldRenderer: React.FC<FieldRendererProps> = ({
+  field,
+  formik,
+  formErrors,
+  formId,
+}) => {
+  const fieldError =
+    formErrors[field.name] || (formik.errors as any)[field.name];
+  const fieldTouched = (formik.touched as any)[field.name];
+
+  const [inputValue, setInputValue] = useState("");
+  const [options, setOptions] = useState<DropdownOption[]>([]);
+  const [selected, setSelected] = useState<DropdownOption[]>([]);
+  const [loading, setLoading] = useState(false);
+  const multiple = field.type === "multiselect";
+
+  // Clear the selection when the form is reset
+  useEffect(() => {
+    const value = formik.values[field.name];
+    if (!value || (Array.isArray(value) && value.length === 0)) {
+      setSelected([]);
+    }
+  }, [formik.values, field.name]);
+
+  // Debounced server-side search on the typed label prefix
+  useEffect(() => {
+    if (!formId) {
+      return;
+    }
+    let active = true;
+    setLoading(true);
+    const timeoutId = setTimeout(async () => {
+      try {
+        const result = await searchFieldOptions(
+          formId,
+          field.name,
+          inputValue,
+          OPTION_SEARCH_LIMIT
+        );
+        if (active) {
+          setOptions(result.options);
+        }
+      } catch {
+        if (active) {
+          setOptions([]);
+        }
+      } finally {
+        if (active) {
+          setLoading(false);
+        }
+      }
+    }, OPTION_SEARCH_DELAY_MS);
+
+    return () => {
+      active = false;
+      clearTimeout(timeoutId);
+    };
+  }, [formId, field.name, inputValue]);
+
+  return (
+    <Autocomplete<DropdownOption, boolean>
+      id={field.name}
+      multiple={multiple}
+      options={options}
+      value={multiple ? selected : selected[0] ?? null}
+      loading={loading}
+      filterOptions={(x) => x}
+      getOptionLabel={(option) => option.label}
+      isOptionEqualToValue={(option, value) => option.value === value.value}
+      onChange={(_, value) => {
+        const selection = Array.isArray(value) ? value : value ? [value] : [];
+        setSelected(selection);
+        formik.setFieldValue(
+          field.name,
+          multiple
+            ? selection.map((option) => option.value)
+            : selection[0]?.value ?? ""
+        );
+      }}
+      onInputChange={(_, value) => setInputValue(value)}
+      onBlur={() => formik.setFieldTouched(field.name, true)}
+      renderInput={(params) => (
+        <TextField
+          {...params}
+          name={field.name}
+          label={field.label}
+          required={field.required}
+          error={fieldTouched && Boolean(fieldError)}
+          helperText={fieldTouched && fieldError}
+        />
+      )}
+    />
+  );
+};
 
 /**
  * Render dropdown/select field with dynamic options
  */
-export const SelectFieldRenderer: React.FC<FieldRendererProps> = ({
+export const SelectFieldRenderer: React.FC<FieldRendererProps> = (props) => {
+  if (props.field.lazyOptions) {
+    return <LazySelectFieldRenderer {...props} />;
+  }
+  return <StaticSelectFieldRenderer {...props} />;
+};
+
+/**
+ * Render a dropdown whose options came with the schema
+ */
+const StaticSelectFieldRenderer: React.FC<FieldRendererProps> = ({
   field,
   formik,
   formErrors,
@@ -28,6 +145,7 @@ export const SelectFieldRenderer: React.FC<FieldRendererProps> = ({
   const fieldError =
     formErrors[field.name] || (formik.errors as any)[field.name];
   const fieldTouched = (formik.touched as any)[field.name];
+  const multiple = field.type === "multiselect";
 
   return (
     <FormControl
@@ -40,10 +158,23 @@ export const SelectFieldRenderer: React.FC<FieldRendererProps> = ({
         labelId={`${field.name}-label`}
         id={field.name}
         name={field.name}
-        value={formik.values[field.name] ?? ""}
+        multiple={multiple}
+        value={formik.values[field.name] ?? (multiple ? [] : "")}
         onChange={formik.handleChange}
         onBlur={formik.handleBlur}
         label={field.label}
+        renderValue={
+          multiple
+            ? (selected: any) =>
+                (selected as string[])
+                  .map(
+                    (value) =>
+                      field.options?.find((option) => option.value === value)
+                        ?.label ?? value
+                  )
+                  .join(", ")
+            : undefined
+        }
       >
         {field.options?.map((option) => (
           <MenuItem key={option.value} value={option.value}>
@@ -4,7 +4,7 @@
  * This module handles:
  * - Field-specific validation rules
  * - Required field validation
- * - Type-specific validation (text, email, password, date, number, dropdown)
+ * - Type-specific validation (text, email, password, date, number, dropdown, multiselect)
  */
 
 import * as yup from "yup";
@@ -124,13 +124,15 @@ export const createFieldValidation = (field: FormField): yup.AnySchema => {
       break;
 
     case "dropdown":
-      const validOptions = field.options?.map((opt) => opt.value) || [];
-      fieldValidation = yup
-        .string()
-        .oneOf(
+      fieldValidation = yup.string();
+      // Lazily loaded options are only known to the server, which checks them on submit
+      if (!field.lazyOptions) {
+        const validOptions = field.options?.map((opt) => opt.value) || [];
+        fieldValidation = fieldValidation.oneOf(
           validOptions,
           field.errorMessages?.invalidOption || "Invalid option"
         );
+      }
       if (field.required) {
         fieldValidation = fieldValidation.required(
           field.errorMessages?.required || `${field.label} is required`
@@ -138,6 +140,39 @@ export const createFieldValidation = (field: FormField): yup.AnySchema => {
       }
       break;
 
+    case "multiselect":
+      let selectedValues = yup.string();
+      // Lazily loaded options are only known to the server, which checks them on submit
+      if (!field.lazyOptions) {
+        const validOptions = field.options?.map((opt) => opt.value) || [];
+        selectedValues = selectedValues.oneOf(
+          validOptions,
+          field.errorMessages?.invalidOption || "Invalid option"
+        );
+      }
+      fieldValidation = yup.array().of(selectedValues);
+      if (field.required) {
+        fieldValidation = fieldValidation.min(
+          1,
+          field.errorMessages?.required || "Please select at least one option"
+        );
+      }
+      if (field.validation?.minSelections !== undefined) {
+        fieldValidation = fieldValidation.min(
+          field.validation.minSelections,
+          field.errorMessages?.minSelections ||
+            `Select at least ${field.validation.minSelections} options`
+        );
+      }
+      if (field.validation?.maxSelections !== undefined) {
+        fieldValidation = fieldValidation.max(
+          field.validation.maxSelections,
+          field.errorMessages?.maxSelections ||
+            `Select at most ${field.validation.maxSelections} options`
+        );
+      }
+      break;
+
     default:
       fieldValidation = yup.string();
   }
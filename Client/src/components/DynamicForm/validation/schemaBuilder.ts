@@ -6,6 +6,7 @@
  * - Combining individual field validations into a single schema
  */
 
+import * as yup from "yup";
 import { FormField } from "@/types/typesExports";
 import { ValidationSchema } from "../dynamicFormTypes";
 import { createFieldValidation } from "./fieldValidationBuilder";
@@ -21,7 +22,18 @@ export const createValidationSchema = (
   const validationObject: ValidationSchema = {};
 
   fields.forEach((field: FormField) => {
-    validationObject[field.name] = createFieldValidation(field);
+    if (field.compute) {
+      // Computed on the server
+      validationObject[field.name] = yup.mixed();
+    } else if (field.visibleWhen || field.requiredWhen) {
+      // Whether the field applies depends on other answers, which the server evaluates
+      validationObject[field.name] = createFieldValidation({
+        ...field,
+        required: false,
+      });
+    } else {
+      validationObject[field.name] = createFieldValidation(field);
+    }
   });
 
   return validationObject;
@@ -28,8 +28,37 @@ import {
   Assessment as AssessmentIcon,
   Description as DescriptionIcon,
 } from "@mui/icons-material";
-import { FormStatistics } from "../types/typesExports";
+import { FormStatistics, StatisticsDelta } from "../types/typesExports";
 import { getStatistics } from "../services/statisticsService";
+import { subscribeToEvents } from "../services/eventService";
+
+/**
+ * Add a live statistics delta to loaded statistics
+ */
+const applyStatisticsDelta = (
+  statistics: FormStatistics,
+  delta: StatisticsDelta
+): FormStatistics => {
+  const existing = statistics.forms.find(
+    (form) => form.title === delta.form_title
+  );
+  const forms = existing
+    ? statistics.forms.map((form) =>
+        form === existing
+          ? { ...form, count: form.count + delta.count, fields: delta.fields }
+          : form
+      )
+    : [
+        ...statistics.forms,
+        { title: delta.form_title, count: delta.count, fields: delta.fields },
+      ];
+
+  return {
+    total_submissions: statistics.total_submissions + delta.count,
+    total_forms: forms.length,
+    forms: forms.sort((a, b) => b.count - a.count),
+  };
+};
 
 interface StatisticsDialogProps {
   open: boolean;
@@ -63,6 +92,25 @@ const StatisticsDialog: React.FC<StatisticsDialogProps> = ({
     }
   }, [open]);
 
+  // Keep open statistics current from live events
+  useEffect(() => {
+    if (!open) {
+      return;
+    }
+    const unsubscribers = [
+      subscribeToEvents("statistics", (delta: StatisticsDelta) =>
+        setStatistics((current) =>
+          current ? applyStatisticsDelta(current, delta) : current
+        )
+      ),
+      subscribeToEvents("submissions_cleared", () =>
+        setStatistics({ total_submissions: 0, total_forms: 0, forms: [] })
+      ),
+      subscribeToEvents("resync", () => loadStatistics()),
+    ];
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [open]);
+
   const handleClose = () => {
     setStatistics(null);
     setError(null);
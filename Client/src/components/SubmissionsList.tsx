@@ -2,12 +2,22 @@
  * SubmissionsList Component - Displays submitted forms
  *
  * This component provides:
- * - List of submissions
+ * - List of submissions, loaded page by page as it scrolls
+ * - Windowed rendering: only the rows in view (plus a few) are mounted
+ * - Submission data fetched and decoded when a row is expanded
  * - Delete all submissions
  * - Loading state
  */
 
-import React, { memo } from "react";
+import React, {
+  memo,
+  useCallback,
+  useEffect,
+  useLayoutEffect,
+  useMemo,
+  useRef,
+  useState,
+} from "react";
 import {
   Paper,
   Typography,
@@ -23,126 +33,351 @@ import {
 } from "@mui/material";
 import ExpandMoreIcon from "@mui/icons-material/ExpandMore";
 import DeleteIcon from "@mui/icons-material/Delete";
-import { SubmissionsListProps } from "../types/typesExports";
+import {
+  FormSchema,
+  SubmissionsListProps,
+  SubmissionSummary,
+} from "../types/typesExports";
 import { useAppContext } from "../store/storeExports";
+import { getSubmission } from "../services/submissionService";
+
+const VIEWPORT_HEIGHT = 600;
+const ROW_HEIGHT = 72; // Estimate for rows not measured yet, gap included
+const ROW_GAP = 16;
+const OVERSCAN = 5; // Rows mounted above and below the viewport
+const LOAD_MORE_ROWS = 20; // The next page is requested this many rows before the end
+
+// Submission data, decoded once when its row is first expanded
+interface SubmissionDetails {
+  data: Record<string, any>;
+  fieldsMapping: any;
+}
+
+const formatDate = (dateString: string) => {
+  if (!dateString) return "---";
+  const date = new Date(dateString);
+  if (isNaN(date.getTime())) return "---";
+  return date.toLocaleString("en-US", {
+    year: "numeric",
+    month: "2-digit",
+    day: "2-digit",
+    hour: "2-digit",
+    minute: "2-digit",
+  });
+};
+
+const renderFieldValue = (
+  schema: FormSchema | null,
+  value: any,
+  fieldName?: string,
+  submissionMapping?: any
+) => {
+  if (value === null || value === undefined || value === "") {
+    return (
+      <span style={{ color: "#999", fontStyle: "italic" }}>Not entered</span>
+    );
+  }
+  if (typeof value === "boolean") {
+    return value ? "Yes" : "No";
+  }
+  if (typeof value === "object" && !Array.isArray(value)) {
+    return JSON.stringify(value);
+  }
+
+  // For dropdown fields, try to get the label from saved submission data first
+  if (fieldName && submissionMapping?.selected_options_labels?.[fieldName]) {
+    const savedLabel = submissionMapping.selected_options_labels[fieldName];
+    if (Array.isArray(savedLabel)) {
+      return savedLabel.join(", "); // Multiple selection
+    }
+    return savedLabel; // Single selection
+  }
+
+  // Fallback: Check current schema for dropdown field labels
+  if (fieldName && schema?.fields) {
+    const field = schema.fields.find((f: any) => f.name === fieldName);
+    if (
+      field &&
+      (field.type === "dropdown" || field.type === "multiselect") &&
+      field.options
+    ) {
+      if (Array.isArray(value)) {
+        // Multiple selection
+        const labels = value.map((v: any) => {
+          const option = field.options?.find((opt: any) => opt.value === v);
+          return option ? option.label : v;
+        });
+        return labels.join(", ");
+      } else {
+        // Single selection
+        const option = field.options?.find((opt: any) => opt.value === value);
+        if (option) {
+          return option.label;
+        }
+      }
+    }
+  }
+
+  if (Array.isArray(value)) {
+    return value.join(", ");
+  }
+  return String(value);
+};
+
+const getLabelForField = (
+  schema: FormSchema | null,
+  name: string,
+  submissionMapping?: any
+) => {
+  // Handle new format with nested structure
+  if (submissionMapping?.fields_mapping) {
+    if (submissionMapping.fields_mapping[name]) {
+      return submissionMapping.fields_mapping[name];
+    }
+  }
+  // Handle old format (direct object or array)
+  else if (submissionMapping) {
+    if (Array.isArray(submissionMapping)) {
+      const found = submissionMapping.find((f) => f.name === name);
+      if (found) return found.label;
+    } else if (
+      typeof submissionMapping === "object" &&
+      submissionMapping[name]
+    ) {
+      return submissionMapping[name];
+    }
+  }
+  return schema?.fields.find((f: any) => f.name === name)?.label || name;
+};
+
+const renderSubmissionData = (
+  schema: FormSchema | null,
+  details: SubmissionDetails
+) => (
+  <Grid container spacing={1}>
+    {Object.entries(details.data).map(([key, value]) => (
+      <Grid item xs={12} sm={6} key={key}>
+        <Box sx={{ display: "flex", alignItems: "center", mb: 1 }}>
+          <Typography
+            variant="subtitle2"
+            color="primary"
+            sx={{ minWidth: 100 }}
+          >
+            {getLabelForField(schema, key, details.fieldsMapping)}:
+          </Typography>
+          <Typography variant="body2" sx={{ ml: 1 }}>
+            {renderFieldValue(schema, value, key, details.fieldsMapping)}
+          </Typography>
+        </Box>
+      </Grid>
+    ))}
+  </Grid>
+);
+
+interface SubmissionRowProps {
+  submission: SubmissionSummary;
+  index: number;
+  top: number;
+  schema: FormSchema | null;
+  expanded: boolean;
+  details?: SubmissionDetails | null; // null when loading failed
+  onToggle: (id: string) => void;
+  onMeasure: (id: string, height: number) => void;
+}
+
+const SubmissionRow: React.FC<SubmissionRowProps> = ({
+  submission,
+  index,
+  top,
+  schema,
+  expanded,
+  details,
+  onToggle,
+  onMeasure,
+}) => {
+  const rowRef = useRef<HTMLDivElement>(null);
+
+  // Report the row's height whenever it changes (expanding, loading details)
+  useLayoutEffect(() => {
+    const element = rowRef.current;
+    if (!element) return;
+    onMeasure(submission.id, element.offsetHeight);
+    if (typeof ResizeObserver === "undefined") return;
+    const observer = new ResizeObserver(() =>
+      onMeasure(submission.id, element.offsetHeight)
+    );
+    observer.observe(element);
+    return () => observer.disconnect();
+  }, [submission.id, onMeasure]);
+
+  let content: React.ReactNode = (
+    <Box sx={{ textAlign: "center" }}>
+      <CircularProgress size={24} />
+    </Box>
+  );
+  if (details === null) {
+    content = (
+      <Typography variant="body2" color="error">
+        Error getting submitted form
+      </Typography>
+    );
+  } else if (details) {
+    content = renderSubmissionData(schema, details);
+  }
+
+  return (
+    <Box
+      ref={rowRef}
+      sx={{
+        position: "absolute",
+        top,
+        left: 0,
+        right: 0,
+        pb: `${ROW_GAP}px`,
+      }}
+    >
+      <Accordion
+        expanded={expanded}
+        onChange={() => onToggle(submission.id)}
+        TransitionProps={{ unmountOnExit: true }}
+      >
+        <AccordionSummary expandIcon={<ExpandMoreIcon />}>
+          <Box
+            sx={{
+              display: "flex",
+              alignItems: "center",
+              width: "100%",
+              justifyContent: "space-between",
+            }}
+          >
+            <Box>
+              <Chip
+                label={formatDate(submission.submitted_at)}
+                sx={{ mr: 1 }}
+              />
+              <Typography variant="subtitle1" component="span">
+                {submission.form_title || `Submission #${index + 1}`}
+              </Typography>
+            </Box>
+            <Typography variant="caption" color="textSecondary">
+              #{submission.id}
+            </Typography>
+          </Box>
+        </AccordionSummary>
+        <AccordionDetails>{expanded && content}</AccordionDetails>
+      </Accordion>
+    </Box>
+  );
+};
+
+const MemoizedSubmissionRow = memo(SubmissionRow);
 
 const SubmissionsList: React.FC<SubmissionsListProps> = ({
   submissions,
+  total,
+  hasMore,
+  onLoadMore,
   onDeleteAll,
   loading,
+  loadingMore,
 }) => {
   const { schema } = useAppContext();
 
-  const formatDate = (dateString: string) => {
-    if (!dateString) return "---";
-    const date = new Date(dateString);
-    if (isNaN(date.getTime())) return "---";
-    return date.toLocaleString("en-US", {
-      year: "numeric",
-      month: "2-digit",
-      day: "2-digit",
-      hour: "2-digit",
-      minute: "2-digit",
-    });
-  };
-
-  const renderFieldValue = (
-    value: any,
-    fieldName?: string,
-    submissionMapping?: any
-  ) => {
-    if (value === null || value === undefined || value === "") {
-      return (
-        <span style={{ color: "#999", fontStyle: "italic" }}>Not entered</span>
-      );
-    }
-    if (typeof value === "boolean") {
-      return value ? "Yes" : "No";
-    }
-    if (typeof value === "object") {
-      return JSON.stringify(value);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [expanded, setExpanded] = useState<Set<string>>(new Set());
+  const [details, setDetails] = useState<
+    Record<string, SubmissionDetails | null>
+  >({});
+  // Measured row heights; layoutVersion re-renders when one changes
+  const heights = useRef<Map<string, number>>(new Map());
+  const requested = useRef<Set<string>>(new Set());
+  const [layoutVersion, setLayoutVersion] = useState(0);
+
+  // A cleared list forgets its rows
+  useEffect(() => {
+    if (!submissions.length) {
+      heights.current.clear();
+      requested.current.clear();
+      setExpanded(new Set());
+      setDetails({});
     }
+  }, [submissions.length]);
 
-    // For dropdown fields, try to get the label from saved submission data first
-    if (fieldName && submissionMapping?.selected_options_labels?.[fieldName]) {
-      const savedLabel = submissionMapping.selected_options_labels[fieldName];
-      if (Array.isArray(savedLabel)) {
-        return savedLabel.join(", "); // Multiple selection
-      }
-      return savedLabel; // Single selection
+  const handleMeasure = useCallback((id: string, height: number) => {
+    if (height && heights.current.get(id) !== height) {
+      heights.current.set(id, height);
+      setLayoutVersion((version) => version + 1);
     }
+  }, []);
 
-    // Fallback: Check current schema for dropdown field labels
-    if (fieldName && schema?.fields) {
-      const field = schema.fields.find((f: any) => f.name === fieldName);
-      if (field && field.type === "dropdown" && field.options) {
-        if (Array.isArray(value)) {
-          // Multiple selection
-          const labels = value.map((v: any) => {
-            const option = field.options?.find((opt: any) => opt.value === v);
-            return option ? option.label : v;
-          });
-          return labels.join(", ");
-        } else {
-          // Single selection
-          const option = field.options?.find((opt: any) => opt.value === value);
-          if (option) {
-            return option.label;
-          }
-        }
+  const handleToggle = useCallback((id: string) => {
+    setExpanded((current) => {
+      const next = new Set(current);
+      if (!next.delete(id)) {
+        next.add(id);
       }
-    }
+      return next;
+    });
+    if (requested.current.has(id)) return;
+    requested.current.add(id);
+    getSubmission(id)
+      .then((submission) =>
+        setDetails((loaded) => ({
+          ...loaded,
+          [id]: {
+            data:
+              typeof submission.data === "string"
+                ? JSON.parse(submission.data)
+                : submission.data,
+            fieldsMapping: submission.fields_mapping,
+          },
+        }))
+      )
+      .catch(() => {
+        // Expanding the row again retries
+        requested.current.delete(id);
+        setDetails((loaded) => ({ ...loaded, [id]: null }));
+      });
+  }, []);
 
-    return String(value);
-  };
+  // Row offsets: offsets[i] is where row i starts, offsets[length] the total height
+  const offsets = useMemo(() => {
+    const result = new Array<number>(submissions.length + 1);
+    result[0] = 0;
+    submissions.forEach((submission, index) => {
+      result[index + 1] =
+        result[index] + (heights.current.get(submission.id) ?? ROW_HEIGHT);
+    });
+    return result;
+    // layoutVersion tracks changes to the measured heights
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [submissions, layoutVersion]);
 
-  const getLabelForField = (name: string, submissionMapping?: any) => {
-    // Handle new format with nested structure
-    if (submissionMapping?.fields_mapping) {
-      if (submissionMapping.fields_mapping[name]) {
-        return submissionMapping.fields_mapping[name];
-      }
+  // First row ending below the top of the viewport, by binary search
+  let low = 0;
+  let high = submissions.length;
+  while (low < high) {
+    const middle = (low + high) >> 1;
+    if (offsets[middle + 1] <= scrollTop) {
+      low = middle + 1;
+    } else {
+      high = middle;
     }
-    // Handle old format (direct object or array)
-    else if (submissionMapping) {
-      if (Array.isArray(submissionMapping)) {
-        const found = submissionMapping.find((f) => f.name === name);
-        if (found) return found.label;
-      } else if (
-        typeof submissionMapping === "object" &&
-        submissionMapping[name]
-      ) {
-        return submissionMapping[name];
-      }
+  }
+  let end = low;
+  while (end < submissions.length && offsets[end] < scrollTop + VIEWPORT_HEIGHT) {
+    end += 1;
+  }
+  const start = Math.max(0, low - OVERSCAN);
+  end = Math.min(submissions.length, end + OVERSCAN);
+
+  useEffect(() => {
+    if (hasMore && !loadingMore && end >= submissions.length - LOAD_MORE_ROWS) {
+      onLoadMore();
     }
-    return schema?.fields.find((f: any) => f.name === name)?.label || name;
-  };
-
-  const renderSubmissionData = (
-    data: Record<string, any>,
-    submissionMapping?: any
-  ) => (
-    <Grid container spacing={1}>
-      {Object.entries(data).map(([key, value]) => (
-        <Grid item xs={12} sm={6} key={key}>
-          <Box sx={{ display: "flex", alignItems: "center", mb: 1 }}>
-            <Typography
-              variant="subtitle2"
-              color="primary"
-              sx={{ minWidth: 100 }}
-            >
-              {getLabelForField(key, submissionMapping)}:
-            </Typography>
-            <Typography variant="body2" sx={{ ml: 1 }}>
-              {renderFieldValue(value, key, submissionMapping)}
-            </Typography>
-          </Box>
-        </Grid>
-      ))}
-    </Grid>
-  );
+  }, [end, submissions.length, hasMore, loadingMore, onLoadMore]);
 
-  if (loading) {
+  if (loading && !submissions.length) {
     return (
       <Paper sx={{ p: 3, textAlign: "center" }}>
         <CircularProgress />
@@ -158,6 +393,24 @@ const SubmissionsList: React.FC<SubmissionsListProps> = ({
     );
   }
 
+  const rows: React.ReactNode[] = [];
+  for (let index = start; index < end; index++) {
+    const submission = submissions[index];
+    rows.push(
+      <MemoizedSubmissionRow
+        key={submission.id}
+        submission={submission}
+        index={index}
+        top={offsets[index]}
+        schema={schema}
+        expanded={expanded.has(submission.id)}
+        details={details[submission.id]}
+        onToggle={handleToggle}
+        onMeasure={handleMeasure}
+      />
+    );
+  }
+
   return (
     <Paper sx={{ p: 3 }}>
       <Box
@@ -168,54 +421,30 @@ const SubmissionsList: React.FC<SubmissionsListProps> = ({
           mb: 2,
         }}
       >
-        <Typography variant="h5">
-          Submitted Forms ({submissions.length})
-        </Typography>
+        <Typography variant="h5">Submitted Forms ({total})</Typography>
         <Tooltip title="Delete all submissions">
           <IconButton onClick={onDeleteAll} color="error">
             <DeleteIcon />
           </IconButton>
         </Tooltip>
       </Box>
-      {submissions.map((submission, idx) => {
-        const dataObj =
-          typeof submission.data === "string"
-            ? JSON.parse(submission.data)
-            : submission.data;
-        return (
-          <Accordion key={submission.id} sx={{ mb: 2 }}>
-            <AccordionSummary expandIcon={<ExpandMoreIcon />}>
-              <Box
-                sx={{
-                  display: "flex",
-                  alignItems: "center",
-                  width: "100%",
-                  justifyContent: "space-between",
-                }}
-              >
-                <Box>
-                  <Chip
-                    label={formatDate(submission.submitted_at)}
-                    sx={{ mr: 1 }}
-                  />
-                  <Typography variant="subtitle1" component="span">
-                    {submission.form_title || `Submission #${idx + 1}`}
-                  </Typography>
-                </Box>
-                <Typography variant="caption" color="textSecondary">
-                  #{submission.id}
-                </Typography>
-              </Box>
-            </AccordionSummary>
-            <AccordionDetails>
-              {renderSubmissionData(
-                dataObj,
-                (submission as any).fields_mapping
-              )}
-            </AccordionDetails>
-          </Accordion>
-        );
-      })}
+      <Box
+        sx={{ maxHeight: VIEWPORT_HEIGHT, overflowY: "auto" }}
+        onScroll={(event: React.UIEvent<HTMLDivElement>) =>
+          setScrollTop(event.currentTarget.scrollTop)
+        }
+      >
+        <Box
+          sx={{ position: "relative", height: offsets[submissions.length] }}
+        >
+          {rows}
+        </Box>
+      </Box>
+      {loadingMore && (
+        <Box sx={{ textAlign: "center", mt: 2 }}>
+          <CircularProgress size={24} />
+        </Box>
+      )}
     </Paper>
   );
 };
@@ -1,23 +1,38 @@
 /**
  * Custom hook for managing submissions with optimizations
+ *
+ * Submissions are loaded as summaries, one page at a time: the first page on
+ * refresh and the next ones as the list scrolls (loadMoreSubmissions).
  */
 
-import { useCallback, useRef } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import { useAppContext } from "../store/storeExports";
 import {
-  getSubmissions,
+  getSubmissionPage,
   deleteAllSubmissions,
 } from "../services/submissionService";
+import { subscribeToEvents } from "../services/eventService";
+
+const PAGE_SIZE = 100;
 
 export const useSubmissions = () => {
   const {
     submissions,
+    submissionsCursor,
+    submissionsTotal,
     setSubmissions,
+    appendSubmissions,
+    addSubmission,
     setLoading,
     displayMessage,
     clearSubmissions,
   } = useAppContext();
 
+  const [loadingMore, setLoadingMore] = useState(false);
+  const loadingMoreRef = useRef(false);
+  // Bumped whenever the list restarts, so pages requested before are dropped
+  const generation = useRef(0);
+
   // Cache to prevent unnecessary API calls
   const lastFetchTime = useRef<number>(0);
   const CACHE_DURATION = 5000; // 5 seconds cache
@@ -31,10 +46,11 @@ export const useSubmissions = () => {
         return;
       }
 
+      generation.current += 1;
       try {
         setLoading(true);
-        const updatedSubmissions = await getSubmissions();
-        setSubmissions(updatedSubmissions);
+        const firstPage = await getSubmissionPage(null, PAGE_SIZE);
+        setSubmissions(firstPage);
         lastFetchTime.current = now;
       } catch (error: any) {
         displayMessage("Error loading submitted forms", "error");
@@ -45,11 +61,49 @@ export const useSubmissions = () => {
     [setLoading, setSubmissions, displayMessage]
   );
 
+  const loadMoreSubmissions = useCallback(async (): Promise<void> => {
+    if (submissionsCursor === null || loadingMoreRef.current) {
+      return;
+    }
+    const requested = generation.current;
+    try {
+      loadingMoreRef.current = true;
+      setLoadingMore(true);
+      const page = await getSubmissionPage(submissionsCursor, PAGE_SIZE);
+      if (requested === generation.current) {
+        appendSubmissions(page);
+      }
+    } catch (error: any) {
+      displayMessage("Error loading submitted forms", "error");
+    } finally {
+      loadingMoreRef.current = false;
+      setLoadingMore(false);
+    }
+  }, [submissionsCursor, appendSubmissions, displayMessage]);
+
+  const resetSubmissions = useCallback(() => {
+    generation.current += 1;
+    clearSubmissions();
+  }, [clearSubmissions]);
+
+  // Apply live events instead of refetching the whole list
+  useEffect(() => {
+    const unsubscribers = [
+      // Only the summary is kept; the row fetches the rest when expanded
+      subscribeToEvents("submission", ({ id, form_title, submitted_at }) =>
+        addSubmission({ id, form_title, submitted_at })
+      ),
+      subscribeToEvents("submissions_cleared", resetSubmissions),
+      subscribeToEvents("resync", () => refreshSubmissions(true)),
+    ];
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [addSubmission, resetSubmissions, refreshSubmissions]);
+
   const handleDeleteAllSubmissions = useCallback(async (): Promise<void> => {
     try {
       setLoading(true);
       await deleteAllSubmissions();
-      clearSubmissions();
+      resetSubmissions();
       displayMessage("All forms deleted successfully", "success");
       lastFetchTime.current = 0; // Reset cache
     } catch (error: any) {
@@ -57,11 +111,15 @@ export const useSubmissions = () => {
     } finally {
       setLoading(false);
     }
-  }, [setLoading, clearSubmissions, displayMessage]);
+  }, [setLoading, resetSubmissions, displayMessage]);
 
   return {
     submissions,
+    submissionsTotal,
+    hasMoreSubmissions: submissionsCursor !== null,
+    loadingMore,
     refreshSubmissions,
+    loadMoreSubmissions,
     handleDeleteAllSubmissions,
   };
 };
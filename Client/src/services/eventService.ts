@@ -0,0 +1,83 @@
+/**
+ * Event Service - Live server events over Server-Sent Events
+ *
+ * This service provides:
+ * - A single shared EventSource on GET /events
+ * - Per-event-type subscriptions that close the stream when unused
+ * - A "resync" notification after reconnecting, since events may have been missed
+ */
+
+import { API_CONFIG } from "./apiService";
+import { ServerEventType } from "@/types/typesExports";
+
+type EventHandler = (data: any) => void;
+
+const EVENT_TYPES: ServerEventType[] = [
+  "submission",
+  "statistics",
+  "submissions_cleared",
+  "resync",
+];
+
+const handlers = new Map<ServerEventType, Set<EventHandler>>();
+let source: EventSource | null = null;
+
+const dispatch = (type: ServerEventType, data: any): void => {
+  handlers.get(type)?.forEach((handler) => handler(data));
+};
+
+const openSource = (): EventSource => {
+  const eventSource = new EventSource(`${API_CONFIG.baseURL}/events`);
+  let interrupted = false;
+
+  EVENT_TYPES.forEach((type) => {
+    eventSource.addEventListener(type, (event) => {
+      dispatch(type, JSON.parse((event as MessageEvent).data));
+    });
+  });
+
+  // EventSource reconnects by itself; anything sent meanwhile was missed
+  eventSource.onerror = () => {
+    interrupted = true;
+  };
+  eventSource.onopen = () => {
+    if (interrupted) {
+      interrupted = false;
+      dispatch("resync", { reason: "reconnected" });
+    }
+  };
+
+  return eventSource;
+};
+
+/**
+ * Subscribe to a live server event type
+ * @param type - Event type
+ * @param handler - Called with the event's parsed data
+ * @returns Function that removes the subscription
+ */
+export const subscribeToEvents = (
+  type: ServerEventType,
+  handler: EventHandler
+): (() => void) => {
+  if (typeof EventSource === "undefined") {
+    return () => {};
+  }
+
+  if (!handlers.has(type)) {
+    handlers.set(type, new Set());
+  }
+  handlers.get(type)!.add(handler);
+  if (!source) {
+    source = openSource();
+  }
+
+  return () => {
+    handlers.get(type)?.delete(handler);
+    const active = Array.from(handlers.values()).some((set) => set.size > 0);
+    if (!active && source) {
+      source.close();
+      source = null;
+    }
+  };
+};
@@ -6,11 +6,17 @@
  * - Uploading form schemas
  * - Getting current schema
  * - Submitting form data
+ * - Validating fields without submitting
+ * - Searching dropdown options loaded lazily
  */
 
 import { apiClient, handleApiCall } from "./apiService";
 import { downloadFile, uploadFile } from "./fileService";
-import { FormSchema, FormSubmissionResponse } from "@/types/typesExports";
+import {
+  FormSchema,
+  FormSubmissionResponse,
+  OptionSearchResult,
+} from "@/types/typesExports";
 
 /**
  * Download example form JSON file
@@ -67,3 +73,48 @@ export const submitForm = async (formData: {
     throw new Error("Error submitting form");
   }
 };
+
+/**
+ * Validate some fields against the server rules without submitting
+ * @param formId - Form identifier (form_id from upload or the form title)
+ * @param data - Field values to check
+ * @param fields - Field names to check (defaults to the keys of data)
+ * @returns Validation result with the same error messages as a submit
+ */
+export const validateFields = async (
+  formId: string,
+  data: Record<string, any>,
+  fields?: string[]
+): Promise<FormSubmissionResponse> => {
+  const response = await apiClient.post(
+    `/forms/${encodeURIComponent(formId)}/validate`,
+    { data, fields }
+  );
+  return await response.json();
+};
+
+/**
+ * Search a dropdown field's options by label prefix
+ * @param formId - Form identifier (form_id from upload or the form title)
+ * @param fieldName - Dropdown field name
+ * @param query - Label prefix to search for
+ * @param limit - Maximum number of options returned
+ * @returns Matching options and the total number of matches
+ */
+export const searchFieldOptions = async (
+  formId: string,
+  fieldName: string,
+  query: string,
+  limit: number = 20
+): Promise<OptionSearchResult> => {
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
+  return await handleApiCall<OptionSearchResult>(
+    () =>
+      apiClient.get(
+        `/forms/${encodeURIComponent(formId)}/fields/${encodeURIComponent(
+          fieldName
+        )}/options?${params}`
+      ),
+    "Error searching options"
+  );
+};
@@ -19,3 +19,6 @@ export * from "./statisticsService";
 
 // File Service
 export * from "./fileService";
+
+// Event Service
+export * from "./eventService";
@@ -3,12 +3,17 @@
  *
  * This service provides methods for:
  * - Getting all submissions
+ * - Getting submission summaries page by page, and one full submission
  * - Deleting submissions
  * - Managing submission data
  */
 
 import { apiClient, handleApiCall } from "./apiService";
-import { SubmissionDB, ApiResponse } from "@/types/typesExports";
+import {
+  SubmissionDB,
+  SubmissionPage,
+  ApiResponse,
+} from "@/types/typesExports";
 
 /**
  * Get all form submissions
@@ -21,6 +26,38 @@ export const getSubmissions = async (): Promise<SubmissionDB[]> => {
   );
 };
 
+/**
+ * Get a page of submission summaries, newest first
+ * @param beforeId - Cursor from the previous page's next_before_id
+ * @param limit - Page size
+ * @returns Summaries, the next cursor and, on the first page, the total
+ */
+export const getSubmissionPage = async (
+  beforeId: string | null = null,
+  limit: number = 100
+): Promise<SubmissionPage> => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (beforeId !== null) {
+    params.set("before_id", String(beforeId));
+  }
+  return await handleApiCall<SubmissionPage>(
+    () => apiClient.get(`/submissions/summaries?${params}`),
+    "Error getting submitted forms"
+  );
+};
+
+/**
+ * Get one submission with its data
+ * @param id - Submission id
+ * @returns The full submission
+ */
+export const getSubmission = async (id: string): Promise<SubmissionDB> => {
+  return await handleApiCall<SubmissionDB>(
+    () => apiClient.get(`/submissions/${encodeURIComponent(id)}`),
+    "Error getting submitted form"
+  );
+};
+
 /**
  * Delete all form submissions
  * @returns Deletion result
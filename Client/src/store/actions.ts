@@ -5,7 +5,12 @@
  * to update the application state.
  */
 
-import { FormSchema, SubmissionDB, MessageType } from "@/types/typesExports";
+import {
+  FormSchema,
+  SubmissionPage,
+  SubmissionSummary,
+  MessageType,
+} from "@/types/typesExports";
 
 // Action types
 export const ACTIONS = {
@@ -15,6 +20,7 @@ export const ACTIONS = {
 
   // Submissions actions
   SET_SUBMISSIONS: "SET_SUBMISSIONS",
+  APPEND_SUBMISSIONS: "APPEND_SUBMISSIONS",
   ADD_SUBMISSION: "ADD_SUBMISSION",
   CLEAR_SUBMISSIONS: "CLEAR_SUBMISSIONS",
 
@@ -42,12 +48,17 @@ export const clearSchema = () => ({
 });
 
 // Submissions actions
-export const setSubmissions = (submissions: SubmissionDB[]) => ({
+export const setSubmissions = (page: SubmissionPage) => ({
   type: ACTIONS.SET_SUBMISSIONS,
-  payload: submissions,
+  payload: page,
 });
 
-export const addSubmission = (submission: SubmissionDB) => ({
+export const appendSubmissions = (page: SubmissionPage) => ({
+  type: ACTIONS.APPEND_SUBMISSIONS,
+  payload: page,
+});
+
+export const addSubmission = (submission: SubmissionSummary) => ({
   type: ACTIONS.ADD_SUBMISSION,
   payload: submission,
 });
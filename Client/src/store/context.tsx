@@ -11,7 +11,12 @@ import React, {
   useCallback,
   ReactNode,
 } from "react";
-import { FormSchema, SubmissionDB, MessageType } from "@/types/typesExports";
+import {
+  FormSchema,
+  SubmissionPage,
+  SubmissionSummary,
+  MessageType,
+} from "@/types/typesExports";
 import { initialState, appReducer } from "./reducer";
 import * as actions from "./actions";
 
@@ -19,7 +24,9 @@ import * as actions from "./actions";
 export interface AppContextType {
   // State
   schema: FormSchema | null;
-  submissions: SubmissionDB[];
+  submissions: SubmissionSummary[];
+  submissionsCursor: string | null;
+  submissionsTotal: number;
   loading: boolean;
   message: string;
   messageType: MessageType;
@@ -30,8 +37,9 @@ export interface AppContextType {
   // Actions
   setSchema: (schema: FormSchema) => void;
   clearSchema: () => void;
-  setSubmissions: (submissions: SubmissionDB[]) => void;
-  addSubmission: (submission: SubmissionDB) => void;
+  setSubmissions: (page: SubmissionPage) => void;
+  appendSubmissions: (page: SubmissionPage) => void;
+  addSubmission: (submission: SubmissionSummary) => void;
   clearSubmissions: () => void;
   setLoading: (loading: boolean) => void;
   displayMessage: (message: string, type?: MessageType) => void;
@@ -62,11 +70,15 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
   }, []);
 
   // Submissions actions
-  const setSubmissions = useCallback((submissions: SubmissionDB[]) => {
-    dispatch(actions.setSubmissions(submissions));
+  const setSubmissions = useCallback((page: SubmissionPage) => {
+    dispatch(actions.setSubmissions(page));
   }, []);
 
-  const addSubmission = useCallback((submission: SubmissionDB) => {
+  const appendSubmissions = useCallback((page: SubmissionPage) => {
+    dispatch(actions.appendSubmissions(page));
+  }, []);
+
+  const addSubmission = useCallback((submission: SubmissionSummary) => {
     dispatch(actions.addSubmission(submission));
   }, []);
 
@@ -113,6 +125,7 @@ export const AppProvider: React.FC<AppProviderProps> = ({ children }) => {
     setSchema,
     clearSchema,
     setSubmissions,
+    appendSubmissions,
     addSubmission,
     clearSubmissions,
     setLoading,
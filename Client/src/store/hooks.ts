@@ -28,6 +28,8 @@ export const useAppState = () => {
   const {
     schema,
     submissions,
+    submissionsCursor,
+    submissionsTotal,
     loading,
     message,
     messageType,
@@ -39,6 +41,8 @@ export const useAppState = () => {
   return {
     schema,
     submissions,
+    submissionsCursor,
+    submissionsTotal,
     loading,
     message,
     messageType,
@@ -57,6 +61,7 @@ export const useAppActions = () => {
     setSchema,
     clearSchema,
     setSubmissions,
+    appendSubmissions,
     addSubmission,
     clearSubmissions,
     setLoading,
@@ -71,6 +76,7 @@ export const useAppActions = () => {
     setSchema,
     clearSchema,
     setSubmissions,
+    appendSubmissions,
     addSubmission,
     clearSubmissions,
     setLoading,
@@ -5,7 +5,12 @@
  * based on dispatched actions.
  */
 
-import { AppState, AppAction } from "@/types/typesExports";
+import {
+  AppState,
+  AppAction,
+  SubmissionPage,
+  SubmissionSummary,
+} from "@/types/typesExports";
 import { ACTIONS } from "./actions";
 
 // Initial state
@@ -13,6 +18,8 @@ export const initialState: AppState = {
   // Form data
   schema: null,
   submissions: [],
+  submissionsCursor: null,
+  submissionsTotal: 0,
 
   // UI state
   loading: false,
@@ -45,22 +52,49 @@ export const appReducer = (state: AppState, action: AppAction): AppState => {
         schema: null,
       };
 
-    case ACTIONS.SET_SUBMISSIONS:
+    case ACTIONS.SET_SUBMISSIONS: {
+      const page = action.payload as SubmissionPage;
       return {
         ...state,
-        submissions: action.payload as any,
+        submissions: page.results,
+        submissionsCursor: page.next_before_id,
+        submissionsTotal: page.total ?? page.results.length,
       };
+    }
 
-    case ACTIONS.ADD_SUBMISSION:
+    case ACTIONS.APPEND_SUBMISSIONS: {
+      // Rows added by live events while the page loaded are already listed
+      const page = action.payload as SubmissionPage;
+      const loaded = new Set(state.submissions.map((existing) => existing.id));
       return {
         ...state,
-        submissions: [...state.submissions, action.payload as any],
+        submissions: [
+          ...state.submissions,
+          ...page.results.filter((submission) => !loaded.has(submission.id)),
+        ],
+        submissionsCursor: page.next_before_id,
       };
+    }
+
+    case ACTIONS.ADD_SUBMISSION: {
+      // A live event can race a refetch that already contains it
+      const submission = action.payload as SubmissionSummary;
+      if (state.submissions.some((existing) => existing.id === submission.id)) {
+        return state;
+      }
+      return {
+        ...state,
+        submissions: [submission, ...state.submissions],
+        submissionsTotal: state.submissionsTotal + 1,
+      };
+    }
 
     case ACTIONS.CLEAR_SUBMISSIONS:
       return {
         ...state,
         submissions: [],
+        submissionsCursor: null,
+        submissionsTotal: 0,
       };
 
     case ACTIONS.SET_LOADING:
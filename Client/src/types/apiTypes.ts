@@ -19,3 +19,10 @@ export interface ApiClient {
   put: (url: string, data?: any, config?: any) => Promise<any>;
   delete: (url: string, config?: any) => Promise<any>;
 }
+
+// Live event types pushed by GET /events
+export type ServerEventType =
+  | "submission"
+  | "statistics"
+  | "submissions_cleared"
+  | "resync";
@@ -19,6 +19,8 @@ export interface FieldValidation {
   maxDate?: string;
   email?: boolean;
   pattern?: string;
+  minSelections?: number;
+  maxSelections?: number;
 }
 
 export interface FieldErrorMessages {
@@ -32,16 +34,42 @@ export interface FieldErrorMessages {
   email?: string;
   pattern?: string;
   invalidOption?: string;
+  minSelections?: string;
+  maxSelections?: string;
 }
 
 export interface FormField {
   name: string;
   label: string;
-  type: "text" | "email" | "password" | "date" | "number" | "dropdown";
+  type:
+    | "text"
+    | "email"
+    | "password"
+    | "date"
+    | "number"
+    | "dropdown"
+    | "multiselect";
   required: boolean;
   validation?: FieldValidation;
   errorMessages?: FieldErrorMessages;
   options?: DropdownOption[];
+  optionsCount?: number; // Set when options are left out of the schema payload
+  lazyOptions?: boolean; // Options must be searched on the server
+  visibleWhen?: string; // Shown and validated only while this expression is true
+  requiredWhen?: string; // Required while this expression is true
+  compute?: string; // Value derived from other fields
+}
+
+// State of a conditional or computed field, as evaluated on the server
+export interface FieldState {
+  visible: boolean;
+  required: boolean;
+  value: any;
+}
+
+export interface OptionSearchResult {
+  options: DropdownOption[];
+  total: number;
 }
 
 export interface FormSchema {
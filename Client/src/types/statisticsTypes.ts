@@ -20,3 +20,10 @@ export interface FormStatistics {
   total_forms: number;
   forms: FormStat[];
 }
+
+// Incremental statistics update pushed by GET /events
+export interface StatisticsDelta {
+  form_title: string;
+  count: number;
+  fields: FieldStat[];
+}
@@ -5,6 +5,7 @@
  */
 
 import { FieldStat } from "./statisticsTypes";
+import { FieldState } from "./formTypes";
 
 // Form Submission Types
 export interface FormSubmission {
@@ -16,6 +17,7 @@ export interface FormSubmissionResponse {
   success: boolean;
   errors?: Record<string, string[]>;
   message: string;
+  fields?: Record<string, FieldState> | null; // Conditional and computed fields touched by a validation
 }
 
 export interface SubmissionDB {
@@ -25,3 +27,16 @@ export interface SubmissionDB {
   submitted_at: string;
   fields_mapping: FieldStat[] | Record<string, string>; // Support both old and new formats
 }
+
+// Row of the submissions list; data and fields_mapping are fetched when the row is expanded
+export interface SubmissionSummary {
+  id: string;
+  form_title: string;
+  submitted_at: string;
+}
+
+export interface SubmissionPage {
+  results: SubmissionSummary[];
+  next_before_id: string | null; // Cursor of the next (older) page
+  total: number | null; // Sent with the first page only
+}
@@ -5,7 +5,7 @@
  */
 
 import { FormSchema } from "./formTypes";
-import { SubmissionDB, FormSubmissionResponse } from "./submissionTypes";
+import { SubmissionSummary, FormSubmissionResponse } from "./submissionTypes";
 
 // UI State Types
 export type MessageType = "success" | "error" | "warning" | "info";
@@ -19,7 +19,9 @@ export interface Message {
 export interface AppState {
   // Form data
   schema: FormSchema | null;
-  submissions: SubmissionDB[];
+  submissions: SubmissionSummary[]; // Loaded pages, newest first
+  submissionsCursor: string | null; // Cursor of the next page; null when all are loaded
+  submissionsTotal: number;
 
   // UI state
   loading: boolean;
@@ -54,7 +56,11 @@ export interface DynamicFormProps {
 }
 
 export interface SubmissionsListProps {
-  submissions: SubmissionDB[];
+  submissions: SubmissionSummary[];
+  total: number;
+  hasMore: boolean;
+  onLoadMore: () => void;
   onDeleteAll: () => Promise<void>;
   loading?: boolean;
+  loadingMore?: boolean;
 }
@@ -0,0 +1,99 @@
+"""
+Memory benchmark for cached forms
+
+Compiles many tenant forms (variants of the example schema with their own
+titles, labels and limits, each parsed from its own JSON like an upload) and
+measures with tracemalloc what keeping them costs:
+- compiled: a CompiledForm per form, as kept by CompiledFormCache and used
+  for every submission and field validation the server answers
+- pydantic: the FormSchema tree plus the generated submission model, the
+  representation submissions were validated with before CompiledForm;
+  measured on a sample and scaled, since building thousands of model classes
+  takes minutes
+- bounded: the same forms put through a CompiledFormCache with a small
+  memory budget, showing that memory stays at the budget
+
+Usage (from the Server directory):
+    python -m benchmarks.compiled_form_memory_benchmark [forms] [pydantic sample]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from models import FormSchema, DynamicFormSubmissionGenerator, CompiledForm, CompiledFormCache
+from services.form_service import FormService
+
+BOUNDED_CACHE_BYTES = 8 * 1024 * 1024
+
+
+def tenant_schemas(count: int):
+    """JSON documents of distinct tenant forms"""
+    with open(FormService().get_example_file_path(), "r", encoding="utf-8") as f:
+        example = json.load(f)
+    for index in range(count):
+        schema = json.loads(json.dumps(example))
+        schema["title"] = f"{example['title']} #{index}"
+        for field in schema["fields"]:
+            field["label"] = f"{field['label']} ({index % 97})"
+            validation = field.get("validation") or {}
+            if "maxLength" in validation:
+                validation["maxLength"] = 50 + index % 5 * 50
+        yield json.dumps(schema).encode()
+
+
+def _measure(count: int, build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = [build(FormSchema(**json.loads(document))) for document in tenant_schemas(count)]
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, current, elapsed
+
+
+def run(forms: int, pydantic_sample: int) -> None:
+    compiled, compiled_bytes, compiled_s = _measure(forms, CompiledForm)
+    estimated = sum(form.nbytes for form in compiled)
+    del compiled
+
+    _, pydantic_bytes, pydantic_s = _measure(
+        pydantic_sample,
+        lambda form_schema: (
+            form_schema,
+            DynamicFormSubmissionGenerator.create_submission_model(form_schema)
+        )
+    )
+    pydantic_per_form = pydantic_bytes / pydantic_sample
+
+    gc.collect()
+    tracemalloc.start()
+    cache = CompiledFormCache(BOUNDED_CACHE_BYTES)
+    for index, document in enumerate(tenant_schemas(forms)):
+        cache.get_or_compile(str(index), FormSchema(**json.loads(document)))
+    gc.collect()
+    bounded_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{'representation':<34}{'forms':>8}{'MiB':>10}{'bytes/form':>12}{'ms/form':>9}")
+    print(f"{'compiled (CompiledForm)':<34}{forms:>8}{compiled_bytes / 2 ** 20:>10.1f}"
+          f"{compiled_bytes / forms:>12.0f}{compiled_s * 1000 / forms:>9.2f}")
+    print(f"{'pydantic (schema + model), scaled':<34}{forms:>8}{pydantic_per_form * forms / 2 ** 20:>10.1f}"
+          f"{pydantic_per_form:>12.0f}{pydantic_s * 1000 / pydantic_sample:>9.2f}")
+    print(f"{'bounded cache (8 MiB budget)':<34}{len(cache):>8}{bounded_bytes / 2 ** 20:>10.1f}"
+          f"{bounded_bytes / max(len(cache), 1):>12.0f}{'':>9}")
+    print(f"estimated size of compiled forms: {estimated / 2 ** 20:.1f} MiB "
+          f"({estimated / compiled_bytes:.2f}x measured)")
+    print(f"compiled forms use {pydantic_per_form / (compiled_bytes / forms):.1f}x less memory; "
+          f"bounded cache evicted {cache.evictions} forms")
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    )
@@ -0,0 +1,100 @@
+"""
+Benchmark for response compression
+
+Builds a GET /submissions/ payload for the example schema (data plus the
+repeated fields_mapping per row) and compresses it with every installed
+encoding at several levels, once as a single body and once as a stream of
+64 KiB chunks flushed one by one, as CompressionMiddleware sends streamed
+responses. Reports compressed size, ratio and CPU time. Nothing touches the
+database.
+
+Usage (from the Server directory):
+    python -m benchmarks.compression_benchmark [rows]
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from middleware.compression import StreamEncoder, available_encodings
+from services.form_service import FormService
+
+LEVELS = {"zstd": (1, 3, 9), "br": (1, 4, 9), "gzip": (1, 6, 9)}
+STREAM_CHUNK_SIZE = 64 * 1024
+REPEATS = 3
+
+
+def build_payload(rows: int) -> bytes:
+    """A submission list as returned by GET /submissions/"""
+    with open(FormService().get_example_file_path(), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    fields_mapping = {field["name"]: field["label"] for field in schema["fields"]}
+    options = {
+        field["name"]: {option["value"]: option["label"] for option in field.get("options") or []}
+        for field in schema["fields"]
+    }
+
+    rng = random.Random(42)
+    started = datetime(2025, 1, 1)
+    submissions = []
+    for submission_id in range(1, rows + 1):
+        data = {}
+        for field in schema["fields"]:
+            name, field_type = field["name"], field["type"]
+            if field_type == "number":
+                data[name] = rng.randint(1, 500)
+            elif field_type == "date":
+                data[name] = (started + timedelta(days=rng.randint(0, 700))).date().isoformat()
+            elif field_type == "dropdown":
+                data[name] = rng.choice(list(options[name]))
+            elif field_type == "email":
+                data[name] = f"user{rng.randint(1, 10 ** 6)}@example.com"
+            else:
+                data[name] = " ".join(rng.choice(("Jane", "John", "Doe", "Smith", "Lee", "Ng")) for _ in range(2))
+        selected = {name: labels[data[name]] for name, labels in options.items() if labels}
+        submissions.append({
+            "id": submission_id,
+            "form_title": schema["title"],
+            "data": json.dumps(data),
+            "submitted_at": (started + timedelta(seconds=submission_id * 37)).isoformat(),
+            "fields_mapping": {"fields_mapping": fields_mapping, "selected_options_labels": selected}
+        })
+    return json.dumps(submissions).encode()
+
+
+def _measure(encoding: str, level: int, payload: bytes, streamed: bool):
+    best = None
+    for _ in range(REPEATS):
+        encoder = StreamEncoder(encoding, level)
+        started = time.process_time()
+        if streamed:
+            size = 0
+            for offset in range(0, len(payload), STREAM_CHUNK_SIZE):
+                chunk = payload[offset:offset + STREAM_CHUNK_SIZE]
+                size += len(encoder.encode(chunk, offset + STREAM_CHUNK_SIZE >= len(payload)))
+        else:
+            size = len(encoder.encode(payload, True))
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return size, best
+
+
+def run(rows: int) -> None:
+    payload = build_payload(rows)
+    megabytes = len(payload) / 1024 / 1024
+    print(f"payload: {rows} submissions, {len(payload):,} bytes")
+    print(f"{'encoding':<10}{'level':>6}{'mode':>9}{'bytes':>13}{'ratio':>8}{'cpu ms':>9}{'MB/s':>9}")
+    for encoding in available_encodings():
+        for level in LEVELS[encoding]:
+            for streamed in (False, True):
+                size, elapsed = _measure(encoding, level, payload, streamed)
+                print(
+                    f"{encoding:<10}{level:>6}{'stream' if streamed else 'single':>9}{size:>13,}"
+                    f"{len(payload) / size:>8.1f}{elapsed * 1000:>9.1f}{megabytes / max(elapsed, 1e-9):>9.0f}"
+                )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
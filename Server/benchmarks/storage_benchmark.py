@@ -0,0 +1,184 @@
+"""
+Benchmark for storage backends
+
+Runs the same workload on each backend, each against its own empty database:
+- submit: concurrent submissions of the example form, each inserting the
+  submission and counting it in the rollups, as POST /forms/submit does
+- field query: a range predicate on a number field of the submission
+  document, as GET /submissions/search?where= sends it, with the field's
+  expression index in place
+- list: the newest 100 submissions
+
+Backends:
+- sqlite (tuned): the sqlite backend (WAL, synchronous=NORMAL, batched
+  commits through the writer thread, statement cache)
+- sqlite (defaults): the same file format with SQLite's defaults (rollback
+  journal, synchronous=FULL) and one commit per submission
+- postgresql: when a PostgreSQL URL is given; its tables are dropped and
+  recreated, so give it a scratch database
+
+form_submissions is created unpartitioned on every backend.
+
+Usage (from the Server directory):
+    python -m benchmarks.storage_benchmark [submissions] [threads] [postgresql url]
+"""
+
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Every backend gets the same plain table; the models take their shape when database is imported
+os.environ["SUBMISSIONS_PARTITIONED"] = "false"
+
+from database import Base, FormSubmissionDB, generate_data_hash
+from services.form_service import FormService
+from services.rollup_service import rollup_service
+from services.search_service import _field_number_sql, _sqlite_field_number_sql
+from storage import StorageBackend, SQLiteBackend, create_backend
+
+QUERY_REPEATS = 20
+NUMBER_FIELD = "quantity"
+
+
+def example_submissions(count: int) -> list:
+    """Distinct submissions of the example form"""
+    with open(FormService().get_example_file_path(), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    rng = random.Random(7)
+    submissions = []
+    for index in range(count):
+        data = {}
+        for field in schema["fields"]:
+            if field["type"] == "number":
+                data[field["name"]] = rng.randint(1, 500)
+            elif field["type"] in ("dropdown", "multiselect"):
+                data[field["name"]] = rng.choice(field["options"])["value"]
+            elif field["type"] == "date":
+                data[field["name"]] = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            else:
+                data[field["name"]] = f"{field['name']} {index}"
+        submissions.append((schema["title"], data))
+    return submissions
+
+
+def _open(name: str, url: str):
+    if name == "sqlite (defaults)":
+        backend = StorageBackend(url)
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        backend = create_backend(url)
+        engine = create_engine(url, **backend.engine_options())
+        backend.attach(engine)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    if engine.dialect.name == "postgresql":
+        expression = _field_number_sql(NUMBER_FIELD)
+    else:
+        expression = _sqlite_field_number_sql(NUMBER_FIELD)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_bench_{NUMBER_FIELD} ON form_submissions ({expression})"))
+    backend.start()
+    return backend, engine, expression
+
+
+def _submit_all(backend, session_factory, submissions: list, threads: int):
+    latencies = []
+    errors = 0
+
+    def submit(item):
+        form_title, data = item
+        submitted_on = datetime.now()
+        row = FormSubmissionDB(
+            form_title=form_title,
+            data=json.dumps(data),
+            submitted_at=submitted_on.isoformat(),
+            submitted_on=submitted_on,
+            data_hash=generate_data_hash(data)
+        )
+
+        def save(session):
+            session.add(row)
+
+        db = session_factory()
+        started = time.perf_counter()
+        try:
+            backend.write(db, save)
+            rollup_service.record(form_title, submitted_on)
+            return time.perf_counter() - started
+        except Exception:
+            return None
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        for latency in executor.map(submit, submissions):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+    return time.perf_counter() - started, latencies, errors
+
+
+def _best_ms(engine, sql: str) -> float:
+    best = None
+    with engine.connect() as conn:
+        for _ in range(QUERY_REPEATS):
+            started = time.perf_counter()
+            conn.execute(text(sql)).fetchall()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def run(count: int, threads: int, postgresql_url: str = None) -> None:
+    submissions = example_submissions(count)
+    directory = tempfile.mkdtemp(prefix="storage-benchmark-")
+    backends = [
+        ("sqlite (tuned)", f"sqlite:///{os.path.join(directory, 'tuned.db')}"),
+        ("sqlite (defaults)", f"sqlite:///{os.path.join(directory, 'defaults.db')}"),
+    ]
+    if postgresql_url:
+        backends.append(("postgresql", postgresql_url))
+
+    print(f"workload: {count} submissions from {threads} threads")
+    print(f"{'backend':<20}{'submits/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'query ms':>10}{'list ms':>9}")
+    try:
+        for name, url in backends:
+            backend, engine, expression = _open(name, url)
+            try:
+                session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                elapsed, latencies, errors = _submit_all(backend, session_factory, submissions, threads)
+                query_ms = _best_ms(engine, f"SELECT count(*) FROM form_submissions WHERE {expression} > 250")
+                list_ms = _best_ms(engine, "SELECT * FROM form_submissions ORDER BY id DESC LIMIT 100")
+                latencies.sort()
+                p50 = statistics.median(latencies) * 1000 if latencies else 0
+                p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+                print(f"{name:<20}{len(latencies) / elapsed:>11.0f}{p50:>9.2f}{p99:>9.2f}{errors:>8}"
+                      f"{query_ms:>10.2f}{list_ms:>9.2f}")
+                if isinstance(backend, SQLiteBackend) and backend.writer is not None:
+                    writer = backend.writer.metrics()
+                    print(f"{'':<20}{writer['batches']} commits, {writer['average_batch']} submissions per commit")
+            finally:
+                backend.stop()
+                engine.dispose()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+        sys.argv[3] if len(sys.argv) > 3 else None
+    )
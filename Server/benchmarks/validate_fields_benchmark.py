@@ -0,0 +1,58 @@
+"""
+Benchmark for live single-field validation
+
+Measures FormService.validate_fields against the example schema, the path
+behind POST /forms/{form_id}/validate, and compares the p99 latency with
+the target. Nothing touches the database.
+
+Usage (from the Server directory):
+    python -m benchmarks.validate_fields_benchmark [iterations]
+"""
+
+import json
+import statistics
+import sys
+import time
+
+from models import FormSchema
+from services.form_service import FormService
+
+TARGET_P99_MS = 0.5
+
+CASES = {
+    "valid text field": ({"customerName": "Jane Doe"}, None),
+    "invalid email field": ({"customerEmail": "not-an-email"}, None),
+    "valid dropdown field": ({"productType": "books"}, None),
+    "missing required field": ({}, ["customerName"]),
+}
+
+
+def run(iterations: int) -> bool:
+    service = FormService()
+    with open(service.get_example_file_path(), "r", encoding="utf-8") as f:
+        form_schema = FormSchema(**json.load(f))
+
+    # Activate in memory only, so the user's current form file is left alone
+    form_id = "benchmark"
+    service._activate_schema(form_schema, form_id)
+
+    passed = True
+    print(f"{'case':<26}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>12}")
+    for name, (data, fields) in CASES.items():
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            service.validate_fields(form_id, data, fields)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p50 = statistics.median(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        passed = passed and p99 <= TARGET_P99_MS
+        print(f"{name:<26}{p50:>10.4f}{p99:>10.4f}{1000 / p50:>12.0f}")
+
+    print(f"target p99: {TARGET_P99_MS} ms -> {'PASS' if passed else 'FAIL'}")
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000) else 1)
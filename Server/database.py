@@ -1,27 +1,125 @@
-from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, JSON
+from sqlalchemy import create_engine, inspect, text, Column, String, DateTime, Text, Integer, JSON, Boolean, Index
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import asyncio
+import itertools
 import json
 import hashlib
+import threading
 
-from config import DATABASE_URL
+from config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, SUBMISSIONS_PARTITIONED, DATABASE_READ_URLS,
+    READ_REPLICA_MAX_LAG_SECONDS, READ_REPLICA_CHECK_INTERVAL_SECONDS
+)
+from storage import create_backend, database_url
 
-engine = create_engine(DATABASE_URL)
+storage = create_backend(database_url())
+engine = create_engine(storage.url, **storage.engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+storage.attach(engine)
 Base = declarative_base()
 
+# Partitioned tables need the partition key in every unique constraint, so the
+# primary key becomes (id, submitted_on) and data_hash uniqueness is enforced
+# by claim_data_hash instead of a table-wide unique index
+PARTITIONED = SUBMISSIONS_PARTITIONED and engine.dialect.name == "postgresql"
+
 class FormSubmissionDB(Base):
     """Database model for form submissions"""
     __tablename__ = "form_submissions"
+    # Ids are never reused, so archived submissions keep unique ids
+    __table_args__ = {"postgresql_partition_by": "RANGE (submitted_on)"} if PARTITIONED else {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    form_title = Column(String, nullable=False)  # Title of the form for display
+    form_title = Column(String, nullable=False, index=True)  # Title of the form for display
     data = Column(JSON, nullable=False)  # JSON data of submitted form
     submitted_at = Column(String, nullable=False)  # Submission timestamp as string
-    data_hash = Column(String, unique=True, index=True, nullable=False)  # Hash to prevent duplicates
+    submitted_on = Column(DateTime, primary_key=PARTITIONED, nullable=False, index=True, default=datetime.now)  # Partition key
+    data_hash = Column(String, unique=not PARTITIONED, index=True, nullable=False)  # Hash to prevent duplicates
     fields_mapping = Column(JSON, nullable=True)  # New: mapping name→label
 
+class RevalidationRunDB(Base):
+    """Database model for a re-validation of stored submissions against a new schema"""
+    __tablename__ = "revalidation_runs"
+    
+    id = Column(String, primary_key=True)
+    form_title = Column(String, nullable=False, index=True)
+    form_schema = Column(JSON, nullable=False)  # Schema the submissions are checked against
+    status = Column(String, nullable=False)  # pending, running, completed, failed or superseded
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    incompatible = Column(Integer, nullable=False, default=0)
+    last_submission_id = Column(Integer, nullable=False, default=0)  # Resume cursor
+    started_at = Column(DateTime, nullable=False, default=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+class RevalidationResultDB(Base):
+    """Database model for one submission's compatibility with a re-validation run's schema"""
+    __tablename__ = "revalidation_results"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String, nullable=False, index=True)
+    submission_id = Column(Integer, nullable=False, index=True)
+    compatible = Column(Boolean, nullable=False)
+    errors = Column(JSON, nullable=True)  # Same format as submit errors
+
+class PurgeJobDB(Base):
+    """Database model for a background batched delete of submissions"""
+    __tablename__ = "purge_jobs"
+    
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)  # pending, running, completed or failed
+    form_title = Column(String, nullable=True)
+    older_than = Column(DateTime, nullable=True)
+    total = Column(Integer, nullable=True)
+    deleted = Column(Integer, nullable=False, default=0)
+    archived_deleted = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+class FlatFormTableDB(Base):
+    """Database model for the typed, flattened copy of a form's submissions"""
+    __tablename__ = "flat_form_tables"
+    
+    table_name = Column(String, primary_key=True)
+    form_title = Column(String, nullable=False, index=True)
+    schema_hash = Column(String, nullable=False)
+    columns = Column(JSON, nullable=False)  # [{name, type, options}] of the flattened fields
+    last_submission_id = Column(Integer, nullable=False, default=0)  # Sync cursor
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    synced_at = Column(DateTime, nullable=True)
+
+class SubmissionRollupDB(Base):
+    """Database model for submission counts per form and time bucket"""
+    __tablename__ = "submission_rollups"
+    __table_args__ = (Index("ix_submission_rollups_bucket_start", "bucket", "bucket_start"),)
+    
+    bucket = Column(String, primary_key=True)  # minute, hour or day
+    form_title = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class RollupWatermarkDB(Base):
+    """Database model for how far fine buckets have been compacted into a coarser bucket"""
+    __tablename__ = "rollup_watermarks"
+    
+    bucket = Column(String, primary_key=True)  # hour or day
+    compacted_until = Column(DateTime, nullable=False)
+
+class IdempotencyKeyDB(Base):
+    """Database model for a submit result replayed for a repeated Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+    
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # Retries must send the same payload
+    response = Column(JSON, nullable=False)  # FormSubmissionResponse
+    created_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -29,9 +127,184 @@ def get_db():
     finally:
         db.close()
 
+# Replication lag in seconds; 0 on a primary and on a replica that has replayed everything it received
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class ReadEngine:
+    """An engine serving read-only sessions, with its health and usage counters"""
+    __slots__ = ("name", "engine", "session_factory", "healthy", "lag_seconds", "checked_at",
+                 "sessions", "errors", "last_error")
+
+    def __init__(self, name: str, bind, healthy: bool = False):
+        self.name = name
+        self.engine = bind
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+        self.healthy = healthy
+        self.lag_seconds = None
+        self.checked_at = None
+        self.sessions = 0
+        self.errors = 0
+        self.last_error = None
+
+    def metrics(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "name": self.name,
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "sessions": self.sessions,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "pool_checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None
+        }
+
+class ReadRouter:
+    """Spreads read-only sessions over fresh, healthy replicas in turn, falling back to the primary"""
+
+    def __init__(self, urls):
+        self.primary = ReadEngine("primary", engine, healthy=True)
+        self.replicas = [
+            ReadEngine(
+                f"replica{index}",
+                create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+            )
+            for index, url in enumerate(urls, start=1)
+        ]
+        self.fallbacks = 0
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def select(self) -> ReadEngine:
+        """Next replica that is healthy and within READ_REPLICA_MAX_LAG_SECONDS, or the primary"""
+        with self._lock:
+            candidates = [
+                replica for replica in self.replicas
+                if replica.healthy and replica.lag_seconds is not None
+                and replica.lag_seconds <= READ_REPLICA_MAX_LAG_SECONDS
+            ]
+            if candidates:
+                target = candidates[next(self._turn) % len(candidates)]
+            else:
+                target = self.primary
+                if self.replicas:
+                    self.fallbacks += 1
+            target.sessions += 1
+        return target
+
+    def mark_failed(self, target: ReadEngine, error: Exception) -> None:
+        """Take a replica out of rotation until its next successful check"""
+        with self._lock:
+            target.errors += 1
+            target.last_error = str(error).splitlines()[0] if str(error) else type(error).__name__
+            if target is not self.primary:
+                target.healthy = False
+
+    def check(self) -> dict:
+        """Measure each replica's reachability and replication lag"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    if replica.engine.dialect.name == "postgresql":
+                        lag = float(conn.execute(text(REPLICA_LAG_SQL)).scalar())
+                    else:
+                        conn.execute(text("SELECT 1"))
+                        lag = 0.0
+                with self._lock:
+                    replica.healthy, replica.lag_seconds = True, lag
+            except Exception as e:
+                self.mark_failed(replica, e)
+            replica.checked_at = datetime.now()
+        return {
+            "replicas": len(self.replicas),
+            "usable": sum(
+                1 for replica in self.replicas
+                if replica.healthy and replica.lag_seconds <= READ_REPLICA_MAX_LAG_SECONDS
+            )
+        }
+
+    def metrics(self) -> dict:
+        """Per-engine health and usage of read sessions"""
+        return {
+            "max_lag_seconds": READ_REPLICA_MAX_LAG_SECONDS,
+            "fallbacks_to_primary": self.fallbacks,
+            "engines": [self.primary.metrics()] + [replica.metrics() for replica in self.replicas]
+        }
+
+    async def run_health_checks(self) -> None:
+        """Re-check replicas every READ_REPLICA_CHECK_INTERVAL_SECONDS"""
+        if not self.replicas:
+            return
+        while True:
+            await asyncio.sleep(READ_REPLICA_CHECK_INTERVAL_SECONDS)
+            await asyncio.to_thread(self.check)
+
+read_router = ReadRouter(DATABASE_READ_URLS)
+
+def get_read_db():
+    """Session for read-only endpoints, served by a replica when one is usable"""
+    target = read_router.select()
+    db = target.session_factory()
+    try:
+        yield db
+    except Exception as e:
+        # Routes wrap database errors in HTTPException, so look at the cause too
+        cause = e if isinstance(e, OperationalError) else (e.__cause__ or e.__context__)
+        if isinstance(cause, OperationalError):
+            read_router.mark_failed(target, cause)
+        raise
+    finally:
+        db.close()
+
 def create_tables():
     """Create database tables"""
     Base.metadata.create_all(bind=engine)
+    upgrade_tables()
+
+def upgrade_tables():
+    """Add columns introduced after a table was first created"""
+    columns = {column["name"] for column in inspect(engine).get_columns(FormSubmissionDB.__tablename__)}
+    if "submitted_on" in columns:
+        return
+    
+    if engine.dialect.name == "postgresql":
+        backfill = "CAST(submitted_at AS TIMESTAMP)"
+    else:
+        backfill = "REPLACE(submitted_at, 'T', ' ')"
+    
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE form_submissions ADD COLUMN submitted_on TIMESTAMP"))
+        conn.execute(text(f"UPDATE form_submissions SET submitted_on = {backfill}"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_form_submissions_submitted_on ON form_submissions (submitted_on)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_form_submissions_form_title ON form_submissions (form_title)"))
+
+def is_partitioned() -> bool:
+    """Check whether the existing form_submissions table is partitioned"""
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'form_submissions')"
+        )).scalar()
+
+def warm_up_pool(connections: int) -> int:
+    """Open pool connections up front so first requests skip connection setup"""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        # Returning the connections keeps them open inside the pool
+        for conn in opened:
+            conn.close()
+    return len(opened)
 
 def generate_data_hash(data: dict) -> str:
     """Generate a hash from form data to prevent duplicates"""
@@ -41,6 +314,44 @@ def generate_data_hash(data: dict) -> str:
 
 def check_duplicate_submission(data: dict, db) -> bool:
     """Check if a submission with the same data already exists"""
-    data_hash = generate_data_hash(data)
-    existing = db.query(FormSubmissionDB).filter(FormSubmissionDB.data_hash == data_hash).first()
-    return existing is not None 
\ No newline at end of file
+    return check_duplicate_hash(generate_data_hash(data), db)
+
+def check_duplicate_hash(data_hash: str, db) -> bool:
+    """Check if a submission with the given data hash already exists"""
+    existing = db.query(FormSubmissionDB.id).filter(FormSubmissionDB.data_hash == data_hash).first()
+    return existing is not None
+
+class DuplicateSubmissionError(ValueError):
+    """A submission with the same data was committed by a concurrent submit"""
+
+def claim_data_hash(data_hash: str, session) -> None:
+    """
+    Reject a duplicate inside the write transaction on partitioned tables
+
+    Without a unique index on data_hash, two concurrent submits of the same data
+    would both pass check_duplicate_hash. A transaction-scoped advisory lock on
+    the hash serializes them until the first commits, so the re-check after it
+    sees the committed row. Unpartitioned tables rely on the unique index.
+    """
+    if not PARTITIONED:
+        return
+    session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:data_hash))"), {"data_hash": data_hash})
+    if check_duplicate_hash(data_hash, session):
+        raise DuplicateSubmissionError("Such data already exists in database")
+
+def add_submission(session, submission: FormSubmissionDB) -> None:
+    """
+    Insert a submission in the caller's write transaction
+
+    A duplicate raises DuplicateSubmissionError on every backend: from
+    claim_data_hash on partitioned tables, and from the unique index on
+    data_hash otherwise, e.g. for two identical submits in one SQLite batch.
+    """
+    claim_data_hash(submission.data_hash, session)
+    session.add(submission)
+    try:
+        session.flush()
+    except IntegrityError as e:
+        if "data_hash" in str(e.orig):
+            raise DuplicateSubmissionError("Such data already exists in database") from e
+        raise
@@ -1,25 +1,51 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 
-from config import ALLOWED_ORIGINS, HOST, PORT, DEBUG
-from routers import forms, submissions, statistics
-from database import create_tables
+from config import ALLOWED_ORIGINS, HOST, PORT, DEBUG, STARTUP_FAIL_FAST
+from routers import forms, submissions, statistics, events
+from database import read_router, storage
+from services.warmup_service import warmup_service
+from services.retention_service import retention_service
+from services.archive_service import archive_service
+from services.event_service import event_service
+from services.flatten_service import flatten_service
+from services.rollup_service import rollup_service
+from middleware.profiling import ProfilingMiddleware, profiling_enabled
+from middleware.admission import AdmissionControlMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.upload_limit import UploadSizeLimitMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan events for the application"""
-    # Startup
-    try:
-        create_tables()
-    except Exception as e:
-        # Server will run without database functionality
-        pass
+    # Startup - failures are reported by /ready instead of stopping the server, unless STARTUP_FAIL_FAST is set
+    if not warmup_service.run() and STARTUP_FAIL_FAST:
+        storage.stop()
+        raise RuntimeError(f"Startup failed: {warmup_service.errors}")
+    background_tasks = [
+        asyncio.create_task(retention_service.run_scheduler()),
+        asyncio.create_task(archive_service.run_scheduler()),
+        asyncio.create_task(event_service.run_listener()),
+        asyncio.create_task(flatten_service.run_scheduler()),
+        asyncio.create_task(rollup_service.run_scheduler()),
+        asyncio.create_task(read_router.run_health_checks())
+    ]
     
     yield
     
     # Shutdown
-    pass
+    for task in background_tasks:
+        task.cancel()
+    # Queued writes are committed before the process exits
+    storage.stop()
+    try:
+        rollup_service.flush()
+    except Exception:
+        # Counts not flushed are lost, like those of a crashed worker
+        pass
 
 app = FastAPI(
     title="Dynamic Form Generator API",
@@ -29,6 +55,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Upload size limit - counts the body as it arrives, before multipart parsing
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Compression - inside admission control, so its CPU time counts against the limits
+app.add_middleware(CompressionMiddleware)
+
+# Admission control - added before CORS so rejections still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -38,10 +73,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling middleware - only installed when a token or sample rate is configured
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(forms.router)
 app.include_router(submissions.router)
 app.include_router(statistics.router)
+app.include_router(events.router)
 
 @app.get("/")
 def read_root():
@@ -55,6 +95,17 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/database")
+def database_health():
+    """Storage backend, and health, replication lag and session counts of the primary and read replicas"""
+    return {"storage": storage.metrics(), **read_router.metrics()}
+
+@app.get("/ready")
+def readiness_check():
+    """Report whether startup warm-up finished successfully"""
+    status = warmup_service.get_status()
+    return JSONResponse(status_code=200 if warmup_service.ready else 503, content=status)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host=HOST, port=PORT, reload=DEBUG)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Admission control and load shedding
+
+Requests are admitted before they reach the threadpool and the database pool:
+- each route group (submit, list, statistics) has its own concurrency limit,
+  so expensive reads cannot take the slots form submissions need; a request
+  waits at most ADMISSION_QUEUE_TIMEOUT_MS for a slot and is then rejected
+  with 503
+- each client address has a token bucket (RATE_LIMIT_PER_SECOND,
+  RATE_LIMIT_BURST); requests over it are rejected with 429
+
+Both rejections carry Retry-After and cost no database work.
+"""
+
+import asyncio
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import (
+    ADMISSION_SUBMIT_CONCURRENCY, ADMISSION_LIST_CONCURRENCY, ADMISSION_STATISTICS_CONCURRENCY,
+    ADMISSION_QUEUE_TIMEOUT_MS, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS
+)
+
+ROUTE_GROUPS = (
+    ("submit", "POST", re.compile(r"^/forms/submit/?$"), ADMISSION_SUBMIT_CONCURRENCY),
+    # The list, search, summary pages and single submissions (which may be read from the archive)
+    ("list", "GET", re.compile(r"^/submissions/(search/?|summaries/?|\d+/?)?$"), ADMISSION_LIST_CONCURRENCY),
+    ("statistics", "GET", re.compile(r"^/statistics(/.*)?$"), ADMISSION_STATISTICS_CONCURRENCY),
+)
+
+# Probes must keep answering under load
+EXEMPT_PATHS = {"/health", "/ready"}
+
+
+class _ConcurrencyLimit:
+    """Concurrency limit with a bounded, time-limited wait queue"""
+
+    __slots__ = ("limit", "semaphore", "waiting", "rejected")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return True
+        if self.waiting >= self.limit or timeout <= 0:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        self.semaphore.release()
+
+
+class _TokenBuckets:
+    """Per-client token buckets in an LRU table of at most RATE_LIMIT_MAX_CLIENTS entries"""
+
+    __slots__ = ("rate", "burst", "max_clients", "buckets")
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> [tokens, last refill time]
+        self.buckets = OrderedDict()
+
+    def take(self, client: str) -> Optional[float]:
+        """Take a token, returning None if allowed or the seconds until one is available"""
+        now = time.monotonic()
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self.buckets[client] = bucket
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return None
+        return (1 - bucket[0]) / self.rate
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that sheds load per route group and rate-limits clients"""
+
+    def __init__(self, app):
+        self.app = app
+        self.queue_timeout = ADMISSION_QUEUE_TIMEOUT_MS / 1000
+        self.groups = [
+            (method, pattern, _ConcurrencyLimit(limit))
+            for _, method, pattern, limit in ROUTE_GROUPS if limit > 0
+        ]
+        self.rate_limiter = (
+            _TokenBuckets(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CLIENTS)
+            if RATE_LIMIT_PER_SECOND > 0 else None
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            client = scope["client"][0] if scope.get("client") else "unknown"
+            retry_after = self.rate_limiter.take(client)
+            if retry_after is not None:
+                await _reject(send, 429, "Too many requests", retry_after)
+                return
+
+        limit = next(
+            (limit for method, pattern, limit in self.groups
+             if scope["method"] == method and pattern.match(scope["path"])),
+            None
+        )
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limit.acquire(self.queue_timeout):
+            await _reject(send, 503, "Server is busy, please retry", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
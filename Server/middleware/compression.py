@@ -0,0 +1,192 @@
+"""
+Negotiated response compression
+
+Responses are compressed with the client's best accepted encoding among
+COMPRESSION_ENCODINGS (zstd and brotli when their packages are installed, gzip
+always). The encoder runs chunk by chunk and flushes after every chunk, so
+streamed and chunked responses reach the client as they are produced instead
+of being buffered. Bodies smaller than COMPRESSION_MIN_SIZE, non-text content,
+already encoded responses and event streams are passed through.
+
+Large chunks are compressed in the threadpool (the codecs release the GIL), so
+compressing a big submission list does not stall the event loop.
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    COMPRESSION_ENCODINGS, COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_LEVEL,
+    COMPRESSION_ZSTD_LEVEL
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Chunks at least this large are compressed off the event loop
+THREADPOOL_CHUNK_SIZE = 64 * 1024
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/javascript", "application/xml", "application/x-ndjson", "image/svg+xml"
+}
+# Event streams are latency-bound and made of small messages
+UNCOMPRESSED_TYPES = {"text/event-stream"}
+
+
+def available_encodings() -> list:
+    """Configured encodings whose codec is installed, in preference order"""
+    installed = {"zstd": zstandard is not None, "br": brotli is not None, "gzip": True}
+    return [encoding for encoding in COMPRESSION_ENCODINGS if installed.get(encoding)]
+
+
+def negotiate(accept_encoding: str, encodings: list) -> Optional[str]:
+    """Pick the encoding with the highest q-value, ties broken by server preference"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    mime = content_type.split(";", 1)[0].strip().lower()
+    if mime in UNCOMPRESSED_TYPES:
+        return False
+    return mime.startswith("text/") or mime in COMPRESSIBLE_TYPES or mime.endswith(("+json", "+xml"))
+
+
+class StreamEncoder:
+    """Incremental encoder for one response body"""
+
+    __slots__ = ("_compress", "_flush", "_finish")
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL if level is None else level).compressobj()
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_LEVEL if level is None else level)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk; everything given so far is decodable from the output"""
+        return self._compress(data) + (self._finish() if final else self._flush())
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses with the negotiated encoding"""
+
+    def __init__(self, app):
+        self.app = app
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"accept-encoding"), ""
+        )
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_length = headers.get(b"content-length")
+                if (
+                    message["status"] < 200 or message["status"] in (204, 304)
+                    or b"content-encoding" in headers or b"content-range" in headers
+                    or not _compressible(headers.get(b"content-type", b"").decode("latin-1"))
+                    or (content_length is not None and int(content_length) < COMPRESSION_MIN_SIZE)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held until the first chunk shows whether the body is worth compressing
+                    start = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                if not more_body and len(body) < COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = StreamEncoder(encoding)
+                headers = [
+                    (key, value) for key, value in start.get("headers", [])
+                    if key.lower() not in (b"content-length", b"vary", b"etag")
+                ]
+                vary = next((value for key, value in start.get("headers", []) if key.lower() == b"vary"), None)
+                etag = next((value for key, value in start.get("headers", []) if key.lower() == b"etag"), None)
+                headers.append((b"content-encoding", encoding.encode()))
+                headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                if etag is not None:
+                    # The encoded body is no longer byte-identical to the tagged one
+                    headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+                await send({**start, "headers": headers})
+
+            if not body and more_body:
+                return
+            if len(body) >= THREADPOOL_CHUNK_SIZE:
+                compressed = await run_in_threadpool(encoder.encode, body, not more_body)
+            else:
+                compressed = encoder.encode(body, not more_body)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,149 @@
+"""
+Opt-in per-request profiling
+
+Requests are profiled when they carry an X-Profile-Token header matching
+PROFILING_TOKEN, or when picked by PROFILING_SAMPLE_RATE. A profiled request
+gets a Server-Timing header with the stages recorded by the services and its
+cProfile output is written to PROFILING_DIR.
+
+Services mark their stages with profile_stage(); outside a profiled request
+it returns a shared no-op context manager.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import PROFILING_TOKEN, PROFILING_SAMPLE_RATE, PROFILING_DIR, PROFILING_MAX_FILES
+
+PROFILE_HEADER = b"x-profile-token"
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+_NO_OP_STAGE = nullcontext()
+
+
+class RequestProfile:
+    """Stage timings and cProfile data collected for a single request"""
+
+    __slots__ = ("stages", "profiler", "_depth")
+
+    def __init__(self):
+        self.stages = []
+        self.profiler = cProfile.Profile()
+        self._depth = 0
+
+    def stage(self, name: str) -> "_Stage":
+        return _Stage(self, name)
+
+    def server_timing(self, total_ms: float) -> str:
+        """Format the recorded stages as a Server-Timing header value"""
+        entries = [f"{name};dur={duration:.2f}" for name, duration in self.stages]
+        entries.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(entries)
+
+
+class _Stage:
+    """Times one stage and profiles it in the thread that runs it"""
+
+    __slots__ = ("profile", "name", "started")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        # Sync routes run in the threadpool, so the profiler is enabled here
+        # rather than in the middleware's event loop thread
+        if self.profile._depth == 0:
+            self.profile.profiler.enable()
+        self.profile._depth += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        self.profile._depth -= 1
+        if self.profile._depth == 0:
+            self.profile.profiler.disable()
+        self.profile.stages.append((self.name, duration_ms))
+        return False
+
+
+def profile_stage(name: str):
+    """Time a named stage of the current request when it is being profiled"""
+    request_profile = _current_profile.get()
+    if request_profile is None:
+        return _NO_OP_STAGE
+    return request_profile.stage(name)
+
+
+def profiling_enabled() -> bool:
+    """Whether the profiling middleware needs to be installed at all"""
+    return bool(PROFILING_TOKEN) or PROFILING_SAMPLE_RATE > 0
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-requested or sampled requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self.token = PROFILING_TOKEN.encode()
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+
+    def _should_profile(self, scope) -> bool:
+        if self.token:
+            for key, value in scope["headers"]:
+                if key == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_profile = RequestProfile()
+        context_token = _current_profile.set(request_profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", request_profile.server_timing(total_ms).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(context_token)
+            await run_in_threadpool(_write_profile, request_profile, scope)
+
+
+def _write_profile(request_profile: RequestProfile, scope) -> None:
+    """Dump the request profile and rotate old profile files"""
+    if not request_profile.stages:
+        return
+
+    path_slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+    file_name = f"{time.strftime('%Y%m%dT%H%M%S')}_{time.time_ns() % 1_000_000:06d}_{scope['method']}_{path_slug}.prof"
+    request_profile.profiler.dump_stats(os.path.join(PROFILING_DIR, file_name))
+
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILING_DIR) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(len(profiles) - PROFILING_MAX_FILES, 0)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,59 @@
+"""
+Upload size limit
+
+Schema uploads larger than SCHEMA_MAX_UPLOAD_BYTES are rejected with 413.
+A declared Content-Length over the limit is rejected before the body is read;
+otherwise the body is counted as it is received and the request fails as soon
+as the limit is passed, so an oversized upload is never spooled in full.
+"""
+
+import json
+
+from fastapi import HTTPException
+
+from config import SCHEMA_MAX_UPLOAD_BYTES
+
+# Request bodies limited per (method, path)
+LIMITS = {("POST", "/forms/upload-schema"): SCHEMA_MAX_UPLOAD_BYTES}
+
+
+def _too_large_detail(limit: int) -> str:
+    return f"Upload exceeds the maximum size of {limit} bytes"
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that enforces request body limits while the body streams in"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = LIMITS.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = next((value for key, value in scope["headers"] if key == b"content-length"), None)
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            body = json.dumps({"detail": _too_large_detail(limit)}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing and rendered by the exception handlers
+                    raise HTTPException(status_code=413, detail=_too_large_detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
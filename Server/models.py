@@ -15,7 +15,7 @@ Imports:
 from models.field_models import DropdownOption, FieldValidation, FieldErrorMessages
 from models.form_field import FormField
 from models.form_schema import FormSchema
-from models.submission import FormSubmission, FormSubmissionResponse
+from models.submission import FormSubmission, FormSubmissionResponse, FieldValidationRequest, PurgeJobRequest
 from models.form_model_generator import DynamicFormSubmissionGenerator
 
 # Re-export all models for backward compatibility
@@ -27,5 +27,7 @@ __all__ = [
     'FormSchema',
     'FormSubmission',
     'FormSubmissionResponse',
+    'FieldValidationRequest',
+    'PurgeJobRequest',
     'DynamicFormSubmissionGenerator'
 ] 
\ No newline at end of file
@@ -8,8 +8,9 @@ validation, and submission handling.
 from .field_models import DropdownOption, FieldValidation, FieldErrorMessages
 from .form_field import FormField
 from .form_schema import FormSchema
-from .submission import FormSubmission, FormSubmissionResponse
+from .submission import FormSubmission, FormSubmissionResponse, FieldValidationRequest, PurgeJobRequest
 from .form_model_generator import DynamicFormSubmissionGenerator
+from .compiled_form import CompiledForm, CompiledFormCache
 
 __all__ = [
     'DropdownOption',
@@ -19,5 +20,9 @@ __all__ = [
     'FormSchema',
     'FormSubmission',
     'FormSubmissionResponse',
-    'DynamicFormSubmissionGenerator'
+    'FieldValidationRequest',
+    'PurgeJobRequest',
+    'DynamicFormSubmissionGenerator',
+    'CompiledForm',
+    'CompiledFormCache'
 ] 
\ No newline at end of file
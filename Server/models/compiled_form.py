@@ -0,0 +1,458 @@
+"""
+Compiled form representation
+
+A FormSchema keeps the full Pydantic tree of a form. Each field, validation
+rule set and error-message set carries a dict of mostly-None attributes, and
+validation needs a generated model class per form. CompiledForm is the compact
+runtime form that submissions are validated against:
+- fields are __slots__ objects with interned names and types
+- constraints are one __slots__ record per field; fields without a pattern
+  share records with identical limits
+- error-message tables are interned, so fields and forms with the same
+  messages share one table
+- option indexes and compiled patterns are taken over from the schema
+
+Validation runs the same field validators as the generated Pydantic model and
+reports the same messages. Forms with conditional or computed fields are
+validated along their FieldGraph instead, one evaluation per field.
+"""
+
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .form_schema import FormSchema
+from .validators import (
+    validate_text_field,
+    validate_email_field,
+    validate_password_field,
+    validate_date_field,
+    validate_number_field,
+    validate_dropdown_field,
+    validate_multiselect_field
+)
+
+CONSTRAINT_NAMES = (
+    "minLength", "maxLength", "min", "max", "minDate", "maxDate", "pattern", "minSelections", "maxSelections"
+)
+MESSAGE_NAMES = (
+    "required", "minLength", "maxLength", "min", "max", "minDate", "maxDate", "email", "pattern",
+    "invalidOption", "minSelections", "maxSelections"
+)
+
+# Messages Pydantic reports when an optional field's empty value does not fit its annotation
+_EMPTY_VALUE_ERRORS = {
+    "string": ["Input should be a valid string"],
+    "number": ["Input should be a valid integer", "Input should be a valid number", "Input should be a valid string"],
+    "list": ["Input should be a valid list"],
+}
+
+
+class FieldConstraints:
+    """Validation limits of a field, read by the field validators like FieldValidation"""
+
+    __slots__ = CONSTRAINT_NAMES + ("compiled_pattern", "__weakref__")
+
+    def __init__(self, values: Tuple[Any, ...], compiled_pattern=None):
+        for name, value in zip(CONSTRAINT_NAMES, values):
+            setattr(self, name, value)
+        self.compiled_pattern = compiled_pattern
+
+
+class ErrorMessageTable:
+    """Custom error messages of a field, read by the field validators like FieldErrorMessages"""
+
+    __slots__ = MESSAGE_NAMES + ("__weakref__",)
+
+    def __init__(self, values: Tuple[Optional[str], ...]):
+        for name, value in zip(MESSAGE_NAMES, values):
+            setattr(self, name, value)
+
+
+_interned_constraints = weakref.WeakValueDictionary()
+_interned_messages = weakref.WeakValueDictionary()
+_intern_lock = threading.Lock()
+
+
+def _intern(table: weakref.WeakValueDictionary, key: Tuple[Any, ...], factory):
+    """Shared instance for equal values, kept only while some compiled form uses it"""
+    with _intern_lock:
+        instance = table.get(key)
+        if instance is None:
+            instance = factory()
+            table[key] = instance
+        return instance
+
+
+def _intern_value(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class CompiledField:
+    """A form field reduced to what validation needs"""
+
+    __slots__ = (
+        "name", "label", "type", "required", "constraints", "messages", "options",
+        "visible_when", "required_when", "compute"
+    )
+
+    def __init__(self, field):
+        self.name = sys.intern(field.name)
+        self.label = field.label
+        self.type = sys.intern(field.type)
+        self.required = field.required
+        self.options = field.option_index
+
+        expressions = field.expressions or {}
+        self.visible_when = expressions.get("visibleWhen")
+        self.required_when = expressions.get("requiredWhen")
+        self.compute = expressions.get("compute")
+
+        validation = field.validation
+        if validation is None:
+            self.constraints = None
+        else:
+            values = tuple(_intern_value(getattr(validation, name)) for name in CONSTRAINT_NAMES)
+            if validation.pattern:
+                # Patterns keep per-field metrics, so they are not shared
+                self.constraints = FieldConstraints(values, validation.compiled_pattern)
+            else:
+                # Type is part of the key so 1 and 1.0 keep their own message formatting
+                key = tuple((type(value), value) for value in values)
+                self.constraints = _intern(_interned_constraints, key, lambda: FieldConstraints(values))
+
+        messages = field.errorMessages
+        if messages is None:
+            self.messages = None
+        else:
+            values = tuple(_intern_value(getattr(messages, name)) for name in MESSAGE_NAMES)
+            self.messages = _intern(_interned_messages, values, lambda: ErrorMessageTable(values))
+
+    def check(self, value: Any, required: Optional[bool] = None) -> Any:
+        """
+        Validate a present value
+
+        Args:
+            value: The submitted or computed value
+            required: Overrides the field's own flag, for requiredWhen
+
+        Returns:
+            The cleaned value
+
+        Raises:
+            ValueError: If the value is invalid
+        """
+        if required is None:
+            required = self.required
+        if not required and (value is None or value == "" or value == []):
+            errors = self._empty_value_errors(value) if value is not None else None
+            if errors:
+                raise _EmptyValueError(errors)
+            return value
+
+        field_type = self.type
+        if field_type == "text":
+            return validate_text_field(value, self.constraints, self.messages)
+        if field_type == "email":
+            return validate_email_field(value, self.messages)
+        if field_type == "password":
+            return validate_password_field(value, self.constraints, self.messages)
+        if field_type == "date":
+            return validate_date_field(value, self.constraints, self.messages)
+        if field_type == "number":
+            return validate_number_field(value, self.constraints, self.messages)
+        if field_type == "dropdown":
+            return validate_dropdown_field(value, self.options, self.messages)
+        if field_type == "multiselect":
+            return validate_multiselect_field(value, self.options, self.constraints, self.messages)
+        return value
+
+    def _empty_value_errors(self, value: Any) -> Optional[List[str]]:
+        if self.type == "multiselect":
+            return _EMPTY_VALUE_ERRORS["list"] if value == "" else None
+        if value == []:
+            return _EMPTY_VALUE_ERRORS["number" if self.type == "number" else "string"]
+        return None
+
+
+class _EmptyValueError(Exception):
+    """An optional field's empty value has the wrong type; carries Pydantic's messages"""
+
+    def __init__(self, messages: List[str]):
+        super().__init__(messages)
+        self.messages = messages
+
+
+class CompiledForm:
+    """
+    Immutable runtime form: its fields, label lookups and validation
+
+    Attributes:
+        title: The form title
+        fields: Compiled fields in schema order
+        graph: Dependency graph of the conditional and computed fields; None for a static form
+        fields_mapping: Field name to label
+        option_labels: Option value to label, per dropdown and multiselect field
+        nbytes: Estimated memory held by this form
+    """
+
+    __slots__ = ("title", "fields", "fields_by_name", "graph", "fields_mapping", "option_labels", "nbytes")
+
+    def __init__(self, form_schema: FormSchema):
+        # Like model annotations, a repeated field name keeps its first position and its last definition
+        fields_by_name = {}
+        for field in form_schema.fields:
+            fields_by_name[sys.intern(field.name)] = CompiledField(field)
+
+        self.title = form_schema.title
+        self.fields = tuple(fields_by_name.values())
+        self.fields_by_name = fields_by_name
+        self.graph = form_schema.field_graph
+        self.fields_mapping = {f.name: f.label for f in form_schema.fields}
+        self.option_labels = {
+            field.name: field.options.labels_by_value
+            for field in self.fields
+            if field.type in ("dropdown", "multiselect") and field.options
+        }
+        self.nbytes = deep_sizeof(self)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "nbytes"):
+            raise AttributeError("CompiledForm is immutable")
+        object.__setattr__(self, name, value)
+
+    def validate(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+        """
+        Validate a full submission
+
+        Returns:
+            The cleaned data (every field, None for missing optional and
+            hidden ones, the evaluated value for computed ones) and the
+            errors per field, formatted like Pydantic's
+        """
+        if self.graph is not None:
+            cleaned, errors, _ = self._evaluate(data, self.graph.order)
+            # Fields were evaluated in dependency order; results keep schema order
+            return (
+                {field.name: cleaned[field.name] for field in self.fields if field.name in cleaned},
+                {field.name: errors[field.name] for field in self.fields if field.name in errors}
+            )
+
+        cleaned = {}
+        errors = {}
+        for field in self.fields:
+            if field.name in data:
+                self._check_into(field, data[field.name], cleaned, errors)
+            elif field.required:
+                errors[field.name] = ["Field required"]
+            else:
+                cleaned[field.name] = None
+        return cleaned, errors
+
+    def validate_fields(self, data: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Validate some fields of a submission; unknown fields are ignored"""
+        if self.graph is not None:
+            return self.evaluate_fields(data, fields)[0]
+
+        errors = {}
+        for field_name in (fields if fields is not None else data.keys()):
+            field = self.fields_by_name.get(field_name)
+            if field is None:
+                continue
+            if field_name in data:
+                self._check_into(field, data[field_name], {}, errors)
+            elif field.required:
+                errors.setdefault(field_name, []).append("Field required")
+        return errors
+
+    def evaluate_fields(self, data: Dict[str, Any], fields: Optional[List[str]] = None
+                        ) -> Tuple[Dict[str, List[str]], Optional[Dict[str, Dict[str, Any]]]]:
+        """
+        Re-evaluate a form after some fields changed
+
+        Only the changed fields and the fields downstream of them are
+        evaluated, each once. Fields upstream of them are not re-evaluated:
+        an expression reads their value from data, as the client last saw it
+        (computed values included), and a field missing from data reads as
+        None. Submit always evaluates the whole form.
+
+        Returns:
+            The errors of the changed and downstream computed fields, and the
+            state (visible, required, computed value) of every downstream
+            field; None for a static form
+        """
+        if self.graph is None:
+            return self.validate_fields(data, fields), None
+
+        changed = [name for name in (fields if fields is not None else data.keys()) if name in self.fields_by_name]
+        affected = self.graph.downstream(changed)
+        inputs = {
+            dependency for name in affected for dependency in self.graph.dependencies[name]
+        }.difference(affected)
+        values = {name: self._input_value(name, data) for name in inputs}
+        _, errors, states = self._evaluate(data, self.graph.in_order(affected), values)
+
+        reported = set(changed)
+        reported.update(name for name in affected if self.fields_by_name[name].compute is not None)
+        return (
+            {name: errors[name] for name in self.graph.in_order(reported) if name in errors},
+            {name: states[name] for name in self.graph.in_order(affected)}
+        )
+
+    def _input_value(self, name: str, data: Dict[str, Any]) -> Any:
+        """Cleaned value of a field that is read but not evaluated; None if missing or invalid"""
+        if name not in data:
+            return None
+        try:
+            return self.fields_by_name[name].check(data[name])
+        except (ValueError, _EmptyValueError):
+            return None
+
+    def _evaluate(self, data: Dict[str, Any], names: List[str], values: Optional[Dict[str, Any]] = None
+                  ) -> Tuple[Dict[str, Any], Dict[str, List[str]], Dict[str, Dict[str, Any]]]:
+        """
+        Validate fields in dependency order, each once
+
+        Expressions read the values of fields evaluated before them: the
+        cleaned value, or None for a missing, invalid or hidden field.
+
+        Args:
+            data: The submitted values
+            names: The fields to evaluate, in dependency order
+            values: Values of fields that are read but not evaluated
+
+        Returns:
+            The cleaned data, the errors and the state of each field
+        """
+        cleaned = {}
+        errors = {}
+        states = {}
+        values = dict(values) if values else {}
+        for name in names:
+            field = self.fields_by_name[name]
+            values[name] = None
+            if field.visible_when is not None and not field.visible_when.test(values):
+                cleaned[name] = None
+                states[name] = {"visible": False, "required": False, "value": None}
+                continue
+
+            required = field.required or (field.required_when is not None and field.required_when.test(values))
+            if field.compute is not None:
+                value = field.compute.evaluate(values)
+                present = value is not None
+            else:
+                value = data.get(name)
+                present = name in data
+
+            if present:
+                self._check_into(field, value, cleaned, errors, required)
+            elif required:
+                errors[name] = ["Field required"]
+            else:
+                cleaned[name] = None
+            values[name] = cleaned.get(name)
+            states[name] = {
+                "visible": True,
+                "required": required,
+                "value": values[name] if field.compute is not None else None
+            }
+        return cleaned, errors, states
+
+    @staticmethod
+    def _check_into(field: CompiledField, value: Any, cleaned: Dict[str, Any], errors: Dict[str, List[str]],
+                    required: Optional[bool] = None) -> None:
+        try:
+            cleaned[field.name] = field.check(value, required)
+        except _EmptyValueError as e:
+            errors.setdefault(field.name, []).extend(e.messages)
+        except ValueError as e:
+            errors.setdefault(field.name, []).append(f"Value error, {e}")
+
+    def compiled_patterns(self) -> list:
+        """Compiled patterns of the form's fields, in field order"""
+        return [
+            field.constraints.compiled_pattern for field in self.fields
+            if field.constraints is not None and field.constraints.compiled_pattern is not None
+        ]
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by an object graph, counting shared objects once"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or obj is None or isinstance(obj, (bool, type)):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif not isinstance(obj, (str, bytes, int, float)):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name != "__weakref__" and hasattr(obj, name):
+                    size += deep_sizeof(getattr(obj, name), seen)
+        if hasattr(obj, "__dict__"):
+            size += deep_sizeof(obj.__dict__, seen)
+    return size
+
+
+class CompiledFormCache:
+    """LRU cache of compiled forms, bounded by their estimated memory"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._forms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CompiledForm]:
+        with self._lock:
+            form = self._forms.get(key)
+            if form is None:
+                self.misses += 1
+                return None
+            self._forms.move_to_end(key)
+            self.hits += 1
+            return form
+
+    def put(self, key: str, form: CompiledForm) -> None:
+        with self._lock:
+            previous = self._forms.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._forms[key] = form
+            self.nbytes += form.nbytes
+            # The newest form is always kept, even if it alone exceeds the budget
+            while self.nbytes > self.max_bytes and len(self._forms) > 1:
+                _, evicted = self._forms.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_or_compile(self, key: str, form_schema: FormSchema) -> CompiledForm:
+        """Compiled form for a schema, compiling it on a miss"""
+        form = self.get(key)
+        if form is None:
+            form = CompiledForm(form_schema)
+            self.put(key, form)
+        return form
+
+    def __len__(self) -> int:
+        return len(self._forms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "forms": len(self._forms),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
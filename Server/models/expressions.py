@@ -0,0 +1,312 @@
+"""
+Field expressions and the field dependency graph
+
+Conditional and computed fields are described by small expressions over other
+fields' values:
+- visibleWhen: the field is shown (and validated) only while this is true
+- requiredWhen: the field is required while this is true
+- compute: the field's value is derived from other fields, e.g. "price * quantity"
+
+Expressions use a restricted Python expression syntax and are never passed to
+eval. They are parsed once, when the schema is parsed, and compiled into a tree
+of closures; only these constructs are accepted:
+- literals (strings, numbers, True, False, None) and lists of them
+- field names, which read the field's validated value (None when the field
+  is missing, invalid or hidden)
+- and, or, not, comparisons (==, !=, <, <=, >, >=, in, not in), and x if c else y
+- unary - and +, and the operators + - * / %; * and % take numbers only
+- the functions len, min, max, abs, round and sum
+
+An expression that fails while evaluated (a missing value in arithmetic, a
+division by zero) evaluates to None, which counts as false in a condition.
+
+FieldGraph links fields to the fields their expressions read. It rejects
+unknown references and cycles when the schema is uploaded, and orders the
+fields so each one is evaluated after everything it depends on.
+"""
+
+import ast
+import operator
+from collections import deque
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_EXPRESSION_NODES = 100
+MAX_ROUND_DIGITS = 20
+
+EXPRESSION_KEYS = ("visibleWhen", "requiredWhen", "compute")
+
+_NUMBER_TYPES = (int, float)
+
+
+def _multiply(left, right):
+    # Without this, "text" * 10 ** 6 would build arbitrarily large strings
+    if not (isinstance(left, _NUMBER_TYPES) and isinstance(right, _NUMBER_TYPES)):
+        raise TypeError("* multiplies numbers only")
+    return left * right
+
+
+def _modulo(left, right):
+    # On strings % is printf formatting: "%0400000000d" % 1 builds a 400 MB string
+    if not (isinstance(left, _NUMBER_TYPES) and isinstance(right, _NUMBER_TYPES)):
+        raise TypeError("% takes numbers only")
+    return left % right
+
+
+def _round(value, digits=None):
+    # round(5, -10 ** 9) computes 10 ** 10 ** 9
+    if digits is not None and (not isinstance(digits, int) or abs(digits) > MAX_ROUND_DIGITS):
+        raise ValueError(f"round takes at most {MAX_ROUND_DIGITS} digits")
+    return round(value, digits)
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.Mod: _modulo,
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+}
+_UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Not: operator.not_,
+}
+_FUNCTIONS = {
+    "len": len,
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "round": _round,
+    "sum": sum,
+}
+_EVALUATION_ERRORS = (TypeError, ValueError, ArithmeticError)
+
+
+class Expression:
+    """
+    A parsed field expression
+
+    Attributes:
+        source: The expression text
+        references: Names of the fields the expression reads
+    """
+
+    __slots__ = ("source", "references", "_evaluate")
+
+    def __init__(self, source: str):
+        if not isinstance(source, str) or not source.strip():
+            raise ValueError("Expression must be a non-empty string")
+        if len(source) > MAX_EXPRESSION_LENGTH:
+            raise ValueError(f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters")
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression '{source}': {e.msg}")
+        if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+            raise ValueError(f"Expression '{source}' has more than {MAX_EXPRESSION_NODES} parts")
+
+        references = set()
+        self.source = source
+        self._evaluate = _compile(tree.body, references, source)
+        self.references = frozenset(references)
+
+    def evaluate(self, values: Dict[str, Any]) -> Any:
+        """Evaluate against field values; failures evaluate to None"""
+        try:
+            return self._evaluate(values)
+        except _EVALUATION_ERRORS:
+            return None
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        """Evaluate as a condition"""
+        return bool(self.evaluate(values))
+
+
+def _compile(node: ast.AST, references: set, source: str) -> Callable[[Dict[str, Any]], Any]:
+    """Compile an expression node into a closure over the field values"""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if value is not None and not isinstance(value, (str, bool, int, float)):
+            raise ValueError(f"Unsupported literal in expression '{source}'")
+        return lambda values: value
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        references.add(name)
+        return lambda values: values.get(name)
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_compile(item, references, source) for item in node.elts]
+        return lambda values: [item(values) for item in items]
+
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile(operand, references, source) for operand in node.values]
+        if isinstance(node.op, ast.And):
+            def evaluate_and(values):
+                result = True
+                for operand in operands:
+                    result = operand(values)
+                    if not result:
+                        return result
+                return result
+            return evaluate_and
+
+        def evaluate_or(values):
+            result = False
+            for operand in operands:
+                result = operand(values)
+                if result:
+                    return result
+            return result
+        return evaluate_or
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        function = _UNARY_OPERATORS[type(node.op)]
+        operand = _compile(node.operand, references, source)
+        return lambda values: function(operand(values))
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        function = _BINARY_OPERATORS[type(node.op)]
+        left = _compile(node.left, references, source)
+        right = _compile(node.right, references, source)
+        return lambda values: function(left(values), right(values))
+
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPERATORS for op in node.ops):
+        first = _compile(node.left, references, source)
+        comparisons = [
+            (_COMPARE_OPERATORS[type(op)], _compile(comparator, references, source))
+            for op, comparator in zip(node.ops, node.comparators)
+        ]
+
+        def evaluate_compare(values):
+            left = first(values)
+            for function, comparator in comparisons:
+                right = comparator(values)
+                if not function(left, right):
+                    return False
+                left = right
+            return True
+        return evaluate_compare
+
+    if isinstance(node, ast.IfExp):
+        test = _compile(node.test, references, source)
+        body = _compile(node.body, references, source)
+        orelse = _compile(node.orelse, references, source)
+        return lambda values: body(values) if test(values) else orelse(values)
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS:
+            raise ValueError(f"Unsupported function in expression '{source}'; allowed: {sorted(_FUNCTIONS)}")
+        if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise ValueError(f"Unsupported call arguments in expression '{source}'")
+        function = _FUNCTIONS[node.func.id]
+        arguments = [_compile(arg, references, source) for arg in node.args]
+        return lambda values: function(*(argument(values) for argument in arguments))
+
+    raise ValueError(f"Unsupported syntax '{type(node).__name__}' in expression '{source}'")
+
+
+class FieldGraph:
+    """
+    Dependency DAG of a form's fields
+
+    A field depends on every field its expressions read. Fields without
+    expressions that nothing reads are still nodes, so the order covers the
+    whole form.
+
+    Attributes:
+        order: Field names in evaluation order; dependencies come first and
+            independent fields keep their schema order
+        position: Field name to its index in order
+        dependencies: Field name to the fields it reads
+        dependents: Field name to the fields that read it
+    """
+
+    __slots__ = ("order", "position", "dependencies", "dependents")
+
+    def __init__(self, names: List[str], expressions: Dict[str, Dict[str, Expression]]):
+        known = set(names)
+        dependencies: Dict[str, FrozenSet[str]] = {}
+        for name in names:
+            references = set()
+            for key, expression in expressions.get(name, {}).items():
+                unknown = sorted(expression.references - known)
+                if unknown:
+                    raise ValueError(f"Field '{name}' {key} refers to unknown fields: {unknown}")
+                references |= expression.references
+            dependencies[name] = frozenset(references)
+
+        dependents: Dict[str, List[str]] = {name: [] for name in names}
+        for name in names:
+            for dependency in dependencies[name]:
+                dependents[dependency].append(name)
+
+        self.order = self._topological_order(names, dependencies, dependents)
+        self.position = {name: index for index, name in enumerate(self.order)}
+        self.dependencies = dependencies
+        self.dependents = {name: tuple(readers) for name, readers in dependents.items()}
+
+    @staticmethod
+    def _topological_order(names: List[str], dependencies: Dict[str, FrozenSet[str]],
+                           dependents: Dict[str, List[str]]) -> Tuple[str, ...]:
+        """Kahn's algorithm, taking ready fields in schema order"""
+        schema_position = {name: index for index, name in enumerate(names)}
+        remaining = {name: len(dependencies[name]) for name in names}
+        ready = deque(name for name in names if not remaining[name])
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            released = []
+            for reader in dependents[name]:
+                remaining[reader] -= 1
+                if not remaining[reader]:
+                    released.append(reader)
+            ready.extend(sorted(released, key=schema_position.__getitem__))
+
+        if len(order) != len(names):
+            cycle = sorted(name for name in names if remaining[name])
+            raise ValueError(f"Field expressions form a cycle between: {cycle}")
+        return tuple(order)
+
+    def downstream(self, names) -> FrozenSet[str]:
+        """The given fields and every field that depends on them, directly or not"""
+        return self._closure(names, self.dependents)
+
+    def upstream(self, names) -> FrozenSet[str]:
+        """The given fields and every field they depend on, directly or not"""
+        return self._closure(names, self.dependencies)
+
+    @staticmethod
+    def _closure(names, edges) -> FrozenSet[str]:
+        seen = set(names)
+        pending = list(seen)
+        while pending:
+            for neighbour in edges.get(pending.pop(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    pending.append(neighbour)
+        return frozenset(seen)
+
+    def in_order(self, names) -> List[str]:
+        """The given fields sorted into evaluation order"""
+        return sorted(names, key=self.position.__getitem__)
+
+
+def parse_field_expressions(field: Any) -> Optional[Dict[str, Expression]]:
+    """The parsed expressions of a field, keyed like the schema; None when it has none"""
+    expressions = {
+        key: Expression(getattr(field, key)) for key in EXPRESSION_KEYS if getattr(field, key) is not None
+    }
+    return expressions or None
@@ -5,9 +5,12 @@ This module contains the foundational Pydantic models used for defining
 form schemas and their components.
 """
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, validator
 from typing import List, Optional, Union
 from datetime import date, datetime
+import re
+
+from .validators.patternMatcher import CompiledPattern
 
 class DropdownOption(BaseModel):
     """
@@ -35,6 +38,33 @@ class FieldValidation(BaseModel):
     maxDate: Optional[str] = None
     email: Optional[bool] = None
     pattern: Optional[str] = None
+    minSelections: Optional[int] = None
+    maxSelections: Optional[int] = None
+    
+    _compiled_pattern: Optional[CompiledPattern] = PrivateAttr(default=None)
+    
+    @field_validator('pattern')
+    @classmethod
+    def validate_pattern(cls, v):
+        """
+        Validates that the pattern is a valid regular expression
+        
+        Raises:
+            ValueError: If the pattern does not compile
+        """
+        if v is not None:
+            try:
+                re.compile(v)
+            except re.error as e:
+                raise ValueError(f'Invalid pattern: {e}')
+        return v
+    
+    @property
+    def compiled_pattern(self) -> Optional[CompiledPattern]:
+        """The pattern compiled once, with its engine chosen by analysis"""
+        if self.pattern and self._compiled_pattern is None:
+            self._compiled_pattern = CompiledPattern(self.pattern)
+        return self._compiled_pattern
 
 class FieldErrorMessages(BaseModel):
     """
@@ -51,4 +81,6 @@ class FieldErrorMessages(BaseModel):
     maxDate: Optional[str] = None
     email: Optional[str] = None
     pattern: Optional[str] = None
-    invalidOption: Optional[str] = None 
\ No newline at end of file
+    invalidOption: Optional[str] = None
+    minSelections: Optional[str] = None
+    maxSelections: Optional[str] = None 
\ No newline at end of file
@@ -5,10 +5,13 @@ This module contains the FormField model which represents a single field
 in a dynamic form with its validation rules and error messages.
 """
 
-from pydantic import BaseModel, field_validator
-from typing import List, Optional
+from pydantic import BaseModel, PrivateAttr, field_validator, model_validator
+from typing import Dict, List, Optional
 
 from .field_models import FieldValidation, FieldErrorMessages, DropdownOption
+from .validators.patternMatcher import CompiledPattern
+from .option_index import OptionIndex
+from .expressions import Expression, parse_field_expressions
 
 class FormField(BaseModel):
     """
@@ -20,11 +23,14 @@ class FormField(BaseModel):
     Attributes:
         name: Unique identifier for the field
         label: Display name shown to users
-        type: Field type (text, email, password, date, number, dropdown)
+        type: Field type (text, email, password, date, number, dropdown, multiselect)
         required: Whether the field is mandatory
         validation: Validation rules for the field
         errorMessages: Custom error messages in Hebrew
-        options: Available options for dropdown fields
+        options: Available options for dropdown and multiselect fields
+        visibleWhen: Expression; the field is shown and validated only while it is true
+        requiredWhen: Expression; the field is required while it is true
+        compute: Expression deriving the field's value from other fields
     """
     name: str
     label: str
@@ -33,6 +39,22 @@ class FormField(BaseModel):
     validation: Optional[FieldValidation] = None
     errorMessages: Optional[FieldErrorMessages] = None
     options: Optional[List[DropdownOption]] = None
+    visibleWhen: Optional[str] = None
+    requiredWhen: Optional[str] = None
+    compute: Optional[str] = None
+    
+    _option_index: Optional[OptionIndex] = PrivateAttr(default=None)
+    _expressions: Optional[Dict[str, Expression]] = PrivateAttr(default=None)
+    
+    @property
+    def option_index(self) -> Optional[OptionIndex]:
+        """Value/label lookups and prefix search over the field's options"""
+        return self._option_index
+    
+    @property
+    def expressions(self) -> Optional[Dict[str, Expression]]:
+        """Parsed visibleWhen, requiredWhen and compute expressions, if any"""
+        return self._expressions
 
     @field_validator('type')
     @classmethod
@@ -49,7 +71,7 @@ class FormField(BaseModel):
         Raises:
             ValueError: If the field type is not supported
         """
-        allowed_types = ['text', 'email', 'password', 'date', 'number', 'dropdown']
+        allowed_types = ['text', 'email', 'password', 'date', 'number', 'dropdown', 'multiselect']
         if v not in allowed_types:
             raise ValueError(f'Field type must be one of: {allowed_types}')
         return v
@@ -58,7 +80,7 @@ class FormField(BaseModel):
     @classmethod
     def validate_dropdown_options(cls, v, info):
         """
-        Validates that dropdown fields have options defined
+        Validates that dropdown and multiselect fields have options defined
         
         Args:
             v: The options list
@@ -68,8 +90,51 @@ class FormField(BaseModel):
             The validated options list
             
         Raises:
-            ValueError: If dropdown field has no options
+            ValueError: If dropdown or multiselect field has no options
+        """
+        field_type = info.data.get('type')
+        if field_type in ('dropdown', 'multiselect') and not v:
+            raise ValueError(f'{field_type.capitalize()} fields must have options')
+        return v 
+
+    @model_validator(mode='after')
+    def compile_pattern(self):
+        """
+        Compiles the field's pattern once, when the schema is parsed
+        
+        The pattern is analysed for catastrophic backtracking and bound to
+        the engine that will run it, so per-field metrics can be reported.
+        
+        Raises:
+            ValueError: If the pattern is unsafe and PATTERN_REJECT_UNSAFE is set
+        """
+        if self.validation and self.validation.pattern:
+            self.validation._compiled_pattern = CompiledPattern(self.validation.pattern, self.name)
+        return self
+
+
+    @model_validator(mode='after')
+    def build_option_index(self):
+        """
+        Builds the option index once, when the schema is parsed
+        
+        Validation, label resolution and option search then use hash and
+        bisect lookups instead of scanning the option list.
+        """
+        if self.options:
+            self._option_index = OptionIndex(self.options)
+        return self
+
+    @model_validator(mode='after')
+    def parse_expressions(self):
+        """
+        Parses the field's expressions once, when the schema is parsed
+        
+        References to other fields are checked by FormSchema, which sees
+        the whole form.
+        
+        Raises:
+            ValueError: If an expression is invalid or uses unsupported syntax
         """
-        if info.data.get('type') == 'dropdown' and not v:
-            raise ValueError('Dropdown fields must have options')
-        return v 
\ No newline at end of file
+        self._expressions = parse_field_expressions(self)
+        return self
@@ -6,7 +6,7 @@ Pydantic models dynamically based on form schemas for validation purposes.
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Dict, Any, Union, Optional, Type
+from typing import Dict, Any, List, Union, Optional, Type, Tuple
 
 from .form_schema import FormSchema
 from .validators import (
@@ -15,7 +15,8 @@ from .validators import (
     validate_password_field,
     validate_date_field,
     validate_number_field,
-    validate_dropdown_field
+    validate_dropdown_field,
+    validate_multiselect_field
 )
 
 class DynamicFormSubmissionGenerator:
@@ -51,100 +52,14 @@ class DynamicFormSubmissionGenerator:
         defaults = {}
         
         for field in form_schema.fields:
-            field_name = field.name
-            field_type = field.type
-            field_required = field.required
-            field_validation = field.validation
-            field_error_messages = field.errorMessages
-            
-            # Create validator function for this field
-            def create_field_validator(field_info):
-                """
-                Creates a validator function for a specific field
-                
-                Args:
-                    field_info: Dictionary containing field configuration
-                    
-                Returns:
-                    A validator function for the field
-                """
-                @field_validator(field_info['name'], mode='before')
-                def validate_field(cls, v):
-                    """
-                    Validates a field value according to its type and rules
-                    
-                    Args:
-                        cls: The model class (unused)
-                        v: The value to validate
-                        
-                    Returns:
-                        The validated value
-                        
-                    Raises:
-                        ValueError: If validation fails
-                    """
-                    field_name = field_info['name']
-                    field_type = field_info['type']
-                    field_required = field_info['required']
-                    field_validation = field_info['validation']
-                    field_error_messages = field_info['error_messages']
-                    
-                    # Skip validation for empty optional fields
-                    if not field_required and (v is None or v == ""):
-                        return v
-                    
-                    # Type-specific validation
-                    if field_type == "text":
-                        return validate_text_field(v, field_validation, field_error_messages)
-                    
-                    elif field_type == "email":
-                        return validate_email_field(v, field_error_messages)
-                    
-                    elif field_type == "password":
-                        return validate_password_field(v, field_validation, field_error_messages)
-                    
-                    elif field_type == "date":
-                        return validate_date_field(v, field_validation, field_error_messages)
-                    
-                    elif field_type == "number":
-                        return validate_number_field(v, field_validation, field_error_messages)
-                    
-                    elif field_type == "dropdown":
-                        return validate_dropdown_field(v, field_info['options'], field_error_messages)
-                    
-                    return v
-                
-                return validate_field
-            
-            # Create field info for the validator
-            field_info = {
-                'name': field_name,
-                'type': field_type,
-                'required': field_required,
-                'validation': field_validation,
-                'error_messages': field_error_messages,
-                'options': field.options
-            }
+            ann_type, default, validator = DynamicFormSubmissionGenerator._build_field(field)
             
             # Add validator to the class
-            field_validators[f'validate_{field_name}'] = create_field_validator(field_info)
-            
-            # Set type annotation and default
-            if field.type in ['text', 'email', 'password', 'dropdown']:
-                ann_type = str
-            elif field.type == 'date':
-                ann_type = str  # We'll validate as string and convert
-            elif field.type == 'number':
-                ann_type = Union[int, float, str]  # Accept multiple types
-            else:
-                ann_type = Any
+            field_validators[f'validate_{field.name}'] = validator
             
             # Add field to model
-            annotations[field_name] = ann_type if field_required else Optional[ann_type]
-            if field_required:
-                defaults[field_name] = Field(..., description=field.label)
-            else:
-                defaults[field_name] = Field(None, description=field.label)
+            annotations[field.name] = ann_type
+            defaults[field.name] = default
         
         # Create the dynamic model
         model_name = f"DynamicFormSubmission_{form_schema.title.replace(' ', '_')}"
@@ -161,4 +76,109 @@ class DynamicFormSubmissionGenerator:
             }
         )
         
-        return model_class 
\ No newline at end of file
+        return model_class
+    
+    @staticmethod
+    def _build_field(field) -> Tuple[Any, Any, Any]:
+        """
+        Build the annotation, default and validator for a single form field
+        
+        Args:
+            field: The form field definition
+            
+        Returns:
+            A tuple of (type annotation, Field default, field validator)
+        """
+        field_name = field.name
+        field_type = field.type
+        field_required = field.required
+        field_validation = field.validation
+        field_error_messages = field.errorMessages
+        
+        # Create validator function for this field
+        def create_field_validator(field_info):
+            """
+            Creates a validator function for a specific field
+            
+            Args:
+                field_info: Dictionary containing field configuration
+                
+            Returns:
+                A validator function for the field
+            """
+            @field_validator(field_info['name'], mode='before')
+            def validate_field(cls, v):
+                """
+                Validates a field value according to its type and rules
+                
+                Args:
+                    cls: The model class (unused)
+                    v: The value to validate
+                    
+                Returns:
+                    The validated value
+                    
+                Raises:
+                    ValueError: If validation fails
+                """
+                field_name = field_info['name']
+                field_type = field_info['type']
+                field_required = field_info['required']
+                field_validation = field_info['validation']
+                field_error_messages = field_info['error_messages']
+                
+                # Skip validation for empty optional fields
+                if not field_required and (v is None or v == "" or v == []):
+                    return v
+                
+                # Type-specific validation
+                if field_type == "text":
+                    return validate_text_field(v, field_validation, field_error_messages)
+                
+                elif field_type == "email":
+                    return validate_email_field(v, field_error_messages)
+                
+                elif field_type == "password":
+                    return validate_password_field(v, field_validation, field_error_messages)
+                
+                elif field_type == "date":
+                    return validate_date_field(v, field_validation, field_error_messages)
+                
+                elif field_type == "number":
+                    return validate_number_field(v, field_validation, field_error_messages)
+                
+                elif field_type == "dropdown":
+                    return validate_dropdown_field(v, field_info['options'], field_error_messages)
+                
+                elif field_type == "multiselect":
+                    return validate_multiselect_field(v, field_info['options'], field_validation, field_error_messages)
+                
+                return v
+            
+            return validate_field
+        
+        # Create field info for the validator
+        field_info = {
+            'name': field_name,
+            'type': field_type,
+            'required': field_required,
+            'validation': field_validation,
+            'error_messages': field_error_messages,
+            'options': field.option_index
+        }
+        
+        # Set type annotation and default
+        if field.type in ['text', 'email', 'password', 'dropdown']:
+            ann_type = str
+        elif field.type == 'date':
+            ann_type = str  # We'll validate as string and convert
+        elif field.type == 'number':
+            ann_type = Union[int, float, str]  # Accept multiple types
+        elif field.type == 'multiselect':
+            ann_type = List[str]
+        else:
+            ann_type = Any
+        
+        if field_required:
+            return ann_type, Field(..., description=field.label), create_field_validator(field_info)
+        return Optional[ann_type], Field(None, description=field.label), create_field_validator(field_info)
@@ -5,10 +5,11 @@ This module contains the FormSchema model which represents the complete
 structure of a dynamic form including all its fields.
 """
 
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, PrivateAttr, model_validator
+from typing import List, Optional
 
 from .form_field import FormField
+from .expressions import FieldGraph
 
 class FormSchema(BaseModel):
     """
@@ -22,4 +23,30 @@ class FormSchema(BaseModel):
         fields: List of form fields with their configurations
     """
     title: str
-    fields: List[FormField] 
\ No newline at end of file
+    fields: List[FormField]
+    
+    _field_graph: Optional[FieldGraph] = PrivateAttr(default=None)
+    
+    @property
+    def field_graph(self) -> Optional[FieldGraph]:
+        """Dependency graph of the conditional and computed fields; None for a static form"""
+        return self._field_graph
+    
+    @model_validator(mode='after')
+    def build_field_graph(self):
+        """
+        Compiles the field expressions into a dependency graph once, when the schema is parsed
+        
+        Raises:
+            ValueError: If an expression refers to an unknown field or the
+                expressions depend on each other in a cycle
+        """
+        # A repeated field name keeps its first position and its last definition
+        fields_by_name = {}
+        for field in self.fields:
+            fields_by_name[field.name] = field
+        expressions = {name: field.expressions for name, field in fields_by_name.items() if field.expressions}
+        if expressions:
+            self._field_graph = FieldGraph(list(fields_by_name), expressions)
+        return self
+ 
\ No newline at end of file
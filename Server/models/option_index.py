@@ -0,0 +1,58 @@
+"""
+Dropdown option index
+
+This module contains the OptionIndex class, built once per dropdown field
+when the schema is parsed, so option checks, label lookups and option
+search don't scan the option list.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, FrozenSet, List, Tuple
+
+from .field_models import DropdownOption
+
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class OptionIndex:
+    """
+    Lookup structures for the options of a dropdown field
+    
+    Attributes:
+        labels_by_value: Hash map from option value to label
+        values: Frozen set of option values for set-based membership checks
+    """
+    
+    __slots__ = ("labels_by_value", "values", "_search_keys", "_search_entries")
+    
+    def __init__(self, options: List[DropdownOption]):
+        self.labels_by_value: Dict[str, str] = {option.value: option.label for option in options}
+        self.values: FrozenSet[str] = frozenset(self.labels_by_value)
+        
+        # Options sorted by case-folded label; prefix search is a bisect range
+        entries = sorted((option.label.casefold(), option.value, option.label) for option in options)
+        self._search_keys = [key for key, _, _ in entries]
+        self._search_entries = [(value, label) for _, value, label in entries]
+    
+    def __contains__(self, value) -> bool:
+        return value in self.labels_by_value
+    
+    def __len__(self) -> int:
+        return len(self.labels_by_value)
+    
+    def search(self, query: str = "", limit: int = 20) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Find options whose label starts with the query (case-insensitive)
+        
+        Args:
+            query: Label prefix; empty matches every option
+            limit: Maximum number of options returned
+            
+        Returns:
+            The first matching options in label order, and the number of matches
+        """
+        key = query.casefold()
+        start = bisect_left(self._search_keys, key)
+        end = bisect_right(self._search_keys, key + _MAX_CHAR)
+        matches = self._search_entries[start:min(end, start + limit)]
+        return [{"value": value, "label": label} for value, label in matches], end - start
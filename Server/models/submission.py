@@ -33,7 +33,36 @@ class FormSubmissionResponse(BaseModel):
         success: Whether the submission was successful
         errors: Dictionary of field names to error messages (if any)
         message: General response message
+        fields: State of the conditional and computed fields a validation
+            touched: whether each is visible and required, and computed values
     """
     success: bool
     errors: Optional[Dict[str, List[str]]] = None
-    message: str 
\ No newline at end of file
+    message: str
+    fields: Optional[Dict[str, Dict[str, Any]]] = None
+
+class FieldValidationRequest(BaseModel):
+    """
+    Model for validating some fields of a form without submitting it
+    
+    Attributes:
+        data: Dictionary containing the field values to check
+        fields: Names of the fields to check (default: every key in data).
+            A listed field missing from data is checked as empty.
+    """
+    data: Dict[str, Any]
+    fields: Optional[List[str]] = None
+
+class PurgeJobRequest(BaseModel):
+    """
+    Request model for starting a background purge job
+    
+    At least one criterion must be given; when both are set, only
+    submissions matching both are deleted.
+    
+    Attributes:
+        form_title: Delete submissions of this form only
+        older_than_days: Delete submissions older than this many days
+    """
+    form_title: Optional[str] = None
+    older_than_days: Optional[int] = Field(None, ge=0)
@@ -11,6 +11,7 @@ from .passwordValidator import validate_password_field
 from .dateValidator import validate_date_field
 from .numberValidator import validate_number_field
 from .dropdownValidator import validate_dropdown_field
+from .multiselectValidator import validate_multiselect_field
 
 __all__ = [
     'validate_text_field',
@@ -18,5 +19,6 @@ __all__ = [
     'validate_password_field',
     'validate_date_field',
     'validate_number_field',
-    'validate_dropdown_field'
+    'validate_dropdown_field',
+    'validate_multiselect_field'
 ] 
\ No newline at end of file
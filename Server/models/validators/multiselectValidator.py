@@ -0,0 +1,36 @@
+"""
+Multi-Select Field Validator
+
+This module contains validation logic specifically for multi-select fields.
+"""
+
+from typing import Any, List, Optional
+
+
+def validate_multiselect_field(v: Any, options: Optional[Any], validation: Optional[Any], error_messages: Optional[Any]) -> List[str]:
+    """Validates multi-select field against the field's option index and selection limits"""
+    if not isinstance(v, list) or not all(isinstance(item, str) for item in v):
+        raise ValueError("Value must be a list of strings")
+    
+    # Drop repeated selections, keeping the order they were made in
+    selected = list(dict.fromkeys(v))
+    
+    # Empty optional fields never reach the validator
+    if not selected:
+        error_msg = error_messages.required if error_messages and error_messages.required else "Please select at least one option"
+        raise ValueError(error_msg)
+    
+    if options is None or not options.values.issuperset(selected):
+        error_msg = error_messages.invalidOption if error_messages and error_messages.invalidOption else "Invalid option"
+        raise ValueError(error_msg)
+    
+    if validation:
+        if validation.minSelections is not None and len(selected) < validation.minSelections:
+            error_msg = error_messages.minSelections if error_messages and error_messages.minSelections else f"Select at least {validation.minSelections} options"
+            raise ValueError(error_msg)
+        
+        if validation.maxSelections is not None and len(selected) > validation.maxSelections:
+            error_msg = error_messages.maxSelections if error_messages and error_messages.maxSelections else f"Select at most {validation.maxSelections} options"
+            raise ValueError(error_msg)
+    
+    return selected
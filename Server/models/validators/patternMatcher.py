@@ -0,0 +1,365 @@
+"""
+Pattern Matcher
+
+This module compiles schema `pattern` rules once and runs them safely.
+Patterns are analysed when the schema is parsed:
+- Safe patterns run inline with the re module
+- Patterns that can backtrack catastrophically run on re2 (linear time)
+  when it is installed, otherwise in a worker process under
+  PATTERN_TIME_BUDGET_MS, or are rejected when PATTERN_REJECT_UNSAFE is set
+"""
+
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from config import PATTERN_TIME_BUDGET_MS, PATTERN_POOL_WORKERS, PATTERN_QUEUE_TIMEOUT_MS, PATTERN_REJECT_UNSAFE
+
+try:
+    import re._parser as sre_parse
+    from re._constants import MAXREPEAT
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import MAXREPEAT
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if hasattr(sre_parse, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+
+# Characters that character sets are compared on: Latin-1 plus a few letters,
+# digits and spaces from other scripts, so \w, \d and \s overlap as they do in re
+_SAMPLE_CHARS = tuple(chr(code) for code in range(256)) + ("\u0416", "\u4e2d", "\u0663", "\u2003")
+_CATEGORIES = {
+    "DIGIT": re.compile(r"\d"), "NOT_DIGIT": re.compile(r"\D"),
+    "SPACE": re.compile(r"\s"), "NOT_SPACE": re.compile(r"\S"),
+    "WORD": re.compile(r"\w"), "NOT_WORD": re.compile(r"\W"),
+    "LINEBREAK": re.compile(r"\n"), "NOT_LINEBREAK": re.compile(r"[^\n]"),
+}
+_ALL_CHARS = frozenset(_SAMPLE_CHARS)
+
+
+class PatternTimeout(Exception):
+    """Raised when a budgeted pattern check runs out of time"""
+
+
+def find_unsafe_construct(pattern: str) -> Optional[str]:
+    """
+    Find a construct that can make the pattern backtrack catastrophically
+
+    Returns:
+        A description of the first unsafe construct, or None if the pattern is safe
+    """
+    return _scan(sre_parse.parse(pattern), inside_repeat=False)[1]
+
+
+def _scan_sequence(items, active: List[FrozenSet[str]]) -> Tuple[List[FrozenSet[str]], bool]:
+    """
+    Return (character sets of the unbounded repeats still free to grow, whether two overlap)
+
+    Two unbounded repeats in a row that can match the same characters, like
+    \\w*\\w* or .*a.*, split a run of those characters between them in every
+    possible way: backtracking grows polynomially with the input, with one more
+    degree per extra repeat. A required item that a repeat cannot match ends
+    that repeat's run, so [\\w.]+@[\\w-]+ is safe.
+    """
+    for op, av in items:
+        if op in _REPEATS:
+            low, high, body = av
+            chars = _chars(body)
+            if high == MAXREPEAT:
+                if any(chars & previous for previous in active):
+                    return active, True
+                active = active + [chars]
+            elif high == 1:
+                # An optional group continues the sequence, e.g. \w+(\w*)? overlaps
+                inner_active, overlapping = _scan_sequence(body, active)
+                if overlapping:
+                    return active, True
+                active = inner_active if low > 0 else active + [s for s in inner_active if s not in active]
+            elif low > 0:
+                active = [previous for previous in active if chars & previous]
+        elif op == sre_parse.SUBPATTERN:
+            active, overlapping = _scan_sequence(av[-1], active)
+            if overlapping:
+                return active, True
+        elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN):
+            chars = _item_chars(op, av)
+            active = [previous for previous in active if chars & previous]
+    return active, False
+
+
+def _chars(items) -> FrozenSet[str]:
+    """Sample characters any item of a sequence can match"""
+    chars = set()
+    for op, av in items:
+        if op in _REPEATS:
+            chars |= _chars(av[2])
+        elif op == sre_parse.SUBPATTERN:
+            chars |= _chars(av[-1])
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                chars |= _chars(branch)
+        elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN):
+            chars |= _item_chars(op, av)
+    return frozenset(chars)
+
+
+def _item_chars(op, av) -> FrozenSet[str]:
+    """Sample characters a single-character item matches"""
+    if op == sre_parse.LITERAL:
+        return frozenset((chr(av),))
+    if op == sre_parse.NOT_LITERAL:
+        return _ALL_CHARS - {chr(av)}
+    if op == sre_parse.ANY:
+        return _ALL_CHARS
+    return frozenset(ch for ch in _SAMPLE_CHARS if _in_set(av, ch))
+
+
+def _in_set(items, ch: str) -> bool:
+    negate = False
+    matched = False
+    for op, av in items:
+        if op == sre_parse.NEGATE:
+            negate = True
+        elif op == sre_parse.LITERAL:
+            matched = matched or ord(ch) == av
+        elif op == sre_parse.RANGE:
+            matched = matched or av[0] <= ord(ch) <= av[1]
+        elif op == sre_parse.CATEGORY:
+            name = str(av).replace("CATEGORY_", "").replace("UNI_", "").replace("LOC_", "")
+            category = _CATEGORIES.get(name)
+            matched = matched or category is None or category.match(ch) is not None
+        else:
+            # Unknown set items are assumed to match, which only makes the analysis stricter
+            matched = True
+    return matched != negate
+
+
+def _scan(items, inside_repeat: bool):
+    """
+    Return (contains an unbounded repeat, unsafe construct description)
+
+    A repeat that can run its body more than once counts as repeating, bounded
+    or not: (.*a){12} backtracks as badly as (.*a)* on a near miss.
+    """
+    if _scan_sequence(items, [])[1]:
+        return True, "overlapping adjacent quantifiers"
+    has_unbounded = False
+    for op, av in items:
+        if op in _REPEATS:
+            low, high, body = av
+            unbounded = high == MAXREPEAT
+            repeats = high > 1
+            if unbounded and inside_repeat:
+                return True, "nested quantifiers"
+            inner_unbounded, unsafe = _scan(body, inside_repeat or repeats)
+            if unsafe:
+                return True, unsafe
+            if repeats and inner_unbounded:
+                return True, "nested quantifiers"
+            has_unbounded = has_unbounded or unbounded or inner_unbounded
+        elif op == sre_parse.BRANCH:
+            branches = av[1]
+            if inside_repeat and not _distinct_first_literals(branches):
+                return True, "ambiguous alternation under a quantifier"
+            for branch in branches:
+                inner_unbounded, unsafe = _scan(branch, inside_repeat)
+                if unsafe:
+                    return True, unsafe
+                has_unbounded = has_unbounded or inner_unbounded
+        elif op == sre_parse.SUBPATTERN:
+            inner_unbounded, unsafe = _scan(av[-1], inside_repeat)
+            if unsafe:
+                return True, unsafe
+            has_unbounded = has_unbounded or inner_unbounded
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            return True, "backreference"
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            inner_unbounded, unsafe = _scan(av[1], inside_repeat)
+            if unsafe:
+                return True, unsafe
+    return has_unbounded, None
+
+
+def _distinct_first_literals(branches) -> bool:
+    """Whether every branch starts with a different literal character"""
+    firsts = set()
+    for branch in branches:
+        if not branch or branch[0][0] != sre_parse.LITERAL:
+            return False
+        firsts.add(branch[0][1])
+    return len(firsts) == len(branches)
+
+
+def _budgeted_worker(connection) -> None:
+    """Worker-process entry point: answer budgeted pattern checks until the pipe closes"""
+    connection.send(True)
+    while True:
+        try:
+            pattern, value = connection.recv()
+        except EOFError:
+            return
+        connection.send(re.match(pattern, value) is not None)
+
+
+class _BudgetedWorker:
+    """One worker process and the pipe to it"""
+
+    __slots__ = ("process", "connection")
+
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_budgeted_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        # Wait for the worker to finish importing before timing anything
+        self.connection.recv()
+
+    def stop(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class _BudgetedPool:
+    """
+    Bounded set of worker processes for budgeted checks
+
+    A check's budget covers only its execution; waiting for a free worker has
+    its own limit, PATTERN_QUEUE_TIMEOUT_MS, after which the check fails. A worker that overruns its budget cannot be interrupted, so it is
+    killed and replaced in the background; checks on the other workers carry on.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._lock = threading.Lock()
+
+    def _get_idle(self) -> queue.Queue:
+        """Get the idle workers, starting them outside of any check's time budget"""
+        with self._lock:
+            if self._idle is None:
+                idle = queue.Queue()
+                for _ in range(PATTERN_POOL_WORKERS):
+                    idle.put(_BudgetedWorker(self._context))
+                self._idle = idle
+            return self._idle
+
+    def match(self, pattern: str, value: str) -> bool:
+        idle = self._get_idle()
+        try:
+            worker = idle.get(timeout=PATTERN_QUEUE_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise PatternTimeout(f"No pattern worker became free within {PATTERN_QUEUE_TIMEOUT_MS} ms")
+        try:
+            worker.connection.send((pattern, value))
+            if worker.connection.poll(PATTERN_TIME_BUDGET_MS / 1000):
+                result = worker.connection.recv()
+                idle.put(worker)
+                return result
+        except (EOFError, OSError):
+            pass  # The worker died; it is replaced like a stuck one
+        threading.Thread(target=self._replace, args=(worker, idle), daemon=True).start()
+        raise PatternTimeout(f"Pattern check exceeded {PATTERN_TIME_BUDGET_MS} ms")
+
+    def _replace(self, worker: _BudgetedWorker, idle: queue.Queue) -> None:
+        worker.stop()
+        while True:
+            try:
+                idle.put(_BudgetedWorker(self._context))
+                return
+            except Exception:
+                time.sleep(1)
+
+
+_budgeted_pool = _BudgetedPool()
+
+
+def warm_up_budgeted_pool() -> None:
+    """Start the budgeted-check worker processes ahead of the first check"""
+    _budgeted_pool._get_idle()
+
+# Pattern metrics are updated from request threads concurrently
+_metrics_lock = threading.Lock()
+
+
+class CompiledPattern:
+    """
+    A schema pattern compiled once, with the engine chosen by analysis
+
+    Attributes:
+        pattern: The pattern source
+        engine: "re", "re2" or "budgeted"
+        unsafe_construct: Why the pattern was not run inline with re (if it wasn't)
+    """
+
+    __slots__ = ("pattern", "engine", "unsafe_construct", "field_name", "_compiled",
+                 "calls", "total_ns", "max_ns", "timeouts")
+
+    def __init__(self, pattern: str, field_name: Optional[str] = None):
+        self.pattern = pattern
+        self.field_name = field_name
+        self.unsafe_construct = find_unsafe_construct(pattern)
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.timeouts = 0
+
+        if self.unsafe_construct is None:
+            self.engine = "re"
+            self._compiled = re.compile(pattern)
+            return
+
+        if re2 is not None:
+            try:
+                self._compiled = re2.compile(pattern)
+                self.engine = "re2"
+                return
+            except Exception:
+                pass  # e.g. backreferences, which re2 does not support
+
+        if PATTERN_REJECT_UNSAFE:
+            raise ValueError(f"Pattern may backtrack catastrophically ({self.unsafe_construct})")
+        self.engine = "budgeted"
+        self._compiled = None
+
+    def match(self, value: str) -> bool:
+        """Match the value from its start, recording evaluation time"""
+        started = time.perf_counter_ns()
+        timed_out = False
+        try:
+            if self._compiled is not None:
+                return self._compiled.match(value) is not None
+            return _budgeted_pool.match(self.pattern, value)
+        except PatternTimeout:
+            timed_out = True
+            return False
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            with _metrics_lock:
+                self.calls += 1
+                self.total_ns += elapsed
+                if elapsed > self.max_ns:
+                    self.max_ns = elapsed
+                if timed_out:
+                    self.timeouts += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get evaluation-time metrics for this pattern"""
+        return {
+            "field": self.field_name,
+            "engine": self.engine,
+            "unsafe_construct": self.unsafe_construct,
+            "calls": self.calls,
+            "avg_ms": round(self.total_ns / self.calls / 1e6, 4) if self.calls else 0.0,
+            "max_ms": round(self.max_ns / 1e6, 4),
+            "timeouts": self.timeouts
+        }
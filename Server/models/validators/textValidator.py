@@ -4,7 +4,6 @@ Text Field Validator
 This module contains validation logic specifically for text fields.
 """
 
-import re
 from typing import Any, Optional
 
 
@@ -23,7 +22,7 @@ def validate_text_field(v: Any, validation: Optional[Any], error_messages: Optio
             raise ValueError(error_msg)
         
         if validation.pattern:
-            if not re.match(validation.pattern, v):
+            if not validation.compiled_pattern.match(v):
                 error_msg = error_messages.pattern if error_messages and error_messages.pattern else "Value does not match required pattern"
                 raise ValueError(error_msg)
     
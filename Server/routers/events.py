@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+
+from config import EVENTS_HEARTBEAT_SECONDS
+from services.event_service import event_service
+
+router = APIRouter(tags=["events"])
+
+@router.get("/events")
+async def stream_events(request: Request):
+    """
+    Stream live events as Server-Sent Events
+    
+    Event types:
+    - submission: A new submission, in the same shape as GET /submissions/ items
+    - statistics: A statistics delta ({form_title, count, fields}) to add to GET /statistics
+    - submissions_cleared: Every submission was deleted
+    - resync: Events were missed; refetch submissions and statistics
+    """
+    subscriber = event_service.subscribe()
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event_type, data = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            event_service.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Header, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 import os
 
-from models import FormSubmission
+from config import SCHEMA_MAX_UPLOAD_BYTES
+from models import FormSubmission, FieldValidationRequest
 from database import get_db
 from services.form_service import form_service
+from services.revalidation_service import revalidation_service
 
 router = APIRouter(prefix="/forms", tags=["forms"])
 
@@ -20,11 +23,18 @@ def download_example():
 
 @router.post("/upload-schema")
 def upload_schema(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload and validate form schema JSON file"""
+    """
+    Upload and validate form schema JSON file
+    
+    Request bodies over SCHEMA_MAX_UPLOAD_BYTES are rejected with 413 while
+    they are received; re-uploading the current schema returns it unchanged.
+    """
     if not file.filename or not file.filename.endswith('.json'):
         raise HTTPException(status_code=400, detail="File must be a JSON file")
     
-    content = file.file.read()
+    content = file.file.read(SCHEMA_MAX_UPLOAD_BYTES + 1)
+    if len(content) > SCHEMA_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the maximum size of {SCHEMA_MAX_UPLOAD_BYTES} bytes")
     return form_service.validate_and_store_schema(content)
 
 @router.get("/current-schema")
@@ -34,7 +44,73 @@ def get_current_schema():
 
 
 
+@router.get("/pattern-metrics")
+def get_pattern_metrics():
+    """Get pattern engine and evaluation-time metrics per field of the current form"""
+    return form_service.get_pattern_metrics()
+
+@router.get("/revalidations/{run_id}")
+def get_revalidation_run(run_id: str):
+    """Get progress of a re-validation of stored submissions"""
+    run = revalidation_service.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Re-validation run not found")
+    return run
+
+@router.get("/revalidations/{run_id}/results")
+def get_revalidation_results(
+    run_id: str,
+    compatible: Optional[bool] = None,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Page through per-submission re-validation results (pass next_after_id as after_id)"""
+    if revalidation_service.get_run(run_id) is None:
+        raise HTTPException(status_code=404, detail="Re-validation run not found")
+    return revalidation_service.get_results(run_id, compatible, after_id, limit)
+
+@router.post("/revalidations/{run_id}/resume")
+def resume_revalidation_run(run_id: str):
+    """Resume a failed re-validation run from its last committed chunk"""
+    run = revalidation_service.resume_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Re-validation run not found")
+    return run
+
 @router.post("/submit")
-def submit_form(submission: FormSubmission, db: Session = Depends(get_db)):
-    """Submit form data for validation and storage using Pydantic"""
-    return form_service.submit_form_data(submission.data, db) 
\ No newline at end of file
+def submit_form(
+    submission: FormSubmission,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Submit form data for validation and storage using Pydantic
+    
+    With an Idempotency-Key header, retries of the same payload replay the
+    first result (marked with Idempotent-Replayed: true) instead of being
+    validated and stored again.
+    """
+    if idempotency_key is None:
+        return form_service.submit_form_data(submission.data, db)
+    
+    result, replayed = form_service.submit_form_data_idempotent(idempotency_key, submission.data, db)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+@router.post("/{form_id}/validate")
+def validate_fields(form_id: str, request: FieldValidationRequest):
+    """Validate one field or a partial payload without storing anything"""
+    # Sync, so a budgeted pattern check waits in the threadpool instead of blocking the event loop
+    return form_service.validate_fields(form_id, request.data, request.fields)
+
+@router.get("/{form_id}/fields/{field_name}/options")
+def search_field_options(
+    form_id: str,
+    field_name: str,
+    q: str = "",
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Search a dropdown field's options by label prefix"""
+    return form_service.search_field_options(form_id, field_name, q, limit)
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
 
-from database import get_db
+from database import get_read_db
 from services.statistics_service import statistics_service
 
 router = APIRouter()
 
 @router.get("/statistics", response_model=Dict[str, Any])
-def get_statistics(db: Session = Depends(get_db)):
+def get_statistics(db: Session = Depends(get_read_db)):
     """
     Get form submission statistics
     
@@ -18,4 +19,38 @@ def get_statistics(db: Session = Depends(get_db)):
     - Submission count per form
     - Field information for each form
     """
-    return statistics_service.get_statistics(db) 
\ No newline at end of file
+    return statistics_service.get_statistics(db)
+
+@router.get("/statistics/fields", response_model=Dict[str, Any])
+def get_field_statistics(form: str):
+    """
+    Get per-field statistics of a form from its typed flat table
+    
+    Returns, per field:
+    - number: count, min, max and avg
+    - date: count, min and max
+    - dropdown: count per option value
+    - text and email: count and distinct count
+    """
+    statistics = statistics_service.get_field_statistics(form)
+    if statistics is None:
+        raise HTTPException(status_code=404, detail="No flat table for this form")
+    return statistics
+
+@router.get("/statistics/timeseries", response_model=Dict[str, Any])
+def get_timeseries(
+    form: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get submission volume over time
+    
+    Returns the number of submissions per bucket (minute, hour or day) in
+    [from, to), for one form or all forms. Defaults to the last 24 hours.
+    """
+    end = to or datetime.now()
+    start = from_ or end - timedelta(days=1)
+    return statistics_service.get_timeseries(db, form, start, end, bucket)
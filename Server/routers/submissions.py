@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from sqlalchemy.orm import Session
 
-from database import get_db
+from models import PurgeJobRequest
+from database import get_db, get_read_db
 from services.submission_service import submission_service
+from services.archive_service import archive_service
+from services.search_service import search_service, parse_predicate
 
 router = APIRouter(prefix="/submissions", tags=["submissions"])
 
 @router.get("/")
-def get_submissions(db: Session = Depends(get_db)):
-    """Get all form submissions"""
+def get_submissions(include_archived: bool = False, db: Session = Depends(get_read_db)):
+    """Get all form submissions, including cold-storage archives when requested"""
     try:
-        return submission_service.get_all_submissions(db)
+        return submission_service.get_all_submissions(db, include_archived)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting forms: {str(e)}")
 
@@ -22,4 +26,65 @@ def delete_all_submissions(db: Session = Depends(get_db)):
     try:
         return submission_service.delete_all_submissions(db)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting forms: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting forms: {str(e)}") 
+
+@router.post("/purge-jobs", status_code=202)
+def start_purge_job(request: PurgeJobRequest):
+    """Start a background batched delete of one form's submissions and/or old submissions"""
+    if request.form_title is None and request.older_than_days is None:
+        raise HTTPException(status_code=400, detail="form_title or older_than_days is required")
+    return submission_service.start_purge_job(request.form_title, request.older_than_days)
+
+@router.get("/purge-jobs/{job_id}")
+def get_purge_job(job_id: str):
+    """Get progress of a background purge job"""
+    job = submission_service.get_purge_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job
+
+@router.get("/archive/summary")
+def get_archive_summary():
+    """Get the number of archived submissions, segments and bytes"""
+    return archive_service.get_summary()
+
+@router.get("/search")
+def search_submissions(
+    q: Optional[str] = None,
+    form_title: Optional[str] = None,
+    where: List[str] = Query([]),
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search submissions, newest first
+    
+    - q: Full-text query over the submitted text values
+    - where: Field predicates as field:op:value (op: eq, gt, gte, lt, lte), repeatable
+    - before_id: Keyset cursor; pass the previous page's next_before_id
+    """
+    predicates = [parse_predicate(predicate) for predicate in where]
+    return search_service.search(db, q, form_title, predicates, before_id, limit)
+
+@router.get("/summaries")
+def get_submission_summaries(
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get submission summaries (id, form title, submission time), newest first
+    
+    - before_id: Keyset cursor; pass the previous page's next_before_id
+    - total: Number of stored submissions, on the first page only
+    """
+    return submission_service.get_submission_summaries(db, before_id, limit)
+
+@router.get("/{submission_id}")
+def get_submission(submission_id: int, db: Session = Depends(get_read_db)):
+    """Get a single submission, reading it from the archive if it was moved there"""
+    submission = submission_service.get_submission(db, submission_id)
+    if submission is None:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return submission
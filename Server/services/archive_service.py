@@ -0,0 +1,368 @@
+"""
+Cold storage for old submissions
+
+Submissions older than ARCHIVE_AFTER_DAYS are moved out of form_submissions
+into segment files under ARCHIVE_DIR. A segment is a sequence of
+independently compressed NDJSON blocks (zstd when the zstandard package is
+installed, zlib otherwise) with a small JSON index next to it recording the
+id range, forms, time range and byte offset of every block. Reads memory-map
+the segment and only decompress the blocks they need.
+
+Deleting submissions (purges and retention) removes the segments whose rows
+all match and rewrites the segments that hold only some matching rows.
+Archiving and deleting hold an OS lock on a file in ARCHIVE_DIR, so only one
+worker process changes segments at a time.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    ARCHIVE_AFTER_DAYS, ARCHIVE_DIR, ARCHIVE_SEGMENT_ROWS, ARCHIVE_BLOCK_ROWS, ARCHIVE_CHECK_INTERVAL_SECONDS
+)
+from database import FormSubmissionDB, SessionLocal
+from services.event_service import event_service
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+INDEX_SUFFIX = ".index.json"
+LOCK_FILE = ".lock"
+
+
+def _compress(payload: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(payload)
+    return zlib.compress(payload, 6)
+
+
+def _decompress(payload: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd archive segments")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+class ArchiveService:
+    """Service class for moving old submissions to compressed segment files and reading them back"""
+
+    def __init__(self):
+        self.archive_dir = ARCHIVE_DIR
+        self.codec = "zstd" if zstandard is not None else "zlib"
+        self._indexes = None
+        self._indexes_version = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _segments_locked(self):
+        """
+        Hold the archive directory's lock while segments are written or removed
+
+        Every worker process runs the archiver, so a thread lock is not enough.
+        Each holder opens the lock file itself, which also excludes other
+        threads of the same process.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, LOCK_FILE), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK gives up after about 10 seconds
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load_indexes(self) -> List[Dict[str, Any]]:
+        """Load segment indexes, ordered by id range, reloading when the directory changes"""
+        try:
+            version = os.stat(self.archive_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if self._indexes is None or version != self._indexes_version:
+                indexes = []
+                for name in os.listdir(self.archive_dir):
+                    if name.endswith(INDEX_SUFFIX):
+                        with open(os.path.join(self.archive_dir, name), "r", encoding="utf-8") as f:
+                            indexes.append(json.load(f))
+                self._indexes = sorted(indexes, key=lambda index: index["min_id"])
+                self._indexes_version = version
+            return self._indexes
+
+    def archive_older_than(self, cutoff: datetime) -> Dict[str, Any]:
+        """Move submissions older than the cutoff into new segments"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        segments = []
+        archived = 0
+
+        db = SessionLocal()
+        try:
+            with self._segments_locked():
+                self._remove_archived_leftovers(db)
+
+                while True:
+                    rows = db.query(FormSubmissionDB).filter(
+                        FormSubmissionDB.submitted_on < cutoff
+                    ).order_by(FormSubmissionDB.id).limit(ARCHIVE_SEGMENT_ROWS).all()
+                    if not rows:
+                        break
+
+                    index = self._write_segment(rows)
+                    segments.append(index["segment"])
+
+                    # The segment is durable before its rows leave the hot table. Every
+                    # row in the id range older than the cutoff was selected, so the
+                    # range filter matches exactly the archived rows
+                    db.query(FormSubmissionDB).filter(
+                        FormSubmissionDB.id >= index["min_id"],
+                        FormSubmissionDB.id <= index["max_id"],
+                        FormSubmissionDB.submitted_on < cutoff
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                    db.expunge_all()
+                    archived += index["rows"]
+        finally:
+            db.close()
+
+        if archived:
+            # Archived submissions leave the default submissions list
+            event_service.broadcast([("resync", {"reason": "archive"})])
+        return {"archived": archived, "segments": segments}
+
+    def _remove_archived_leftovers(self, db) -> None:
+        """Delete hot rows of the newest segment left behind by an interrupted run"""
+        indexes = self._load_indexes()
+        if not indexes:
+            return
+        newest = max(indexes, key=lambda index: index["created_at"])
+        db.query(FormSubmissionDB).filter(
+            FormSubmissionDB.id >= newest["min_id"],
+            FormSubmissionDB.id <= newest["max_id"],
+            FormSubmissionDB.submitted_on <= datetime.fromisoformat(newest["max_submitted_on"])
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def _write_segment(self, rows: List[FormSubmissionDB]) -> Dict[str, Any]:
+        """Write rows as a block-compressed segment plus its index, atomically"""
+        return self._write_records(
+            [self._serialize(row) for row in rows], [row.submitted_on for row in rows], datetime.now().isoformat()
+        )
+
+    def _write_records(self, records: List[Dict[str, Any]], submitted: List[datetime], created_at: str,
+                       rewrite: bool = False) -> Dict[str, Any]:
+        """Write serialized submissions, in id order, as a segment plus its index"""
+        name = f"segment_{records[0]['id']:012d}_{records[-1]['id']:012d}"
+        if rewrite:
+            # A rewritten segment never replaces the file its index still points at
+            name += f"_{uuid.uuid4().hex[:8]}"
+        name += f".ndjson.{self.codec}"
+        segment_path = os.path.join(self.archive_dir, name)
+        index_path = segment_path + INDEX_SUFFIX
+
+        blocks = []
+        offset = 0
+        with open(segment_path + ".tmp", "wb") as f:
+            for start in range(0, len(records), ARCHIVE_BLOCK_ROWS):
+                block_records = records[start:start + ARCHIVE_BLOCK_ROWS]
+                payload = "".join(
+                    json.dumps(record, ensure_ascii=False) + "\n" for record in block_records
+                ).encode("utf-8")
+                compressed = _compress(payload, self.codec)
+                f.write(compressed)
+                blocks.append({
+                    "offset": offset,
+                    "length": len(compressed),
+                    "rows": len(block_records),
+                    "min_id": block_records[0]["id"],
+                    "max_id": block_records[-1]["id"]
+                })
+                offset += len(compressed)
+            f.flush()
+            os.fsync(f.fileno())
+
+        index = {
+            "segment": name,
+            "codec": self.codec,
+            "rows": len(records),
+            "min_id": records[0]["id"],
+            "max_id": records[-1]["id"],
+            "forms": sorted({record["form_title"] for record in records}),
+            "min_submitted_on": min(submitted).isoformat(),
+            "max_submitted_on": max(submitted).isoformat(),
+            # Kept on rewrite, so the newest segment stays the one the last archive run wrote
+            "created_at": created_at,
+            "blocks": blocks
+        }
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The index is renamed last so a segment only becomes visible once complete
+        os.replace(segment_path + ".tmp", segment_path)
+        os.replace(index_path + ".tmp", index_path)
+        return index
+
+    def _remove_segment(self, index: Dict[str, Any]) -> None:
+        """Delete a segment, its index first so it is never visible without its data"""
+        segment_path = os.path.join(self.archive_dir, index["segment"])
+        os.remove(segment_path + INDEX_SUFFIX)
+        os.remove(segment_path)
+
+    def delete_submissions(self, form_title: Optional[str] = None, older_than: Optional[datetime] = None) -> int:
+        """
+        Delete archived submissions of a form and/or older than a date; with neither, all of them
+
+        Returns:
+            Number of archived submissions deleted
+        """
+        def matches(submission: Dict[str, Any]) -> bool:
+            if form_title is not None and submission["form_title"] != form_title:
+                return False
+            return older_than is None or datetime.fromisoformat(submission["submitted_at"]) < older_than
+
+        if not os.path.isdir(self.archive_dir):
+            return 0
+        deleted = 0
+        with self._segments_locked():
+            for index in list(self._load_indexes()):
+                if form_title is not None and form_title not in index["forms"]:
+                    continue
+                if older_than is not None and index["min_submitted_on"] >= older_than.isoformat():
+                    continue
+
+                whole_segment = (
+                    (form_title is None or index["forms"] == [form_title])
+                    and (older_than is None or index["max_submitted_on"] < older_than.isoformat())
+                )
+                if whole_segment:
+                    self._remove_segment(index)
+                    deleted += index["rows"]
+                    continue
+
+                kept = [submission for submission in self._read_segment(index) if not matches(submission)]
+                if len(kept) == index["rows"]:
+                    continue
+                if kept:
+                    # The rewritten segment is visible before the old one goes, so a crash between them
+                    # can leave deleted rows behind, never lose kept ones
+                    submitted = [datetime.fromisoformat(submission["submitted_at"]) for submission in kept]
+                    self._write_records(kept, submitted, index["created_at"], rewrite=True)
+                self._remove_segment(index)
+                deleted += index["rows"] - len(kept)
+        return deleted
+
+    @staticmethod
+    def _serialize(row: FormSubmissionDB) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "form_title": row.form_title,
+            "data": row.data,
+            "submitted_at": row.submitted_at,
+            "fields_mapping": row.fields_mapping
+        }
+
+    def iter_submissions(self, form_title: Optional[str] = None, since: Optional[datetime] = None,
+                         until: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """Yield archived submissions, skipping segments the index rules out"""
+        for index in self._load_indexes():
+            if form_title is not None and form_title not in index["forms"]:
+                continue
+            if since is not None and index["max_submitted_on"] < since.isoformat():
+                continue
+            if until is not None and index["min_submitted_on"] > until.isoformat():
+                continue
+
+            for submission in self._read_segment(index):
+                if form_title is None or submission["form_title"] == form_title:
+                    yield submission
+
+    def _read_segment(self, index: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield every submission of a segment; none if it was deleted since its index was read"""
+        try:
+            f = open(os.path.join(self.archive_dir, index["segment"]), "rb")
+        except FileNotFoundError:
+            return
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+            for block in index["blocks"]:
+                payload = _decompress(segment[block["offset"]:block["offset"] + block["length"]], index["codec"])
+                for line in payload.splitlines():
+                    yield json.loads(line)
+
+    def get_submission(self, submission_id: int) -> Optional[Dict[str, Any]]:
+        """Read a single archived submission by decompressing only the block holding it"""
+        for index in self._load_indexes():
+            if not index["min_id"] <= submission_id <= index["max_id"]:
+                continue
+            for block in index["blocks"]:
+                if not block["min_id"] <= submission_id <= block["max_id"]:
+                    continue
+                try:
+                    with open(os.path.join(self.archive_dir, index["segment"]), "rb") as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                            payload = _decompress(segment[block["offset"]:block["offset"] + block["length"]], index["codec"])
+                except FileNotFoundError:
+                    # Deleted or rewritten since its index was read
+                    return None
+                for line in payload.splitlines():
+                    submission = json.loads(line)
+                    if submission["id"] == submission_id:
+                        return submission
+        return None
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Summarize archive contents from the segment indexes"""
+        indexes = self._load_indexes()
+        return {
+            "segments": len(indexes),
+            "rows": sum(index["rows"] for index in indexes),
+            "bytes": sum(block["length"] for index in indexes for block in index["blocks"]),
+            "codec": self.codec
+        }
+
+    async def run_scheduler(self) -> None:
+        """Periodically archive submissions older than ARCHIVE_AFTER_DAYS"""
+        if ARCHIVE_AFTER_DAYS <= 0:
+            return
+        while True:
+            try:
+                cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+                await run_in_threadpool(self.archive_older_than, cutoff)
+            except Exception:
+                # A failed run is retried on the next interval
+                pass
+            await asyncio.sleep(ARCHIVE_CHECK_INTERVAL_SECONDS)
+
+
+# Global instance
+archive_service = ArchiveService()
@@ -0,0 +1,163 @@
+"""
+Live events for GET /events
+
+Events are published in-process to every connected subscriber of this worker.
+Each subscriber has a bounded buffer; a subscriber that falls EVENTS_BUFFER_SIZE
+events behind has its buffer replaced by a single `resync` event, so a slow
+client costs at most one buffer of memory. On PostgreSQL, events also travel to
+the other workers through LISTEN/NOTIFY on EVENTS_CHANNEL.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config import EVENTS_BUFFER_SIZE, EVENTS_CHANNEL
+from database import FormSubmissionDB, SessionLocal, engine
+
+# NOTIFY payloads must stay under 8000 bytes; larger submissions are sent by id
+NOTIFY_MAX_BYTES = 7900
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class EventSubscriber:
+    """Bounded event buffer of one /events connection"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENTS_BUFFER_SIZE)
+        self.overflows = 0
+
+    def offer(self, event: Event) -> None:
+        """Buffer an event, collapsing the buffer into `resync` when it is full (runs on the loop)"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("resync", {"reason": "buffer_overflow"}))
+            self.overflows += 1
+
+
+class EventService:
+    """Service class for publishing live submission and statistics events"""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def fanout_enabled(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def subscribe(self) -> EventSubscriber:
+        """Register a subscriber on the running event loop"""
+        subscriber = EventSubscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, events: List[Event]) -> None:
+        """Deliver events to this worker's subscribers (safe to call from any thread)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for event in events:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+
+    def notify(self, db: Session, events: List[Event]) -> None:
+        """Queue events for the other workers in the caller's transaction; PostgreSQL sends them on commit"""
+        if not self.fanout_enabled:
+            return
+        for event_type, data in events:
+            payload = json.dumps({"origin": self.origin, "type": event_type, "data": data})
+            if len(payload.encode("utf-8")) > NOTIFY_MAX_BYTES and event_type == "submission":
+                payload = json.dumps({"origin": self.origin, "type": event_type, "ref": data["id"]})
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": EVENTS_CHANNEL, "payload": payload})
+
+    def broadcast(self, events: List[Event]) -> None:
+        """Publish events to this worker and, in a transaction of their own, to the other workers"""
+        if self.fanout_enabled:
+            db = SessionLocal()
+            try:
+                self.notify(db, events)
+                db.commit()
+            finally:
+                db.close()
+        self.publish(events)
+
+    @staticmethod
+    def submission_events(submission: FormSubmissionDB) -> List[Event]:
+        """Build the new-submission event and its statistics delta"""
+        fields_mapping = (submission.fields_mapping or {}).get("fields_mapping", {})
+        return [
+            ("submission", {
+                "id": submission.id,
+                "form_title": submission.form_title,
+                "data": submission.data,
+                "submitted_at": submission.submitted_at,
+                "fields_mapping": submission.fields_mapping
+            }),
+            ("statistics", {
+                "form_title": submission.form_title,
+                "count": 1,
+                "fields": [{"label": label} for label in fields_mapping.values()]
+            })
+        ]
+
+    async def run_listener(self) -> None:
+        """Relay NOTIFY events from other workers to this worker's subscribers"""
+        if not self.fanout_enabled:
+            return
+        import psycopg
+
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f'LISTEN "{EVENTS_CHANNEL}"')
+                    # Events missed while disconnected are covered by a client refetch
+                    self.publish([("resync", {"reason": "reconnected"})])
+                    async for notification in conn.notifies():
+                        await self._relay(notification.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Reconnect after a short pause
+                await asyncio.sleep(1)
+
+    async def _relay(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return  # Already published locally
+        data = message.get("data")
+        if data is None:
+            data = await run_in_threadpool(self._load_submission, message["ref"])
+            if data is None:
+                return
+        self.publish([(message["type"], data)])
+
+    @staticmethod
+    def _load_submission(submission_id: int) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            submission = db.query(FormSubmissionDB).filter(FormSubmissionDB.id == submission_id).first()
+            return EventService.submission_events(submission)[0][1] if submission else None
+        finally:
+            db.close()
+
+
+# Global instance
+event_service = EventService()
@@ -0,0 +1,288 @@
+"""
+Flat form tables
+
+Every loaded form schema gets a typed copy of its submissions: a table with
+submission_id, submitted_on and one column per field, typed from the field
+type (numeric for number, date for date, an enum of the option values for
+dropdown, an array for multiselect, text otherwise; password fields are never
+copied). Tables are keyed by the schema's columns, so uploading a schema with
+different fields starts a new table and drops the old one.
+
+A background job copies new submissions into the tables incrementally by id
+cursor. Submitting a form wakes the job, so the submit path itself stays a
+single insert. Values that do not fit their column (e.g. from an older
+schema) are stored as NULL.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import MetaData, Table, Column, Integer, DateTime, Date, Float, String, Text, Enum, JSON, func, select, insert, delete
+from sqlalchemy.dialects.postgresql import ARRAY
+from starlette.concurrency import run_in_threadpool
+
+from config import FLATTEN_SYNC_INTERVAL_SECONDS, FLATTEN_BATCH_SIZE
+from database import FormSubmissionDB, FlatFormTableDB, SessionLocal, engine
+
+FLATTENED_TYPES = ("text", "email", "date", "number", "dropdown", "multiselect")
+RESERVED_COLUMNS = {"submission_id", "submitted_on"}
+
+
+def _column_type(spec: Dict[str, Any]):
+    field_type = spec["type"]
+    if field_type == "number":
+        return Float
+    if field_type == "date":
+        return Date
+    if field_type == "dropdown" and spec["options"]:
+        return Enum(*spec["options"], native_enum=False, create_constraint=False,
+                    length=max(len(option) for option in spec["options"]))
+    if field_type == "multiselect":
+        return JSON().with_variant(ARRAY(String), "postgresql")
+    return Text
+
+
+def _convert(value: Any, spec: Dict[str, Any]) -> Any:
+    """Convert a submitted value to its column type, or None if it does not fit"""
+    if value is None or value == "":
+        return None
+    field_type = spec["type"]
+    try:
+        if field_type == "number":
+            return None if isinstance(value, bool) else float(value)
+        if field_type == "date":
+            return date.fromisoformat(str(value)[:10])
+        if field_type == "dropdown":
+            return value if not spec["options"] or value in spec["options"] else None
+        if field_type == "multiselect":
+            return [item for item in value if item in spec["options"]] if isinstance(value, list) else None
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+class FlattenService:
+    """Service class for maintaining typed, flattened tables of each form's submissions"""
+
+    def __init__(self):
+        self._metadata = MetaData()
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wake = None
+
+    @staticmethod
+    def _columns(form_schema) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": field.name,
+                "label": field.label,
+                "type": field.type,
+                "options": [option.value for option in field.options or []]
+            }
+            for field in form_schema.fields
+            if field.type in FLATTENED_TYPES and field.name not in RESERVED_COLUMNS
+        ]
+
+    def _table(self, table_name: str, columns: List[Dict[str, Any]]) -> Table:
+        """Get the Table for a flat form table, defining it on first use"""
+        table = self._tables.get(table_name)
+        if table is None:
+            table = Table(
+                table_name,
+                self._metadata,
+                Column("submission_id", Integer, primary_key=True),
+                Column("submitted_on", DateTime, nullable=False, index=True),
+                *[Column(spec["name"], _column_type(spec)) for spec in columns]
+            )
+            self._tables[table_name] = table
+        return table
+
+    def register(self, form_schema) -> Dict[str, Any]:
+        """Create the flat table for a schema, replacing the form's table for any other schema"""
+        columns = self._columns(form_schema)
+        # Labels are not part of the table layout
+        layout = [{key: spec[key] for key in ("name", "type", "options")} for spec in columns]
+        schema_hash = hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()[:12]
+        slug = re.sub(r"[^a-z0-9]+", "_", form_schema.title.lower()).strip("_")[:32] or "form"
+        table_name = f"flat_{slug}_{schema_hash[:8]}"
+
+        with self._lock:
+            db = SessionLocal()
+            try:
+                existing = db.get(FlatFormTableDB, table_name)
+                if existing is not None:
+                    existing.columns = columns
+                    db.commit()
+                    return {"table": table_name, "created": False}
+
+                # The registration is committed before the DDL runs on another connection, so this session
+                # holds no transaction meanwhile; sync_all takes the same lock, so it never sees the row early
+                db.add(FlatFormTableDB(
+                    table_name=table_name,
+                    form_title=form_schema.title,
+                    schema_hash=schema_hash,
+                    columns=columns,
+                    last_submission_id=0,
+                    created_at=datetime.now()
+                ))
+                db.commit()
+                try:
+                    self._table(table_name, columns).create(bind=engine, checkfirst=True)
+                except Exception:
+                    db.query(FlatFormTableDB).filter(FlatFormTableDB.table_name == table_name).delete()
+                    db.commit()
+                    table = self._tables.pop(table_name, None)
+                    if table is not None:
+                        self._metadata.remove(table)
+                    raise
+
+                previous = db.query(FlatFormTableDB).filter(
+                    FlatFormTableDB.form_title == form_schema.title,
+                    FlatFormTableDB.table_name != table_name
+                ).all()
+                replaced = [(registry.table_name, registry.columns) for registry in previous]
+                for registry in previous:
+                    db.delete(registry)
+                db.commit()
+                for previous_name, previous_columns in replaced:
+                    self._table(previous_name, previous_columns).drop(bind=engine, checkfirst=True)
+                    self._metadata.remove(self._tables.pop(previous_name))
+            finally:
+                db.close()
+
+        self.notify()
+        return {"table": table_name, "created": True}
+
+    def notify(self) -> None:
+        """Wake the sync job (safe to call from any thread)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def sync_all(self) -> Dict[str, int]:
+        """Copy submissions past each table's cursor into the flat tables"""
+        copied = {}
+        with self._lock:
+            db = SessionLocal()
+            try:
+                for registry in db.query(FlatFormTableDB).all():
+                    table = self._table(registry.table_name, registry.columns)
+                    copied[registry.table_name] = 0
+                    while True:
+                        submissions = db.query(
+                            FormSubmissionDB.id, FormSubmissionDB.data, FormSubmissionDB.submitted_on
+                        ).filter(
+                            FormSubmissionDB.form_title == registry.form_title,
+                            FormSubmissionDB.id > registry.last_submission_id
+                        ).order_by(FormSubmissionDB.id).limit(FLATTEN_BATCH_SIZE).all()
+                        if not submissions:
+                            break
+
+                        rows = []
+                        for submission in submissions:
+                            data = json.loads(submission.data) if isinstance(submission.data, str) else submission.data
+                            row = {"submission_id": submission.id, "submitted_on": submission.submitted_on}
+                            for spec in registry.columns:
+                                row[spec["name"]] = _convert(data.get(spec["name"]), spec)
+                            rows.append(row)
+
+                        # Rows and cursor commit together, so a failed batch is simply retried
+                        db.execute(insert(table), rows)
+                        registry.last_submission_id = submissions[-1].id
+                        registry.synced_at = datetime.now()
+                        db.commit()
+                        copied[registry.table_name] += len(rows)
+            finally:
+                db.close()
+        return copied
+
+    def delete_submissions(self, submission_ids: List[int]) -> None:
+        """Remove purged submissions from the flat tables"""
+        self._delete(lambda table: table.c.submission_id.in_(submission_ids))
+
+    def prune_older_than(self, cutoff: datetime) -> None:
+        """Remove submissions dropped by retention from the flat tables"""
+        self._delete(lambda table: table.c.submitted_on < cutoff)
+
+    def clear_all(self) -> None:
+        """Empty every flat table (cursors are kept, since submission ids are never reused)"""
+        self._delete(lambda table: None)
+
+    def _delete(self, condition) -> None:
+        with self._lock:
+            db = SessionLocal()
+            try:
+                for registry in db.query(FlatFormTableDB).all():
+                    table = self._table(registry.table_name, registry.columns)
+                    where = condition(table)
+                    db.execute(delete(table) if where is None else delete(table).where(where))
+                db.commit()
+            finally:
+                db.close()
+
+    def get_field_statistics(self, form_title: str) -> Optional[Dict[str, Any]]:
+        """Aggregate a form's submissions per field from its typed flat table"""
+        db = SessionLocal()
+        try:
+            registry = db.query(FlatFormTableDB).filter(FlatFormTableDB.form_title == form_title).first()
+            if registry is None:
+                return None
+            table = self._table(registry.table_name, registry.columns)
+
+            fields = []
+            for spec in registry.columns:
+                column = table.c[spec["name"]]
+                stat = {"name": spec["name"], "label": spec["label"], "type": spec["type"]}
+                if spec["type"] == "number":
+                    row = db.execute(select(func.count(column), func.min(column), func.max(column), func.avg(column))).one()
+                    stat.update({"count": row[0], "min": row[1], "max": row[2],
+                                 "avg": float(row[3]) if row[3] is not None else None})
+                elif spec["type"] == "date":
+                    row = db.execute(select(func.count(column), func.min(column), func.max(column))).one()
+                    stat.update({"count": row[0], "min": row[1], "max": row[2]})
+                elif spec["type"] == "dropdown":
+                    counts = db.execute(
+                        select(column, func.count()).where(column.isnot(None)).group_by(column)
+                    ).all()
+                    stat["count"] = sum(count for _, count in counts)
+                    stat["values"] = {value: count for value, count in counts}
+                elif spec["type"] == "multiselect":
+                    stat["count"] = db.execute(select(func.count(column))).scalar()
+                else:
+                    row = db.execute(select(func.count(column), func.count(column.distinct()))).one()
+                    stat.update({"count": row[0], "distinct": row[1]})
+                fields.append(stat)
+
+            return {
+                "form_title": form_title,
+                "rows": db.execute(select(func.count()).select_from(table)).scalar(),
+                "synced_at": registry.synced_at.isoformat() if registry.synced_at else None,
+                "fields": fields
+            }
+        finally:
+            db.close()
+
+    async def run_scheduler(self) -> None:
+        """Sync flat tables when submissions arrive and every FLATTEN_SYNC_INTERVAL_SECONDS"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await run_in_threadpool(self.sync_all)
+            except Exception:
+                # A failed sync is retried on the next wake-up
+                pass
+            try:
+                await asyncio.wait_for(self._wake.wait(), FLATTEN_SYNC_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Global instance
+flatten_service = FlattenService()
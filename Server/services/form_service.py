@@ -1,66 +1,106 @@
+import hashlib
 import json
 import uuid
 import os
+import tempfile
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from models import FormSchema, FormSubmission, FormSubmissionResponse, DynamicFormSubmissionGenerator
-from database import FormSubmissionDB, generate_data_hash, check_duplicate_submission
+from models import FormSchema, FormSubmission, FormSubmissionResponse, CompiledFormCache
+from database import FormSubmissionDB, DuplicateSubmissionError, storage, generate_data_hash, check_duplicate_hash, add_submission
+from models.validators.patternMatcher import warm_up_budgeted_pool
+from config import LAZY_OPTIONS_THRESHOLD, REVALIDATE_ON_UPLOAD, FORM_CACHE_MAX_BYTES
+from middleware.profiling import profile_stage
+from services.revalidation_service import revalidation_service
+from services.event_service import event_service
+from services.search_service import search_service
+from services.flatten_service import flatten_service
+from services.rollup_service import rollup_service
+from services.idempotency_service import idempotency_service, request_hash, IdempotencyKeyMismatch, MAX_KEY_LENGTH
+
+GENERAL_ERROR_MESSAGE = "General form error"
+
+# Steps run after an uploaded schema is activated, in order
+FOLLOW_UP_STEPS = ("search_indexes", "flat_table", "revalidation")
+
+# Recently activated schemas kept parsed, so switching back to one skips parsing
+PARSED_SCHEMA_CACHE_SIZE = 16
 
 class FormService:
     """Service class for form-related business logic"""
     
     def __init__(self):
-        # Store current form schema and dynamic model in memory (in production, use database)
+        # Store current form schema and its compiled form in memory (in production, use database)
         self.current_form_schema = None
-        self.current_dynamic_model = None
+        self.current_form = None
         self.current_form_id = None
+        self.current_schema_hash = None
+        self.current_schema_payload = None
+        self.compiled_forms = CompiledFormCache(FORM_CACHE_MAX_BYTES)
+        # Schema hash to its parsed schema and payload, least recently activated first
+        self._parsed_schemas: "OrderedDict[str, Tuple[FormSchema, dict]]" = OrderedDict()
+        self._schema_lock = threading.Lock()
+        # Schema hash to the follow-up steps of its upload that failed
+        self._failed_follow_ups: Dict[str, Tuple[str, ...]] = {}
         
         # New folders - updated paths to be relative to Server directory
         self.base_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))  # Go up one level to Server
         self.examples_dir = os.path.join(self.base_dir, 'files', 'example_file')
         self.user_file_dir = os.path.join(self.base_dir, 'files', 'user_file')
+        # Every uploaded schema, stored once under its content hash
+        self.schema_store_dir = os.path.join(self.user_file_dir, 'schemas')
         os.makedirs(self.examples_dir, exist_ok=True)
         os.makedirs(self.user_file_dir, exist_ok=True)
+        os.makedirs(self.schema_store_dir, exist_ok=True)
     
     def get_example_file_path(self) -> str:
         """Get the path to the example JSON file"""
         return os.path.join(self.examples_dir, 'example1.json')
     
     def validate_and_store_schema(self, file_content: bytes) -> dict:
-        """Validate and store form schema"""
+        """
+        Validate and store form schema
+        
+        Once the schema is active, the follow-up steps (search indexes, flat
+        table, re-validation) are best effort: a failing step is reported in
+        follow_up_errors instead of failing the upload, and runs again when the
+        same schema is uploaded again.
+        """
+        schema_hash = hashlib.sha256(file_content).hexdigest()
         try:
-            schema_data = json.loads(file_content)
-            
-            # Validate schema using Pydantic
-            form_schema = FormSchema(**schema_data)
-            
-            # Create dynamic Pydantic model for form submission validation
-            dynamic_model = DynamicFormSubmissionGenerator.create_submission_model(form_schema)
-            
-            # Generate unique form ID
-            form_id = str(uuid.uuid4())
-            
-            # Remove previous user file if exists
-            file_path = os.path.join(self.user_file_dir, "current_form.json")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            # Save file locally with fixed name
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
-            
-            # Store in memory for current session
-            self.current_form_schema = form_schema
-            self.current_dynamic_model = dynamic_model
-            self.current_form_id = form_id
-            
-            return {
-                "message": "File saved successfully", 
-                "form_id": form_id,
-                "schema": form_schema.dict()
-            }
+            with self._schema_lock:
+                # Re-uploading the current schema changes nothing, so nothing is parsed or compiled
+                if schema_hash == self.current_schema_hash and self.current_form is not None:
+                    form_id = self.current_form_id
+                    form_schema = self.current_form_schema
+                    unchanged = True
+                else:
+                    # A schema uploaded before is already parsed, compiled and stored
+                    form_schema = self._parsed_schema(schema_hash)
+                    if form_schema is None:
+                        schema_data = json.loads(file_content)
+                        
+                        # Validate schema using Pydantic
+                        form_schema = FormSchema(**schema_data)
+                    
+                    # Generate unique form ID
+                    form_id = str(uuid.uuid4())
+                    
+                    # Save under the content hash, then point the current form at it
+                    stored_path = os.path.join(self.schema_store_dir, f"{schema_hash}.json")
+                    if not os.path.exists(stored_path):
+                        self._write_atomically(stored_path, file_content)
+                    self._write_atomically(os.path.join(self.user_file_dir, "current_form.json"), file_content)
+                    
+                    # Store in memory for current session
+                    self._activate_schema(form_schema, form_id, schema_hash)
+                    unchanged = False
+                schema_payload = self.current_schema_payload
         
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON file")
@@ -68,6 +108,131 @@ class FormService:
             raise HTTPException(status_code=400, detail=f"File validation errors: {e}")
         except Exception as e:
             raise HTTPException(status_code=400, detail="File not supported")
+        
+        # The schema is live from here on; an unchanged upload retries only what failed before
+        steps = self._failed_follow_ups.pop(schema_hash, ()) if unchanged else FOLLOW_UP_STEPS
+        follow_up_errors, revalidation_run = self._follow_up(form_schema, file_content, steps)
+        if follow_up_errors:
+            self._failed_follow_ups[schema_hash] = tuple(follow_up_errors)
+        
+        return {
+            "message": "File saved successfully",
+            "form_id": form_id,
+            "schema": schema_payload,
+            "schema_hash": schema_hash,
+            "unchanged": unchanged,
+            "revalidation_run": revalidation_run,
+            "follow_up_errors": follow_up_errors
+        }
+    
+    def _follow_up(self, form_schema: FormSchema, file_content: bytes,
+                   steps: Tuple[str, ...]) -> Tuple[Dict[str, str], Optional[dict]]:
+        """Run the given follow-up steps of an upload; returns their errors and the re-validation run"""
+        errors = {}
+        revalidation_run = None
+        for step in steps:
+            try:
+                if step == "search_indexes":
+                    search_service.ensure_field_indexes(form_schema)
+                elif step == "flat_table":
+                    flatten_service.register(form_schema)
+                elif step == "revalidation" and REVALIDATE_ON_UPLOAD:
+                    # Check stored submissions of this form against the new schema in the background
+                    revalidation_run = revalidation_service.start_run(form_schema.title, json.loads(file_content))
+            except Exception as e:
+                errors[step] = str(e)
+        return errors, revalidation_run
+    
+    def _activate_schema(self, form_schema: FormSchema, form_id: str, schema_hash: Optional[str] = None) -> None:
+        """Make a schema current, reusing its compiled form if it was compiled before"""
+        if schema_hash is None:
+            schema_hash = hashlib.sha256(form_schema.model_dump_json().encode()).hexdigest()
+        self.current_form = self.compiled_forms.get_or_compile(schema_hash, form_schema)
+        cached = self._parsed_schemas.pop(schema_hash, None)
+        payload = cached[1] if cached is not None and cached[0] is form_schema else self._schema_payload(form_schema)
+        self._parsed_schemas[schema_hash] = (form_schema, payload)
+        while len(self._parsed_schemas) > PARSED_SCHEMA_CACHE_SIZE:
+            self._parsed_schemas.popitem(last=False)
+        self.current_form_schema = form_schema
+        self.current_form_id = form_id
+        self.current_schema_hash = schema_hash
+        self.current_schema_payload = payload
+    
+    def _parsed_schema(self, schema_hash: str) -> Optional[FormSchema]:
+        """The parsed schema of an earlier upload, if it is still cached"""
+        cached = self._parsed_schemas.get(schema_hash)
+        return cached[0] if cached is not None else None
+    
+    @staticmethod
+    def _write_atomically(path: str, content: bytes) -> None:
+        """Write a file through a synced temporary file and a rename, so readers never see a partial file"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def warm_up(self) -> dict:
+        """Load and compile the active form schema ahead of the first request"""
+        file_path = os.path.join(self.user_file_dir, "current_form.json")
+        if not os.path.exists(file_path):
+            return {"schema_loaded": False, "patterns_compiled": 0}
+        
+        self.load_schema_from_file()
+        
+        # Patterns are compiled while the schema is parsed
+        compiled_patterns = self.current_form.compiled_patterns()
+        patterns_compiled = len(compiled_patterns)
+        if any(pattern.engine == "budgeted" for pattern in compiled_patterns):
+            warm_up_budgeted_pool()
+        search_service.ensure_field_indexes(self.current_form_schema, run_async=False)
+        flat_table = flatten_service.register(self.current_form_schema)
+        
+        return {
+            "schema_loaded": True,
+            "form_title": self.current_form_schema.title,
+            "patterns_compiled": patterns_compiled,
+            "option_indexes": len(self.current_form.option_labels),
+            "compiled_form_bytes": self.current_form.nbytes,
+            "flat_table": flat_table["table"]
+        }
+    
+    @staticmethod
+    def _schema_payload(form_schema: FormSchema) -> dict:
+        """Serialize a schema, leaving out option lists above LAZY_OPTIONS_THRESHOLD"""
+        payload = form_schema.dict()
+        if LAZY_OPTIONS_THRESHOLD <= 0:
+            return payload
+        for field in payload["fields"]:
+            options = field.get("options")
+            if options and len(options) > LAZY_OPTIONS_THRESHOLD:
+                field["options"] = []
+                field["optionsCount"] = len(options)
+                field["lazyOptions"] = True
+        return payload
+    
+    def _check_current_form(self, form_id: str) -> None:
+        """Ensure form_id names the current form (by form_id or title)"""
+        if self.current_form_schema is None:
+            raise HTTPException(status_code=404, detail="No form schema loaded")
+        if form_id not in (self.current_form_id, "current_form", self.current_form_schema.title):
+            raise HTTPException(status_code=404, detail="Form not found")
+    
+    def search_field_options(self, form_id: str, field_name: str, query: str = "", limit: int = 20) -> dict:
+        """Search a dropdown field's options by label prefix"""
+        self._check_current_form(form_id)
+        field = self.current_form.fields_by_name.get(field_name)
+        if field is None or field.options is None:
+            raise HTTPException(status_code=404, detail="Dropdown field not found")
+        
+        options, total = field.options.search(query, limit)
+        return {"options": options, "total": total}
     
     def get_current_schema(self) -> dict:
         """Get current form schema (always from file)"""
@@ -82,21 +247,24 @@ class FormService:
             raise HTTPException(status_code=404, detail="No form schema file found")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                schema_data = json.load(f)
+            with open(file_path, 'rb') as f:
+                file_content = f.read()
             
-            # Validate schema using Pydantic
-            form_schema = FormSchema(**schema_data)
-            
-            # Create dynamic Pydantic model for form submission validation
-            dynamic_model = DynamicFormSubmissionGenerator.create_submission_model(form_schema)
-            
-            # Store in memory for current session
-            self.current_form_schema = form_schema
-            self.current_dynamic_model = dynamic_model
-            self.current_form_id = "current_form"  # Fixed ID for current form
-            
-            return form_schema.dict()
+            # The file only needs parsing when it differs from the active schema
+            schema_hash = hashlib.sha256(file_content).hexdigest()
+            with self._schema_lock:
+                if schema_hash == self.current_schema_hash and self.current_form is not None:
+                    return self.current_schema_payload
+                
+                form_schema = self._parsed_schema(schema_hash)
+                if form_schema is None:
+                    # Validate schema using Pydantic
+                    form_schema = FormSchema(**json.loads(file_content))
+                
+                # Store in memory for current session
+                self._activate_schema(form_schema, "current_form", schema_hash)  # Fixed ID for current form
+                
+                return self.current_schema_payload
             
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in saved form file")
@@ -107,92 +275,159 @@ class FormService:
     
     def submit_form_data(self, submission_data: dict, db: Session) -> FormSubmissionResponse:
         """Submit and validate form data"""
-        if self.current_form_schema is None or self.current_dynamic_model is None:
+        if self.current_form is None:
             raise HTTPException(status_code=404, detail="No form schema loaded")
         
         try:
-            # Validate submission using Pydantic dynamic model
-            validated_data = self.current_dynamic_model(**submission_data)
+            # Validate submission against the compiled form
+            with profile_stage("validate"):
+                submitted_data, errors = self.current_form.validate(submission_data)
+            if errors:
+                return FormSubmissionResponse(
+                    success=False,
+                    errors=errors,
+                    message="Form has validation errors"
+                )
+            
+            with profile_stage("hash"):
+                data_hash = generate_data_hash(submitted_data)
             
             # Check for duplicate submission
-            if check_duplicate_submission(validated_data.dict(), db):
+            with profile_stage("duplicate_check"):
+                is_duplicate = check_duplicate_hash(data_hash, db)
+            if is_duplicate:
                 return FormSubmissionResponse(
                     success=False,
                     errors={"general": ["Identical form already submitted"]},
                     message="Identical form already submitted"
                 )
             
-            # Create fields mapping
-            fields_mapping = {f.name: f.label for f in self.current_form_schema.fields}
-            
-            # Create selected options labels for dropdown fields
-            selected_options_labels = {}
-            submitted_data = validated_data.dict()
-            
-            for field in self.current_form_schema.fields:
-                if field.type == "dropdown" and field.name in submitted_data:
-                    submitted_value = submitted_data[field.name]
+            with profile_stage("labels"):
+                # Create fields mapping
+                fields_mapping = self.current_form.fields_mapping
+                
+                # Create selected options labels for dropdown fields
+                selected_options_labels = {}
+                
+                for field_name, labels_by_value in self.current_form.option_labels.items():
+                    if field_name not in submitted_data:
+                        continue
+                    submitted_value = submitted_data[field_name]
                     
                     # Find the label for the selected value(s)
-                    if hasattr(field, 'options') and field.options:
-                        if isinstance(submitted_value, list):  # Multiple selection
-                            labels = []
-                            for value in submitted_value:
-                                for option in field.options:
-                                    if option.value == value:
-                                        labels.append(option.label)
-                                        break
-                            selected_options_labels[field.name] = labels
-                        else:  # Single selection
-                            for option in field.options:
-                                if option.value == submitted_value:
-                                    selected_options_labels[field.name] = option.label
-                                    break
-            
-            # Combine fields_mapping with selected_options_labels
-            final_mapping = {
-                "fields_mapping": fields_mapping,
-                "selected_options_labels": selected_options_labels
-            }
+                    if isinstance(submitted_value, list):  # Multiple selection
+                        selected_options_labels[field_name] = [
+                            labels_by_value[value] for value in submitted_value if value in labels_by_value
+                        ]
+                    elif submitted_value in labels_by_value:  # Single selection
+                        selected_options_labels[field_name] = labels_by_value[submitted_value]
+                
+                # Combine fields_mapping with selected_options_labels
+                final_mapping = {
+                    "fields_mapping": fields_mapping,
+                    "selected_options_labels": selected_options_labels
+                }
             
             # Save to database
-            db_submission = FormSubmissionDB(
-                form_title=self.current_form_schema.title,
-                data=json.dumps(submitted_data),
-                submitted_at=datetime.now().isoformat(),
-                data_hash=generate_data_hash(submitted_data),
-                fields_mapping=final_mapping
-            )
-            db.add(db_submission)
-            db.commit()
-            
-            return FormSubmissionResponse(
-                success=True,
-                message="Form submitted successfully"
-            )
-        
-        except ValidationError as e:
-            # Convert Pydantic validation errors to our format
-            errors = {}
-            for error in e.errors():
-                field_name = error['loc'][0] if error['loc'] else 'unknown'
-                error_message = error['msg']
+            with profile_stage("commit"):
+                submitted_on = datetime.now()
+                db_submission = FormSubmissionDB(
+                    form_title=self.current_form.title,
+                    data=json.dumps(submitted_data),
+                    submitted_at=submitted_on.isoformat(),
+                    submitted_on=submitted_on,
+                    data_hash=data_hash,
+                    fields_mapping=final_mapping
+                )
+                
+                def save(session: Session) -> list:
+                    add_submission(session, db_submission)
+                    # Other workers are notified by PostgreSQL when the transaction commits
+                    events = event_service.submission_events(db_submission)
+                    event_service.notify(session, events)
+                    return events
                 
-                if field_name not in errors:
-                    errors[field_name] = []
-                errors[field_name].append(error_message)
+                events = storage.write(db, save)
+
+        except DuplicateSubmissionError:
+            # A concurrent submit of the same data committed first
             return FormSubmissionResponse(
                 success=False,
-                errors=errors,
-                message="Form has validation errors"
+                errors={"general": ["Identical form already submitted"]},
+                message="Identical form already submitted"
             )
-        
         except Exception as e:
             return FormSubmissionResponse(
                 success=False,
                 errors={"general": [str(e)]},
-                message="General form error"
+                message=GENERAL_ERROR_MESSAGE
             )
+        
+        # The submission is committed from here on, so it is reported as stored whatever follows
+        self._after_submit(db_submission.form_title, submitted_on, events)
+        return FormSubmissionResponse(
+            success=True,
+            message="Form submitted successfully"
+        )
+    
+    @staticmethod
+    def _after_submit(form_title: str, submitted_on: datetime, events: list) -> None:
+        """Count, publish and sync a committed submission; each step is best effort"""
+        steps = (
+            lambda: rollup_service.record(form_title, submitted_on),
+            lambda: event_service.publish(events),
+            flatten_service.notify
+        )
+        for step in steps:
+            try:
+                step()
+            except Exception:
+                # A missed event is recovered by the client's resync; the flat table catches up on its interval
+                pass
+    
+    def submit_form_data_idempotent(self, idempotency_key: str, submission_data: dict,
+                                    db: Session) -> Tuple[FormSubmissionResponse, bool]:
+        """
+        Submit form data once per Idempotency-Key, replaying the first result for retries
+        
+        Returns:
+            The response and whether it was replayed from an earlier request
+        """
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        
+        data_hash = request_hash(submission_data)
+        try:
+            with idempotency_service.lock(idempotency_key):
+                stored = idempotency_service.get(idempotency_key, data_hash)
+                if stored is not None:
+                    return FormSubmissionResponse(**stored), True
+                
+                response = self.submit_form_data(submission_data, db)
+                # Unexpected errors may be transient, so a retry runs again
+                if response.message != GENERAL_ERROR_MESSAGE:
+                    idempotency_service.store(idempotency_key, data_hash, response.model_dump())
+                return response, False
+        except IdempotencyKeyMismatch as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    def validate_fields(self, form_id: str, data: dict, fields: Optional[List[str]] = None) -> FormSubmissionResponse:
+        """Validate some fields of a submission without storing it"""
+        self._check_current_form(form_id)
+        
+        # Unknown fields are ignored, as on submit; only fields downstream of the given ones are re-evaluated
+        errors, states = self.current_form.evaluate_fields(data, fields)
+        if errors:
+            return FormSubmissionResponse(
+                success=False, errors=errors, message="Form has validation errors", fields=states
+            )
+        return FormSubmissionResponse(success=True, message="Fields are valid", fields=states)
+    
+    def get_pattern_metrics(self) -> List[dict]:
+        """Get pattern engine and evaluation-time metrics for each field of the current form"""
+        if self.current_form is None:
+            return []
+        return [pattern.get_metrics() for pattern in self.current_form.compiled_patterns()]
 
 # Global instance
 form_service = FormService() 
\ No newline at end of file
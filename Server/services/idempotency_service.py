@@ -0,0 +1,136 @@
+"""
+Idempotency keys for form submission
+
+A client may send an Idempotency-Key header with POST /forms/submit. The
+result of the first request with that key is kept for IDEMPOTENCY_TTL_SECONDS
+and replayed for retries, without validating or touching the database again.
+Results live in a bounded in-memory cache and, with IDEMPOTENCY_SHARED, in the
+idempotency_keys table so every worker can replay them. Concurrent requests
+with the same key are serialized, so a retry that races the original waits
+for its result instead of being reported as a duplicate.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_SHARED
+from database import IdempotencyKeyDB, SessionLocal
+
+MAX_KEY_LENGTH = 255
+
+# Expired shared keys are deleted at most this often
+CLEANUP_INTERVAL_SECONDS = 60
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Raised when an idempotency key is reused with a different payload"""
+
+
+def request_hash(data: Dict[str, Any]) -> str:
+    """Fingerprint of a submission payload"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Service class for replaying submit results by Idempotency-Key"""
+
+    def __init__(self):
+        # key -> (expires at, request hash, response)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._key_locks = {}
+        self._last_cleanup = 0.0
+
+    @contextmanager
+    def lock(self, key: str):
+        """Serialize requests that share a key within this worker"""
+        with self._cache_lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._cache_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def get(self, key: str, data_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the stored response for a key, if any"""
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] <= now:
+                del self._cache[key]
+                cached = None
+        if cached is not None:
+            return self._check(cached[1], data_hash, cached[2])
+
+        if IDEMPOTENCY_SHARED:
+            stored = self._get_shared(key)
+            if stored is not None:
+                self._remember(key, stored[0], stored[1])
+                return self._check(stored[0], data_hash, stored[1])
+        return None
+
+    @staticmethod
+    def _check(stored_hash: str, data_hash: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        if stored_hash != data_hash:
+            raise IdempotencyKeyMismatch("Idempotency-Key was already used with a different payload")
+        return response
+
+    def store(self, key: str, data_hash: str, response: Dict[str, Any]) -> None:
+        """Keep a response for replay"""
+        self._remember(key, data_hash, response)
+        if IDEMPOTENCY_SHARED:
+            self._store_shared(key, data_hash, response)
+
+    def _remember(self, key: str, data_hash: str, response: Dict[str, Any]) -> None:
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, data_hash, response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > IDEMPOTENCY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _get_shared(key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        db = SessionLocal()
+        try:
+            row = db.get(IdempotencyKeyDB, key)
+            if row is None or row.created_at < datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS):
+                return None
+            return row.request_hash, row.response
+        finally:
+            db.close()
+
+    def _store_shared(self, key: str, data_hash: str, response: Dict[str, Any]) -> None:
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            if time.monotonic() - self._last_cleanup > CLEANUP_INTERVAL_SECONDS:
+                self._last_cleanup = time.monotonic()
+                db.query(IdempotencyKeyDB).filter(
+                    IdempotencyKeyDB.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+                ).delete(synchronize_session=False)
+            db.merge(IdempotencyKeyDB(key=key, request_hash=data_hash, response=response, created_at=now))
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the key first; its response is equivalent
+            db.rollback()
+        finally:
+            db.close()
+
+
+# Global instance
+idempotency_service = IdempotencyService()
@@ -0,0 +1,249 @@
+import asyncio
+import re
+import threading
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config import PARTITION_MONTHS_AHEAD, SUBMISSION_RETENTION_DAYS, PURGE_BATCH_SIZE, RETENTION_CHECK_INTERVAL_SECONDS
+from database import FormSubmissionDB, PurgeJobDB, SessionLocal, engine, is_partitioned
+from services.archive_service import archive_service
+from services.event_service import event_service
+from services.flatten_service import flatten_service
+
+PARTITION_NAME_PATTERN = re.compile(r"^form_submissions_p(\d{4})_(\d{2})$")
+
+# Finished purge jobs are kept this long for GET /submissions/purge-jobs/{id}
+FINISHED_JOB_RETENTION = timedelta(days=7)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class RetentionService:
+    """Service class for partition maintenance, purges and retention"""
+
+    def __init__(self):
+        self._partitioned = None
+
+    @property
+    def partitioned(self) -> bool:
+        """Whether form_submissions is a partitioned table (checked once)"""
+        if self._partitioned is None:
+            self._partitioned = is_partitioned()
+        return self._partitioned
+
+    def list_partitions(self) -> List[str]:
+        """List the monthly partitions of form_submissions, oldest first"""
+        if not self.partitioned:
+            return []
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'form_submissions'"
+            )).scalars().all()
+        return sorted(name for name in rows if PARTITION_NAME_PATTERN.match(name))
+
+    def ensure_partitions(self) -> Dict[str, Any]:
+        """Create the default partition and monthly partitions up to PARTITION_MONTHS_AHEAD"""
+        if not self.partitioned:
+            return {"partitioned": False}
+
+        created = []
+        month = _month_start(date.today())
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS form_submissions_default "
+                "PARTITION OF form_submissions DEFAULT"
+            ))
+            for _ in range(PARTITION_MONTHS_AHEAD + 1):
+                upper = _next_month(month)
+                name = f"form_submissions_p{month.year:04d}_{month.month:02d}"
+                result = conn.execute(text(
+                    "SELECT to_regclass(:name) IS NULL"
+                ), {"name": name}).scalar()
+                if result:
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF form_submissions "
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                    ))
+                    created.append(name)
+                month = upper
+
+        return {"partitioned": True, "created": created}
+
+    def purge_all(self, db: Session) -> None:
+        """Remove every submission, archived ones included, without a row-by-row delete where possible"""
+        if engine.dialect.name == "postgresql":
+            # TRUNCATE on the parent empties every partition without WAL per row
+            db.execute(text("TRUNCATE TABLE form_submissions"))
+        else:
+            db.query(FormSubmissionDB).delete()
+        db.commit()
+        archive_service.delete_submissions()
+
+    def apply_retention(self) -> Dict[str, Any]:
+        """Enforce SUBMISSION_RETENTION_DAYS by dropping old partitions and purging the rest"""
+        result = self.ensure_partitions()
+        self._prune_jobs()
+        if SUBMISSION_RETENTION_DAYS <= 0:
+            return {**result, "dropped": [], "job_id": None}
+
+        cutoff = datetime.now() - timedelta(days=SUBMISSION_RETENTION_DAYS)
+        dropped = []
+        for name in self.list_partitions():
+            year, month = PARTITION_NAME_PATTERN.match(name).groups()
+            upper = _next_month(date(int(year), int(month), 1))
+            if datetime.combine(upper, datetime.min.time()) <= cutoff:
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE form_submissions DETACH PARTITION {name}"))
+                    conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        if dropped:
+            flatten_service.prune_older_than(cutoff)
+            event_service.broadcast([("resync", {"reason": "retention"})])
+
+        # Rows left in the partition straddling the cutoff (or in a plain table)
+        job = self.start_purge_job(older_than=cutoff, run_async=False)
+        return {**result, "dropped": dropped, "job_id": job["id"]}
+
+    async def run_scheduler(self) -> None:
+        """Periodically create upcoming partitions and enforce the retention policy"""
+        while True:
+            await asyncio.sleep(RETENTION_CHECK_INTERVAL_SECONDS)
+            try:
+                await run_in_threadpool(self.apply_retention)
+            except Exception:
+                # A failed run is retried on the next interval
+                pass
+
+    def start_purge_job(self, form_title: Optional[str] = None, older_than: Optional[datetime] = None,
+                        run_async: bool = True) -> Dict[str, Any]:
+        """
+        Start a batched delete of one form's submissions and/or submissions older than a date
+
+        Jobs are stored in purge_jobs, so any worker can report their progress.
+        """
+        if form_title is None and older_than is None:
+            raise ValueError("A form title or an age limit is required")
+
+        db = SessionLocal()
+        try:
+            job = PurgeJobDB(
+                id=str(uuid.uuid4()),
+                status="pending",
+                form_title=form_title,
+                older_than=older_than,
+                deleted=0,
+                archived_deleted=0,
+                batches=0,
+                started_at=datetime.now()
+            )
+            db.add(job)
+            db.commit()
+            result = self._serialize_job(job)
+        finally:
+            db.close()
+
+        if not run_async:
+            self._run_purge_job(result["id"], form_title, older_than)
+            return self.get_job(result["id"])
+        threading.Thread(target=self._run_purge_job, args=(result["id"], form_title, older_than), daemon=True).start()
+        return result
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of a purge job"""
+        db = SessionLocal()
+        try:
+            job = db.get(PurgeJobDB, job_id)
+            return self._serialize_job(job) if job else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _serialize_job(job: PurgeJobDB) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "status": job.status,
+            "form_title": job.form_title,
+            "older_than": job.older_than.isoformat() if job.older_than else None,
+            "total": job.total,
+            "deleted": job.deleted,
+            "archived_deleted": job.archived_deleted,
+            "batches": job.batches,
+            "started_at": job.started_at.isoformat(),
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "error": job.error
+        }
+
+    @staticmethod
+    def _prune_jobs() -> None:
+        """Delete purge jobs that finished more than FINISHED_JOB_RETENTION ago"""
+        db = SessionLocal()
+        try:
+            db.query(PurgeJobDB).filter(
+                PurgeJobDB.finished_at < datetime.now() - FINISHED_JOB_RETENTION
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_purge_job(self, job_id: str, form_title: Optional[str], older_than: Optional[datetime]) -> None:
+        """Delete matching rows in PURGE_BATCH_SIZE chunks, one transaction per chunk, then their archived copies"""
+        conditions = []
+        if form_title is not None:
+            conditions.append(FormSubmissionDB.form_title == form_title)
+        if older_than is not None:
+            conditions.append(FormSubmissionDB.submitted_on < older_than)
+
+        db = SessionLocal()
+        try:
+            job = db.get(PurgeJobDB, job_id)
+            job.status = "running"
+            job.total = db.query(FormSubmissionDB.id).filter(*conditions).count()
+            db.commit()
+
+            while True:
+                ids = [row.id for row in db.query(FormSubmissionDB.id).filter(*conditions).limit(PURGE_BATCH_SIZE)]
+                if not ids:
+                    break
+                # Progress is committed with the batch it counts
+                db.query(FormSubmissionDB).filter(FormSubmissionDB.id.in_(ids)).delete(synchronize_session=False)
+                job.deleted += len(ids)
+                job.batches += 1
+                db.commit()
+                flatten_service.delete_submissions(ids)
+
+            # Matching submissions moved to cold storage go too
+            job.archived_deleted = archive_service.delete_submissions(form_title, older_than)
+
+            job.status = "completed"
+            job.finished_at = datetime.now()
+            db.commit()
+            if job.deleted or job.archived_deleted:
+                event_service.broadcast([("resync", {"reason": "purge"})])
+        except Exception as e:
+            db.rollback()
+            job = db.get(PurgeJobDB, job_id)
+            if job is not None:
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = datetime.now()
+                db.commit()
+        finally:
+            db.close()
+
+
+# Global instance
+retention_service = RetentionService()
@@ -0,0 +1,240 @@
+"""
+Re-validation of stored submissions
+
+When a schema is uploaded, the stored submissions of that form are checked
+against it in the background. A coordinator thread streams submissions in
+REVALIDATION_CHUNK_SIZE chunks (keyset by id) to a process pool whose workers
+each compile the schema once. Results and the run's cursor are committed
+together per chunk, in id order, so an interrupted run resumes after the last
+committed chunk.
+"""
+
+import json
+import multiprocessing
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import REVALIDATION_WORKERS, REVALIDATION_CHUNK_SIZE
+from database import FormSubmissionDB, RevalidationRunDB, RevalidationResultDB, SessionLocal
+
+ACTIVE_STATUSES = ("pending", "running")
+
+# Compiled form of the current worker process
+_worker_form = None
+
+
+def _init_worker(schema_data: Dict[str, Any]) -> None:
+    """Compile the run's schema once per worker process"""
+    global _worker_form
+    from models import FormSchema, CompiledForm
+    _worker_form = CompiledForm(FormSchema(**schema_data))
+
+
+def _validate_chunk(rows: List[Tuple[int, Any]]) -> List[Tuple[int, bool, Optional[Dict[str, List[str]]]]]:
+    """Validate (submission id, data) pairs, returning (id, compatible, errors) per submission"""
+    results = []
+    for submission_id, data in rows:
+        if isinstance(data, str):
+            data = json.loads(data)
+        _, errors = _worker_form.validate(data)
+        results.append((submission_id, not errors, errors or None))
+    return results
+
+
+class RevalidationService:
+    """Service class for re-validating stored submissions against a new schema"""
+
+    def start_run(self, form_title: str, schema_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Supersede active runs for the form and start re-validating its submissions"""
+        db = SessionLocal()
+        try:
+            active = db.query(RevalidationRunDB).filter(
+                RevalidationRunDB.form_title == form_title,
+                RevalidationRunDB.status.in_(ACTIVE_STATUSES)
+            ).all()
+            # Their coordinators stop at the next chunk once they see the new status
+            for run in active:
+                run.status = "superseded"
+                run.finished_at = datetime.now()
+
+            run = RevalidationRunDB(
+                id=str(uuid.uuid4()),
+                form_title=form_title,
+                form_schema=schema_data,
+                status="pending",
+                processed=0,
+                incompatible=0,
+                last_submission_id=0,
+                started_at=datetime.now()
+            )
+            db.add(run)
+            db.commit()
+            result = self._serialize_run(run)
+        finally:
+            db.close()
+
+        self._start_thread(result["id"])
+        return result
+
+    def resume_runs(self) -> Dict[str, Any]:
+        """Resume runs interrupted by a restart from their last committed chunk"""
+        db = SessionLocal()
+        try:
+            run_ids = [row.id for row in db.query(RevalidationRunDB.id).filter(
+                RevalidationRunDB.status.in_(ACTIVE_STATUSES)
+            )]
+        finally:
+            db.close()
+        for run_id in run_ids:
+            self._start_thread(run_id)
+        return {"resumed": len(run_ids)}
+
+    def resume_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Restart a failed run from its last committed chunk"""
+        db = SessionLocal()
+        try:
+            run = db.get(RevalidationRunDB, run_id)
+            if run is None:
+                return None
+            if run.status != "failed":
+                return self._serialize_run(run)
+            run.status = "pending"
+            run.error = None
+            run.finished_at = None
+            db.commit()
+            result = self._serialize_run(run)
+        finally:
+            db.close()
+
+        self._start_thread(run_id)
+        return result
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of a re-validation run"""
+        db = SessionLocal()
+        try:
+            run = db.get(RevalidationRunDB, run_id)
+            return self._serialize_run(run) if run else None
+        finally:
+            db.close()
+
+    def get_results(self, run_id: str, compatible: Optional[bool] = None, after_id: int = 0,
+                    limit: int = 100) -> Dict[str, Any]:
+        """Page through a run's per-submission results, ordered by submission id"""
+        db = SessionLocal()
+        try:
+            query = db.query(RevalidationResultDB).filter(
+                RevalidationResultDB.run_id == run_id,
+                RevalidationResultDB.submission_id > after_id
+            )
+            if compatible is not None:
+                query = query.filter(RevalidationResultDB.compatible == compatible)
+            rows = query.order_by(RevalidationResultDB.submission_id).limit(limit).all()
+            return {
+                "results": [
+                    {"submission_id": row.submission_id, "compatible": row.compatible, "errors": row.errors}
+                    for row in rows
+                ],
+                "next_after_id": rows[-1].submission_id if len(rows) == limit else None
+            }
+        finally:
+            db.close()
+
+    def _start_thread(self, run_id: str) -> None:
+        threading.Thread(target=self._run, args=(run_id,), daemon=True).start()
+
+    @staticmethod
+    def _finish(db, run_id: str, status: str, error: Optional[str] = None) -> None:
+        """Set a final status unless the run was superseded meanwhile"""
+        db.query(RevalidationRunDB).filter(
+            RevalidationRunDB.id == run_id,
+            RevalidationRunDB.status == "running"
+        ).update({"status": status, "error": error, "finished_at": datetime.now()}, synchronize_session=False)
+        db.commit()
+
+    def _run(self, run_id: str) -> None:
+        """Stream the form's submissions through the process pool, committing results per chunk"""
+        db = SessionLocal()
+        try:
+            run = db.get(RevalidationRunDB, run_id)
+            if run is None or run.status not in ACTIVE_STATUSES:
+                return
+            run.status = "running"
+            if run.total is None:
+                run.total = db.query(FormSubmissionDB.id).filter(
+                    FormSubmissionDB.form_title == run.form_title
+                ).count()
+            db.commit()
+
+            executor = ProcessPoolExecutor(
+                max_workers=REVALIDATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(run.form_schema,)
+            )
+            try:
+                cursor = run.last_submission_id
+                pending = deque()
+                exhausted = False
+                while True:
+                    # Keep a bounded number of chunks in flight so memory stays flat
+                    while not exhausted and len(pending) < REVALIDATION_WORKERS * 2:
+                        rows = db.query(FormSubmissionDB.id, FormSubmissionDB.data).filter(
+                            FormSubmissionDB.form_title == run.form_title,
+                            FormSubmissionDB.id > cursor
+                        ).order_by(FormSubmissionDB.id).limit(REVALIDATION_CHUNK_SIZE).all()
+                        if not rows:
+                            exhausted = True
+                            break
+                        cursor = rows[-1].id
+                        pending.append(executor.submit(_validate_chunk, [(row.id, row.data) for row in rows]))
+                    if not pending:
+                        break
+
+                    # Chunks are committed in submission order so the cursor never skips one
+                    results = pending.popleft().result()
+                    db.refresh(run)
+                    if run.status != "running":
+                        return
+                    db.add_all(
+                        RevalidationResultDB(run_id=run_id, submission_id=submission_id,
+                                             compatible=compatible, errors=errors)
+                        for submission_id, compatible, errors in results
+                    )
+                    run.processed += len(results)
+                    run.incompatible += sum(1 for _, compatible, _ in results if not compatible)
+                    run.last_submission_id = results[-1][0]
+                    db.commit()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+            self._finish(db, run_id, "completed")
+        except Exception as e:
+            db.rollback()
+            self._finish(db, run_id, "failed", str(e))
+        finally:
+            db.close()
+
+    @staticmethod
+    def _serialize_run(run: RevalidationRunDB) -> Dict[str, Any]:
+        return {
+            "id": run.id,
+            "form_title": run.form_title,
+            "status": run.status,
+            "total": run.total,
+            "processed": run.processed,
+            "compatible": run.processed - run.incompatible,
+            "incompatible": run.incompatible,
+            "progress": round(run.processed / run.total, 4) if run.total else (1.0 if run.status == "completed" else 0.0),
+            "started_at": run.started_at.isoformat() if run.started_at else None,
+            "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+            "error": run.error
+        }
+
+
+# Global instance
+revalidation_service = RevalidationService()
@@ -0,0 +1,321 @@
+"""
+Time-series submission rollups
+
+Submission counts are kept per form in minute, hour and day buckets:
+- every committed submission adds one to its minute bucket; counts are buffered
+  per worker and flushed periodically, so submits don't serialize on the
+  bucket row of their form
+- a compaction job downsamples closed minutes into hours and closed hours into
+  days, recording how far each coarse level is complete in rollup_watermarks,
+  then prunes fine buckets past their retention
+- counts flushed after their minute was compacted (e.g. retried after a failed
+  flush) are added to the coarse buckets as well
+On PostgreSQL, compaction holds an advisory lock that flushes share, so
+workers never compact the same buckets twice or flush while another compacts.
+
+A query reads the requested level up to its watermark and the finer levels
+after it, so its cost depends on the number of buckets, not on submissions.
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, bindparam, func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    ROLLUP_MINUTE_RETENTION_HOURS, ROLLUP_HOUR_RETENTION_DAYS, ROLLUP_FLUSH_INTERVAL_SECONDS,
+    ROLLUP_COMPACT_INTERVAL_SECONDS, ROLLUP_MAX_POINTS
+)
+from database import FormSubmissionDB, SubmissionRollupDB, RollupWatermarkDB, SessionLocal
+
+BUCKETS = ("minute", "hour", "day")
+BUCKET_SIZES = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Submissions committing just after a minute closes still belong to it
+COMPACTION_GRACE = timedelta(minutes=1)
+
+# Watermark row claimed by the one-time backfill of existing submissions
+BACKFILL_MARKER = "backfill"
+
+Counts = Dict[Tuple[str, datetime], int]
+
+
+def floor_bucket(moment: datetime, bucket: str) -> datetime:
+    """Start of the bucket containing a moment"""
+    if bucket == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(db: Session):
+    """Dialect-specific insert supporting ON CONFLICT"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(SubmissionRollupDB)
+
+
+# Text, not a dialect insert construct, so SQLAlchemy compiles it once and reuses it (ON CONFLICT is
+# the same on PostgreSQL and SQLite); bucket_start is typed so it is stored like the ORM stores it
+INCREMENT_SQL = text(
+    "INSERT INTO submission_rollups (bucket, form_title, bucket_start, count) "
+    "VALUES (:bucket, :form_title, :bucket_start, :count) "
+    "ON CONFLICT (bucket, form_title, bucket_start) DO UPDATE SET count = submission_rollups.count + excluded.count"
+).bindparams(bindparam("bucket_start", type_=DateTime))
+
+
+# Taken exclusively by compaction and shared by flushes, for one transaction
+ROLLUP_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext('submission_rollups'))")
+ROLLUP_SHARED_LOCK_SQL = text("SELECT pg_advisory_xact_lock_shared(hashtext('submission_rollups'))")
+
+
+def _lock_rollups(db: Session, shared: bool = False) -> None:
+    """Serialize compaction against other workers' compactions and flushes (SQLite runs one worker)"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(ROLLUP_SHARED_LOCK_SQL if shared else ROLLUP_LOCK_SQL)
+
+
+class RollupService:
+    """Service class for per-form submission counts over time"""
+
+    def __init__(self):
+        # Minute counts of committed submissions not written to submission_rollups yet
+        self._pending: Counts = defaultdict(int)
+        self._pending_lock = threading.Lock()
+
+    def record(self, form_title: str, submitted_on: datetime) -> None:
+        """Count a committed submission in its minute bucket; written by the next flush"""
+        with self._pending_lock:
+            self._pending[(form_title, floor_bucket(submitted_on, "minute"))] += 1
+
+    def flush(self) -> Dict[str, Any]:
+        """Add the buffered counts to their minute buckets in one transaction"""
+        with self._pending_lock:
+            counts, self._pending = self._pending, defaultdict(int)
+        if not counts:
+            return {"buckets": 0}
+        db = SessionLocal()
+        try:
+            _lock_rollups(db, shared=True)
+            db.execute(INCREMENT_SQL, [
+                {"bucket": "minute", "form_title": form_title, "bucket_start": bucket_start, "count": count}
+                for (form_title, bucket_start), count in counts.items()
+            ])
+            # Buckets already compacted would never see these counts, so they get them directly
+            late = counts
+            for coarse in ("hour", "day"):
+                watermark = self._watermark(db, coarse)
+                folded = defaultdict(int)
+                for (form_title, bucket_start), count in late.items():
+                    if bucket_start < watermark:
+                        folded[(form_title, floor_bucket(bucket_start, coarse))] += count
+                if not folded:
+                    break
+                self._add_counts(db, coarse, folded)
+                late = folded
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Kept for the next flush
+            with self._pending_lock:
+                for key, count in counts.items():
+                    self._pending[key] += count
+            raise
+        finally:
+            db.close()
+        return {"buckets": len(counts)}
+
+    @staticmethod
+    def _add_counts(db: Session, bucket: str, counts: Counts) -> None:
+        items = list(counts.items())
+        for start in range(0, len(items), 1000):
+            stmt = _upsert(db).values([
+                {"bucket": bucket, "form_title": form_title, "bucket_start": bucket_start, "count": count}
+                for (form_title, bucket_start), count in items[start:start + 1000]
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["bucket", "form_title", "bucket_start"],
+                set_={"count": SubmissionRollupDB.count + stmt.excluded.count}
+            ))
+
+    @staticmethod
+    def _watermark(db: Session, bucket: str) -> datetime:
+        row = db.get(RollupWatermarkDB, bucket)
+        return row.compacted_until if row else datetime.min
+
+    def backfill(self) -> Dict[str, Any]:
+        """Count submissions stored before rollups existed, once"""
+        db = SessionLocal()
+        try:
+            if db.get(RollupWatermarkDB, BACKFILL_MARKER) is not None:
+                return {"backfilled": 0}
+            # The marker's primary key makes concurrent workers' backfills fail instead of double counting
+            db.add(RollupWatermarkDB(bucket=BACKFILL_MARKER, compacted_until=datetime.now()))
+            db.flush()
+            if db.query(SubmissionRollupDB).first() is not None:
+                db.commit()
+                return {"backfilled": 0}
+
+            if db.get_bind().dialect.name == "postgresql":
+                minute = func.date_trunc("minute", FormSubmissionDB.submitted_on)
+            else:
+                minute = func.strftime("%Y-%m-%d %H:%M:00", FormSubmissionDB.submitted_on)
+            rows = db.query(FormSubmissionDB.form_title, minute, func.count()).group_by(
+                FormSubmissionDB.form_title, minute
+            ).all()
+            counts = {
+                (form_title, bucket_start if isinstance(bucket_start, datetime) else datetime.fromisoformat(bucket_start)): count
+                for form_title, bucket_start, count in rows
+            }
+            self._add_counts(db, "minute", counts)
+            db.commit()
+            return {"backfilled": sum(counts.values())}
+        except IntegrityError:
+            # Another worker claimed the backfill
+            db.rollback()
+            return {"backfilled": 0}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def compact(self) -> Dict[str, Any]:
+        """Downsample closed minutes into hours and closed hours into days, then prune"""
+        self.flush()
+        now = datetime.now() - COMPACTION_GRACE
+        result = {}
+        db = SessionLocal()
+        try:
+            for coarse, fine in (("hour", "minute"), ("day", "hour")):
+                until = floor_bucket(now, coarse)
+                _lock_rollups(db)
+                watermark = self._watermark(db, coarse)
+                if watermark >= until:
+                    db.commit()
+                    continue
+
+                counts = defaultdict(int)
+                for form_title, bucket_start, count in db.query(
+                    SubmissionRollupDB.form_title, SubmissionRollupDB.bucket_start, SubmissionRollupDB.count
+                ).filter(
+                    SubmissionRollupDB.bucket == fine,
+                    SubmissionRollupDB.bucket_start >= watermark,
+                    SubmissionRollupDB.bucket_start < until
+                ):
+                    counts[(form_title, floor_bucket(bucket_start, coarse))] += count
+                self._add_counts(db, coarse, counts)
+                db.merge(RollupWatermarkDB(bucket=coarse, compacted_until=until))
+                db.commit()
+                result[coarse] = len(counts)
+
+            # Fine buckets are only pruned once they are compacted
+            _lock_rollups(db)
+            for fine, coarse, retention in (
+                ("minute", "hour", timedelta(hours=ROLLUP_MINUTE_RETENTION_HOURS)),
+                ("hour", "day", timedelta(days=ROLLUP_HOUR_RETENTION_DAYS))
+            ):
+                cutoff = min(self._watermark(db, coarse), datetime.now() - retention)
+                db.query(SubmissionRollupDB).filter(
+                    SubmissionRollupDB.bucket == fine,
+                    SubmissionRollupDB.bucket_start < cutoff
+                ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        return result
+
+    def clear(self) -> None:
+        """Remove all rollups, e.g. after every submission was deleted"""
+        with self._pending_lock:
+            self._pending.clear()
+        db = SessionLocal()
+        try:
+            db.query(SubmissionRollupDB).delete()
+            db.query(RollupWatermarkDB).filter(RollupWatermarkDB.bucket != BACKFILL_MARKER).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def get_timeseries(self, db: Session, form_title: Optional[str], start: datetime, end: datetime,
+                       bucket: str) -> Dict[str, Any]:
+        """Get submission counts per bucket in [start, end), including empty buckets"""
+        # Buckets are in server-local time, like submitted_on
+        start, end = (moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment for moment in (start, end))
+        size = BUCKET_SIZES[bucket]
+        start = floor_bucket(start, bucket)
+        if end <= start:
+            raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+        points = -(-(end - start) // size)
+        if points > ROLLUP_MAX_POINTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Range spans {points} {bucket} buckets; the maximum is {ROLLUP_MAX_POINTS}"
+            )
+
+        counts = self._collect(db, bucket, form_title, start, end)
+        series = [
+            {"start": (start + size * i).isoformat(), "count": counts.get(start + size * i, 0)}
+            for i in range(points)
+        ]
+        return {
+            "form": form_title,
+            "bucket": bucket,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "total": sum(point["count"] for point in series),
+            "points": series
+        }
+
+    def _collect(self, db: Session, bucket: str, form_title: Optional[str], start: datetime,
+                 end: datetime) -> Dict[datetime, int]:
+        """Counts per bucket: compacted rows up to the watermark, finer buckets after it"""
+        level = BUCKETS.index(bucket)
+        cutoff = end if level == 0 else min(end, max(start, self._watermark(db, bucket)))
+
+        counts = defaultdict(int)
+        if cutoff > start:
+            query = db.query(SubmissionRollupDB.bucket_start, func.sum(SubmissionRollupDB.count)).filter(
+                SubmissionRollupDB.bucket == bucket,
+                SubmissionRollupDB.bucket_start >= start,
+                SubmissionRollupDB.bucket_start < cutoff
+            )
+            if form_title is not None:
+                query = query.filter(SubmissionRollupDB.form_title == form_title)
+            for bucket_start, count in query.group_by(SubmissionRollupDB.bucket_start):
+                counts[bucket_start] += int(count)
+
+        if cutoff < end:
+            for bucket_start, count in self._collect(db, BUCKETS[level - 1], form_title, cutoff, end).items():
+                counts[floor_bucket(bucket_start, bucket)] += count
+        return counts
+
+    async def run_scheduler(self) -> None:
+        """Periodically flush buffered counts, and compact and prune rollups"""
+        next_compaction = time.monotonic() + ROLLUP_COMPACT_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(ROLLUP_FLUSH_INTERVAL_SECONDS)
+            try:
+                if time.monotonic() >= next_compaction:
+                    next_compaction = time.monotonic() + ROLLUP_COMPACT_INTERVAL_SECONDS
+                    await run_in_threadpool(self.compact)
+                else:
+                    await run_in_threadpool(self.flush)
+            except Exception:
+                # A failed run is retried on the next interval
+                pass
+
+
+# Global instance
+rollup_service = RollupService()
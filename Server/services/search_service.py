@@ -0,0 +1,359 @@
+"""
+Submission search
+
+On PostgreSQL, searches are served from indexes over the submission document:
+- a `search_vector` column (string values of the submission) with a GIN index,
+  for full-text queries; a trigger fills it on insert
+- a jsonb_path_ops GIN index on the document, for exact field values
+- per-field expression indexes for range predicates on number and date fields
+  of the current schema
+Results are ordered newest first and paginated by id (keyset), so deep pages
+cost the same as the first. SQLite answers the same queries with its JSON1
+functions; range predicates on number and date fields use expression indexes
+over them, full-text and exact-value queries scan.
+
+None of this locks form_submissions against submits for longer than a catalog
+change: existing rows get their search vector from a batched background
+migration, and indexes are built with CREATE INDEX CONCURRENTLY.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import SEARCH_BACKFILL_BATCH_SIZE
+from database import FormSubmissionDB, engine
+
+# Submissions are stored as JSON-encoded strings by the submit endpoint and as
+# objects by older code paths; both are read as one jsonb document
+def _document_sql(column: str) -> str:
+    return f"(CASE WHEN json_typeof({column}) = 'string' THEN ({column} #>> '{{}}')::jsonb ELSE {column}::jsonb END)"
+
+
+def _search_vector_sql(column: str) -> str:
+    return f"jsonb_to_tsvector('simple', {_document_sql(column)}, '[\"string\"]')"
+
+
+DOCUMENT_SQL = _document_sql("data")
+SQLITE_DOCUMENT_SQL = "json_extract(data, '$')"
+
+# Fills search_vector on insert and when the document changes
+SEARCH_VECTOR_TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION form_submissions_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {_search_vector_sql("NEW.data")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+SEARCH_VECTOR_TRIGGER_SQL = (
+    "CREATE TRIGGER form_submissions_search_vector BEFORE INSERT OR UPDATE OF data ON form_submissions "
+    "FOR EACH ROW EXECUTE FUNCTION form_submissions_search_vector()"
+)
+
+# DDL gives up instead of queueing submits behind a lock it waits for
+DDL_LOCK_TIMEOUT = "5s"
+
+FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+RANGE_INDEXED_TYPES = ("number", "date")
+
+Predicate = Tuple[str, str, str]
+
+
+def parse_predicate(predicate: str) -> Predicate:
+    """Parse a `field:op:value` predicate"""
+    parts = predicate.split(":", 2)
+    if len(parts) != 3 or parts[1] not in OPERATORS or not FIELD_NAME_PATTERN.match(parts[0]):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid predicate '{predicate}'; expected field:op:value with op in {', '.join(OPERATORS)}"
+        )
+    return parts[0], parts[1], parts[2]
+
+
+def _parse_number(value: str) -> Optional[Decimal]:
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def _field_text_sql(field_name: str) -> str:
+    return f"({DOCUMENT_SQL} ->> '{field_name}')"
+
+
+def _field_number_sql(field_name: str) -> str:
+    # Non-numeric values (e.g. from an older schema) index as NULL instead of failing the cast
+    value = _field_text_sql(field_name)
+    return f"(CASE WHEN {value} ~ '^-?[0-9]+(\\.[0-9]+)?$' THEN {value}::numeric END)"
+
+
+def _sqlite_field_sql(field_name: str) -> str:
+    return f"json_extract({SQLITE_DOCUMENT_SQL}, '$.{field_name}')"
+
+
+def _sqlite_field_number_sql(field_name: str) -> str:
+    return f"CAST({_sqlite_field_sql(field_name)} AS REAL)"
+
+
+def _partition_index_name(index_name: str, partition: str) -> str:
+    """Name of an index's copy on one partition, within PostgreSQL's 63-character limit"""
+    digest = hashlib.sha1(partition.encode()).hexdigest()[:8]
+    return f"{index_name[:54]}_{digest}"
+
+
+def _index_name(field_name: str, kind: str) -> str:
+    """Index name within PostgreSQL's 63-character limit"""
+    name = f"ix_form_submissions_f_{field_name.lower()}_{kind}"
+    if len(name) > 63:
+        digest = hashlib.sha1(field_name.encode()).hexdigest()[:8]
+        name = f"ix_form_submissions_f_{field_name.lower()[:30]}_{digest}_{kind}"
+    return name
+
+
+def _index_is_valid(conn, name: str) -> Optional[bool]:
+    """Whether an index is usable; None if it doesn't exist"""
+    return conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+    ).scalar()
+
+
+def _build_index_concurrently(conn, name: str, table: str, definition: str) -> None:
+    # An interrupted concurrent build leaves an invalid index behind
+    if _index_is_valid(conn, name) is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"))
+
+
+def _create_index(conn, name: str, definition: str) -> None:
+    """
+    Build an index on form_submissions without blocking writes
+
+    Runs on an autocommit connection, as CREATE INDEX CONCURRENTLY can't run in
+    a transaction block. It can't run on a partitioned table either, so there
+    the index is created ON ONLY the parent, where it starts out invalid. Each
+    partition's copy is then built concurrently and attached, and the parent
+    index becomes valid once every partition has one.
+    """
+    if _index_is_valid(conn, name):
+        return
+    partitioned = conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'form_submissions'::regclass")
+    ).first()
+    if partitioned is None:
+        _build_index_concurrently(conn, name, "form_submissions", definition)
+        return
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY form_submissions {definition}"))
+    # Partitions created after the parent index got their copy with it
+    partitions = conn.execute(text(
+        "SELECT p.inhrelid::regclass::text FROM pg_inherits p "
+        "WHERE p.inhparent = 'form_submissions'::regclass AND NOT EXISTS ("
+        "SELECT 1 FROM pg_inherits i JOIN pg_index x ON x.indexrelid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name) AND x.indrelid = p.inhrelid)"
+    ), {"name": name}).scalars().all()
+    for partition in partitions:
+        partition_index = _partition_index_name(name, partition)
+        _build_index_concurrently(conn, partition_index, partition, definition)
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}"))
+
+
+class SearchService:
+    """Service class for full-text and field-value search over submissions"""
+
+    def __init__(self):
+        self._indexed_fields = set()
+        self._lock = threading.Lock()
+        self._migration = None
+
+    @property
+    def indexed(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def ensure_indexes(self) -> Dict[str, Any]:
+        """
+        Add the search vector column and its trigger, and start the search migration
+
+        Both are catalog changes: the column is nullable without a default, so
+        the table isn't rewritten. Backfilling existing rows and building the
+        indexes is left to the migration thread.
+        """
+        if not self.indexed:
+            return {"indexed": False}
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+            conn.execute(text("ALTER TABLE form_submissions ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            conn.execute(text(SEARCH_VECTOR_TRIGGER_FUNCTION_SQL))
+            has_trigger = conn.execute(text(
+                "SELECT 1 FROM pg_trigger WHERE tgrelid = 'form_submissions'::regclass "
+                "AND tgname = 'form_submissions_search_vector'"
+            )).first()
+            if has_trigger is None:
+                conn.execute(text(SEARCH_VECTOR_TRIGGER_SQL))
+        with self._lock:
+            if self._migration is None or not self._migration.is_alive():
+                self._migration = threading.Thread(target=self._migrate, name="search-migration", daemon=True)
+                self._migration.start()
+        return {"indexed": True, "migration": "started"}
+
+    def _migrate(self) -> None:
+        """Backfill search vectors and build the document indexes, in one worker at a time"""
+        try:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                locked = conn.execute(text("SELECT pg_try_advisory_lock(hashtext('form_submissions_search'))")).scalar()
+                if not locked:
+                    return
+                try:
+                    _create_index(conn, "ix_form_submissions_document", f"USING GIN ({DOCUMENT_SQL} jsonb_path_ops)")
+                    self._backfill_search_vectors(conn)
+                    _create_index(conn, "ix_form_submissions_search_vector", "USING GIN (search_vector)")
+                finally:
+                    conn.execute(text("SELECT pg_advisory_unlock(hashtext('form_submissions_search'))"))
+        except Exception:
+            # Searches still work meanwhile; the migration resumes on the next start
+            pass
+
+    @staticmethod
+    def _backfill_search_vectors(conn) -> None:
+        """Fill search_vector of rows inserted before the trigger, one id range per transaction"""
+        # Rows inserted after the trigger was created already have their vector
+        last_id = conn.execute(text("SELECT max(id) FROM form_submissions")).scalar()
+        after = 0
+        while last_id is not None and after < last_id:
+            batch_end = conn.execute(text(
+                "SELECT max(id) FROM (SELECT id FROM form_submissions WHERE id > :after "
+                "ORDER BY id LIMIT :limit) AS batch"
+            ), {"after": after, "limit": SEARCH_BACKFILL_BATCH_SIZE}).scalar()
+            if batch_end is None:
+                break
+            conn.execute(text(
+                f"UPDATE form_submissions SET search_vector = {_search_vector_sql('data')} "
+                "WHERE id > :after AND id <= :batch_end AND search_vector IS NULL"
+            ), {"after": after, "batch_end": batch_end})
+            after = batch_end
+
+    def ensure_field_indexes(self, form_schema, run_async: bool = True) -> None:
+        """Create range indexes for the number and date fields of a schema"""
+        if engine.dialect.name not in ("postgresql", "sqlite"):
+            return
+        fields = [
+            (field.name, field.type) for field in form_schema.fields
+            if field.type in RANGE_INDEXED_TYPES and FIELD_NAME_PATTERN.match(field.name)
+        ]
+        with self._lock:
+            fields = [field for field in fields if field not in self._indexed_fields]
+        if not fields:
+            return
+        if run_async:
+            threading.Thread(target=self._create_field_indexes, args=(fields,), daemon=True).start()
+        else:
+            self._create_field_indexes(fields)
+
+    def _create_field_indexes(self, fields: List[Tuple[str, str]]) -> None:
+        for field_name, field_type in fields:
+            if not self.indexed:
+                # Queries must repeat the indexed expression exactly for SQLite to use the index
+                if field_type == "number":
+                    name, expression = _index_name(field_name, "num"), _sqlite_field_number_sql(field_name)
+                else:
+                    name, expression = _index_name(field_name, "txt"), _sqlite_field_sql(field_name)
+            elif field_type == "number":
+                name, expression = _index_name(field_name, "num"), _field_number_sql(field_name)
+            else:
+                # ISO dates order correctly as text; a date cast is not immutable
+                name, expression = _index_name(field_name, "txt"), _field_text_sql(field_name)
+            try:
+                if self.indexed:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        _create_index(conn, name, f"({expression})")
+                else:
+                    with engine.begin() as conn:
+                        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON form_submissions ({expression})"))
+                with self._lock:
+                    self._indexed_fields.add((field_name, field_type))
+            except Exception:
+                # Searches still work without the index; retried on the next schema load
+                pass
+
+    def search(self, db: Session, q: Optional[str] = None, form_title: Optional[str] = None,
+               predicates: Optional[List[Predicate]] = None, before_id: Optional[int] = None,
+               limit: int = 50) -> Dict[str, Any]:
+        """Find submissions by full-text query and field predicates, newest first"""
+        query = db.query(FormSubmissionDB)
+        if form_title is not None:
+            query = query.filter(FormSubmissionDB.form_title == form_title)
+        if before_id is not None:
+            query = query.filter(FormSubmissionDB.id < before_id)
+
+        conditions = []
+        if q:
+            conditions.append(self._text_condition(q))
+        for index, predicate in enumerate(predicates or []):
+            conditions.append(self._predicate_condition(index, *predicate))
+        for condition, params in conditions:
+            query = query.filter(text(condition).bindparams(**params))
+
+        rows = query.order_by(FormSubmissionDB.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "results": [
+                {
+                    "id": row.id,
+                    "form_title": row.form_title,
+                    "data": row.data,
+                    "submitted_at": row.submitted_at,
+                    "fields_mapping": row.fields_mapping
+                }
+                for row in rows
+            ],
+            "next_before_id": rows[-1].id if has_more else None
+        }
+
+    def _text_condition(self, q: str) -> Tuple[str, Dict[str, Any]]:
+        if self.indexed:
+            return "search_vector @@ websearch_to_tsquery('simple', :q)", {"q": q}
+        terms = q.split()
+        condition = " AND ".join(f"{SQLITE_DOCUMENT_SQL} LIKE :q{i}" for i in range(len(terms)))
+        return condition or "1 = 1", {f"q{i}": f"%{term}%" for i, term in enumerate(terms)}
+
+    def _predicate_condition(self, index: int, field_name: str, op: str, value: str) -> Tuple[str, Dict[str, Any]]:
+        p = f"p{index}"
+        number = _parse_number(value)
+
+        if op == "eq":
+            if self.indexed:
+                # Containment is served by the document GIN index; arrays match multiselect values
+                candidates = [{field_name: value}, {field_name: [value]}]
+                if number is not None:
+                    candidates.append({field_name: float(number) if number != number.to_integral() else int(number)})
+                params = {f"{p}_{i}": json.dumps(candidate) for i, candidate in enumerate(candidates)}
+                condition = " OR ".join(f"{DOCUMENT_SQL} @> CAST(:{name} AS jsonb)" for name in params)
+                return f"({condition})", params
+            # json_each yields a scalar once and each element of an array
+            params = {f"{p}_s": value, f"{p}_n": float(number) if number is not None else None}
+            return (
+                f"EXISTS (SELECT 1 FROM json_each({SQLITE_DOCUMENT_SQL}, '$.{field_name}') "
+                f"WHERE value IN (:{p}_s, :{p}_n))"
+            ), params
+
+        sql_op = OPERATORS[op]
+        if number is not None:
+            if self.indexed:
+                return f"{_field_number_sql(field_name)} {sql_op} CAST(:{p} AS numeric)", {p: str(number)}
+            return f"{_sqlite_field_number_sql(field_name)} {sql_op} :{p}", {p: float(number)}
+        if self.indexed:
+            return f"{_field_text_sql(field_name)} {sql_op} :{p}", {p: value}
+        return f"{_sqlite_field_sql(field_name)} {sql_op} :{p}", {p: value}
+
+
+# Global instance
+search_service = SearchService()
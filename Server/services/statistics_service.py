@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from datetime import datetime
 from collections import defaultdict
 
 from database import FormSubmissionDB
+from middleware.profiling import profile_stage
+from services.flatten_service import flatten_service
+from services.rollup_service import rollup_service
 
 
 class StatisticsService:
@@ -10,8 +14,23 @@ class StatisticsService:
     
     def get_statistics(self, db: Session) -> Dict[str, Any]:
         """Get form submission statistics"""
-        submissions = db.query(FormSubmissionDB).all()
+        with profile_stage("query"):
+            submissions = db.query(FormSubmissionDB).all()
         
+        with profile_stage("aggregate"):
+            return self._build_statistics(submissions)
+    
+    def get_field_statistics(self, form_title: str) -> Optional[Dict[str, Any]]:
+        """Get per-field statistics of a form from its typed flat table"""
+        return flatten_service.get_field_statistics(form_title)
+    
+    def get_timeseries(self, db: Session, form_title: Optional[str], start: datetime, end: datetime,
+                       bucket: str) -> Dict[str, Any]:
+        """Get submission volume per time bucket from the rollup tables"""
+        return rollup_service.get_timeseries(db, form_title, start, end, bucket)
+    
+    def _build_statistics(self, submissions) -> Dict[str, Any]:
+        """Aggregate submission rows into per-form statistics"""
         # Count submissions by form title
         form_counts = defaultdict(int)
         form_fields = {}  # Store fields for each form
@@ -1,11 +1,18 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import json
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
 import uuid
 
 
-from database import FormSubmissionDB, generate_data_hash, check_duplicate_submission
+from database import FormSubmissionDB, storage, generate_data_hash, check_duplicate_submission, add_submission
+from middleware.profiling import profile_stage
+from services.retention_service import retention_service
+from services.archive_service import archive_service
+from services.event_service import event_service
+from services.flatten_service import flatten_service
+from services.rollup_service import rollup_service
 
 class SubmissionService:
     """Service class for submission-related business logic"""
@@ -19,7 +26,8 @@ class SubmissionService:
         # Generate unique ID and hash
         submission_id = str(uuid.uuid4())
         data_hash = generate_data_hash(form_data)
-        submitted_at = datetime.now().isoformat()
+        submitted_on = datetime.now()
+        submitted_at = submitted_on.isoformat()
         
         # Create new submission
         submission = FormSubmissionDB(
@@ -27,12 +35,15 @@ class SubmissionService:
             form_title=form_title,
             data=form_data,
             submitted_at=submitted_at,
+            submitted_on=submitted_on,
             data_hash=data_hash
         )
         
-        db.add(submission)
-        db.commit()
-        db.refresh(submission)
+        def save(session: Session) -> None:
+            add_submission(session, submission)
+        
+        storage.write(db, save)
+        rollup_service.record(form_title, submitted_on)
         
         return {
             "id": submission.id,
@@ -42,29 +53,83 @@ class SubmissionService:
             "message": "Form saved successfully"
         }
     
-    def get_all_submissions(self, db: Session) -> List[Dict[str, Any]]:
-        """Get all form submissions from database"""
-        submissions = db.query(FormSubmissionDB).all()
+    def get_all_submissions(self, db: Session, include_archived: bool = False) -> List[Dict[str, Any]]:
+        """Get all form submissions from database, optionally preceded by archived ones"""
+        with profile_stage("query"):
+            submissions = db.query(FormSubmissionDB).all()
         
-        result = []
-        for submission in submissions:
-            result.append({
-                "id": submission.id,
-                "form_title": submission.form_title,
-                "data": submission.data,
-                "submitted_at": submission.submitted_at,
-                "fields_mapping": submission.fields_mapping
-            })
+        with profile_stage("serialize"):
+            result = []
+            if include_archived:
+                result.extend(archive_service.iter_submissions())
+            for submission in submissions:
+                result.append({
+                    "id": submission.id,
+                    "form_title": submission.form_title,
+                    "data": submission.data,
+                    "submitted_at": submission.submitted_at,
+                    "fields_mapping": submission.fields_mapping
+                })
         
         return result
     
 
     
+    def get_submission_summaries(self, db: Session, before_id: Optional[int] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Get a page of submission summaries, newest first
+        
+        Only id, form title and submission time are read, so a page costs the
+        same however large the submissions are; the full submission comes from
+        get_submission. The total is counted for the first page only.
+        """
+        with profile_stage("query"):
+            query = db.query(FormSubmissionDB.id, FormSubmissionDB.form_title, FormSubmissionDB.submitted_at)
+            if before_id is not None:
+                query = query.filter(FormSubmissionDB.id < before_id)
+            rows = query.order_by(FormSubmissionDB.id.desc()).limit(limit + 1).all()
+            total = db.query(func.count(FormSubmissionDB.id)).scalar() if before_id is None else None
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "results": [
+                {"id": row.id, "form_title": row.form_title, "submitted_at": row.submitted_at}
+                for row in rows
+            ],
+            "next_before_id": rows[-1].id if has_more else None,
+            "total": total
+        }
+    
+    def get_submission(self, db: Session, submission_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single submission from the database or, failing that, from the archive"""
+        submission = db.query(FormSubmissionDB).filter(FormSubmissionDB.id == submission_id).first()
+        if submission is None:
+            return archive_service.get_submission(submission_id)
+        return {
+            "id": submission.id,
+            "form_title": submission.form_title,
+            "data": submission.data,
+            "submitted_at": submission.submitted_at,
+            "fields_mapping": submission.fields_mapping
+        }
+    
     def delete_all_submissions(self, db: Session) -> Dict[str, str]:
         """Delete all form submissions from database"""
-        db.query(FormSubmissionDB).delete()
-        db.commit()
+        retention_service.purge_all(db)
+        flatten_service.clear_all()
+        rollup_service.clear()
+        event_service.broadcast([("submissions_cleared", {})])
         return {"message": "All forms deleted successfully"}
+    
+    def start_purge_job(self, form_title: Optional[str] = None, older_than_days: Optional[int] = None) -> Dict[str, Any]:
+        """Start a background batched delete by form and/or submission age"""
+        older_than = datetime.now() - timedelta(days=older_than_days) if older_than_days is not None else None
+        return retention_service.start_purge_job(form_title=form_title, older_than=older_than)
+    
+    def get_purge_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get progress of a background purge job"""
+        return retention_service.get_job(job_id)
 
 # Global instance
 submission_service = SubmissionService() 
\ No newline at end of file
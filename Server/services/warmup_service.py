@@ -0,0 +1,69 @@
+import time
+from typing import Dict, Any
+
+from config import WARMUP_POOL_CONNECTIONS
+from database import create_tables, warm_up_pool, read_router, storage
+from services.form_service import form_service
+from services.retention_service import retention_service
+from services.revalidation_service import revalidation_service
+from services.search_service import search_service
+from services.rollup_service import rollup_service
+
+
+class WarmupService:
+    """Service class for startup warm-up and readiness reporting"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = None
+        self.startup_duration_ms = None
+        self.steps = {}
+        self.errors = {}
+
+    def run(self) -> bool:
+        """Run every warm-up step and mark the worker ready if all of them succeed"""
+        self.ready = False
+        self.steps = {}
+        self.errors = {}
+        self.started_at = time.perf_counter()
+
+        self._run_step("storage", storage.start)
+        self._run_step("database_tables", create_tables)
+        self._run_step("partitions", retention_service.ensure_partitions)
+        self._run_step("search_indexes", search_service.ensure_indexes)
+        self._run_step("rollups", rollup_service.backfill)
+        self._run_step("connection_pool", lambda: {"connections": warm_up_pool(WARMUP_POOL_CONNECTIONS)})
+        self._run_step("read_replicas", read_router.check)
+        self._run_step("form_schema", form_service.warm_up)
+        self._run_step("revalidation_runs", revalidation_service.resume_runs)
+
+        self.startup_duration_ms = round((time.perf_counter() - self.started_at) * 1000, 2)
+        self.ready = not self.errors
+        return self.ready
+
+    def _run_step(self, name: str, step) -> None:
+        """Run a single warm-up step, recording its duration and any failure"""
+        step_started = time.perf_counter()
+        try:
+            result = step()
+            self.steps[name] = {"status": "ok", **(result or {})}
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            self.steps[name] = {"status": "failed"}
+            self.errors[name] = detail
+        self.steps[name]["duration_ms"] = round((time.perf_counter() - step_started) * 1000, 2)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get readiness status with startup timings"""
+        status = {
+            "status": "ready" if self.ready else "not_ready",
+            "startup_duration_ms": self.startup_duration_ms,
+            "steps": self.steps
+        }
+        if self.errors:
+            status["errors"] = self.errors
+        return status
+
+
+# Global instance
+warmup_service = WarmupService()
@@ -0,0 +1,313 @@
+"""
+Storage backends
+
+The server stores everything through SQLAlchemy on one of two backends:
+- PostgreSQL: the default; the request session writes and commits directly
+- SQLite: a local database file for edge and single-node deployments and
+  benchmarks, tuned for throughput:
+  - WAL journal, so readers never block the writer or each other
+  - synchronous=NORMAL, so commits don't wait for an fsync (a power loss can
+    lose the last commits, never corrupt the file)
+  - one writer thread with its own connection: submissions are queued and
+    committed in batches, one transaction per batch, so concurrent submits
+    don't contend for the write lock
+  - a per-connection prepared statement cache
+  - JSON1 functions for field queries, with expression indexes on them
+
+A backend configures the engine (connect arguments and per-connection
+settings) and runs writes, so services don't depend on the database.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from config import (
+    DATABASE_URL, STORAGE_BACKEND, SQLITE_PATH, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE,
+    SQLITE_STATEMENT_CACHE_SIZE, SQLITE_WRITE_BATCH_SIZE, SQLITE_WRITE_BATCH_WAIT_MS, DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+
+Write = Callable[[Session], Any]
+
+
+class StorageBackend:
+    """PostgreSQL storage; the base for other backends"""
+
+    name = "postgresql"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def engine_options(self) -> Dict[str, Any]:
+        """Keyword arguments for create_engine"""
+        return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": True}
+
+    def attach(self, engine) -> None:
+        """Configure a newly created engine"""
+
+    def write(self, db: Session, work: Write) -> Any:
+        """
+        Run a write and commit it
+
+        Args:
+            db: The request's session
+            work: Adds and flushes the rows; runs inside the transaction
+
+        Returns:
+            What work returned, once committed
+        """
+        try:
+            result = work(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+
+    def start(self) -> Dict[str, Any]:
+        """Start background workers and check the backend's requirements"""
+        return {"backend": self.name}
+
+    def stop(self) -> None:
+        """Finish queued writes and stop background workers"""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class WriteQueue:
+    """
+    A single writer thread committing queued writes in batches
+
+    A batch runs in one transaction and is committed once, after which
+    every caller gets its result. When a write fails (e.g. a duplicate), the
+    batch is rolled back and run again with a savepoint per write, so only
+    the failing write is rejected; writes must therefore be safe to run twice.
+    """
+
+    def __init__(self, engine, batch_size: int, batch_wait_ms: float):
+        self.engine = engine
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = max(batch_wait_ms, 0) / 1000
+        self.batches = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.retried_batches = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, work: Write) -> Any:
+        """Queue a write and wait until its batch is committed"""
+        self.start()
+        future = Future()
+        self._queue.put((work, future))
+        return future.result()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self) -> None:
+        # One connection for the thread's lifetime keeps its statement cache warm
+        connection = None
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    if connection is None:
+                        # Explicit transactions, so savepoints work; the pool restores the driver's own on release
+                        connection = self.engine.connect().execution_options(
+                            isolation_level="AUTOCOMMIT", sqlite_begin="BEGIN IMMEDIATE"
+                        )
+                    self._commit(connection, batch)
+                except Exception as e:
+                    # The whole batch failed (e.g. the database is locked or gone); the next one reconnects
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    if connection is not None:
+                        connection.invalidate()
+                        connection = None
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _next_batch(self) -> Optional[list]:
+        job = self._queue.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # Stop after this batch
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _commit(self, connection, batch: list) -> None:
+        try:
+            done = self._run_batch(connection, batch, isolate=False)
+        except Exception:
+            # Some write failed; run the batch again with a savepoint per write, so only failing writes are rejected
+            self.retried_batches += 1
+            done = self._run_batch(connection, batch, isolate=True)
+
+        self.batches += 1
+        self.writes += len(done)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for future, result in done:
+            future.set_result(result)
+
+    def _run_batch(self, connection, batch: list, isolate: bool) -> list:
+        """Run a batch's writes in one transaction and commit it; results are handed out after the commit"""
+        done = []
+        # Results stay readable after the commit, in the callers' threads
+        db = Session(bind=connection, autoflush=False, expire_on_commit=False)
+        try:
+            for work, future in batch:
+                if not isolate:
+                    done.append((future, work(db)))
+                    continue
+                savepoint = db.begin_nested()
+                try:
+                    result = work(db)
+                    db.flush()
+                    savepoint.commit()
+                    done.append((future, result))
+                except Exception as e:
+                    savepoint.rollback()
+                    self.failed_writes += 1
+                    future.set_exception(e)
+            db.commit()
+            return done
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "retried_batches": self.retried_batches,
+            "average_batch": round(self.writes / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch
+        }
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite storage tuned for a single node"""
+
+    name = "sqlite"
+
+    def __init__(self, url: str):
+        super().__init__(url)
+        self.writer = None
+        self.engine = None
+        self.in_memory = make_url(url).database in (None, "", ":memory:")
+
+    def engine_options(self) -> Dict[str, Any]:
+        if self.in_memory:
+            # An in-memory database exists once per connection; it gets no pool or writer tuning
+            return {"connect_args": {"check_same_thread": False}}
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "connect_args": {
+                "check_same_thread": False,
+                "cached_statements": SQLITE_STATEMENT_CACHE_SIZE,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000
+            }
+        }
+
+    def attach(self, engine) -> None:
+        self.engine = engine
+        if not self.in_memory:
+            self.writer = WriteQueue(engine, SQLITE_WRITE_BATCH_SIZE, SQLITE_WRITE_BATCH_WAIT_MS)
+
+        @event.listens_for(engine, "connect")
+        def configure_connection(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE_KB)}")
+            cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def begin_transaction(connection):
+            # Other sessions keep pysqlite's lazy begin: reads hold no snapshot, and a transaction starts at
+            # its first write, waiting out busy_timeout. The writer takes the write lock up front instead.
+            begin = connection.get_execution_options().get("sqlite_begin")
+            if begin:
+                connection.exec_driver_sql(begin)
+
+    def write(self, db: Session, work: Write) -> Any:
+        if self.writer is None:
+            return super().write(db, work)
+        # The request's read transaction must not hold a snapshot while the writer commits
+        db.rollback()
+        return self.writer.submit(work)
+
+    def start(self) -> Dict[str, Any]:
+        if self.writer is not None:
+            self.writer.start()
+        with self.engine.connect() as conn:
+            journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+            # Field queries and search need the JSON1 functions
+            conn.exec_driver_sql("SELECT json_extract('{\"a\": 1}', '$.a')").scalar()
+        return {"backend": self.name, "journal_mode": journal_mode, "path": make_url(self.url).database}
+
+    def stop(self) -> None:
+        if self.writer is not None:
+            self.writer.stop()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name, "writer": self.writer.metrics() if self.writer else None}
+
+
+def database_url() -> str:
+    """The URL of the configured backend"""
+    if STORAGE_BACKEND == "sqlite" and not DATABASE_URL.startswith("sqlite"):
+        os.makedirs(os.path.dirname(SQLITE_PATH) or ".", exist_ok=True)
+        return f"sqlite:///{SQLITE_PATH}"
+    return DATABASE_URL
+
+
+def create_backend(url: str) -> StorageBackend:
+    """Storage backend for a database URL"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return SQLiteBackend(url)
+    return StorageBackend(url)
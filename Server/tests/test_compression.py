@@ -0,0 +1,34 @@
+import zlib
+
+import pytest
+
+from middleware.compression import StreamEncoder, negotiate
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, br, zstd", "zstd"),
+    ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+    ("zstd;q=0, gzip", "gzip"),
+    ("*", "zstd"),
+    ("*, zstd;q=0", "br"),
+    ("identity", None),
+    ("gzip;q=oops", None),
+    ("", None),
+])
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+@pytest.mark.parametrize("level", [0, 1, 9])
+def test_gzip_stream_round_trips(level):
+    encoder = StreamEncoder("gzip", level)
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = [b'{"id": 1}' * 50, b"", b'{"id": 2}' * 50]
+    received = b""
+    for sent, chunk in enumerate(chunks, 1):
+        # Every flushed chunk decodes on its own, so streams are not held back
+        received += decoder.decompress(encoder.encode(chunk, final=False))
+        assert received == b"".join(chunks[:sent])
+    received += decoder.decompress(encoder.encode(b"", final=True))
+    assert received == b"".join(chunks)
+    assert decoder.eof
@@ -0,0 +1,81 @@
+import pytest
+
+from models.expressions import Expression, FieldGraph, MAX_EXPRESSION_LENGTH, MAX_ROUND_DIGITS
+
+
+@pytest.mark.parametrize("source, values, expected", [
+    ("price * quantity", {"price": 2.5, "quantity": 4}, 10.0),
+    ("total % 7", {"total": 23}, 2),
+    ("round(price, 2)", {"price": 1.23456}, 1.23),
+    ("len(tags) if tags else 0", {"tags": ["a", "b"]}, 2),
+    ("country in ['NL', 'BE'] and age >= 18", {"country": "NL", "age": 20}, True),
+    ("max(a, b) - min(a, b)", {"a": 3, "b": 8}, 5),
+])
+def test_evaluates(source, values, expected):
+    assert Expression(source).evaluate(values) == expected
+
+
+@pytest.mark.parametrize("source, values", [
+    # Strings and lists would grow without bound
+    ("name * 1000000", {"name": "x"}),
+    ("tags * 1000000", {"tags": ["x"]}),
+    # printf-style formatting can build huge strings
+    ("'%0400000000d' % 1", {}),
+    ("fmt % value", {"fmt": "%s", "value": 1}),
+    # Far-away digits compute huge powers of ten
+    (f"round(5, -{MAX_ROUND_DIGITS + 1})", {}),
+    (f"round(5, {10 ** 9})", {}),
+    ("round(5, 1.5)", {}),
+    ("price / 0", {"price": 1}),
+    ("price * 2", {}),
+])
+def test_unsafe_or_failing_operations_evaluate_to_none(source, values):
+    assert Expression(source).evaluate(values) is None
+
+
+def test_round_within_limit():
+    assert Expression(f"round(123.456, -{MAX_ROUND_DIGITS})").evaluate({}) == 0.0
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os')",
+    "price.__class__",
+    "[x for x in tags]",
+    "lambda: 1",
+    "open('f')",
+    "price ** 1000",
+    "f'{price}'",
+    "x" * (MAX_EXPRESSION_LENGTH + 1),
+    " + ".join(["a"] * 60),
+])
+def test_rejects_unsupported_syntax(source):
+    with pytest.raises(ValueError):
+        Expression(source)
+
+
+def test_orders_dependencies_first_in_schema_order():
+    graph = FieldGraph(
+        ["total", "price", "quantity", "note"],
+        {"total": {"compute": Expression("price * quantity")}}
+    )
+    assert graph.order == ("price", "quantity", "note", "total")
+    assert graph.downstream({"price"}) == {"price", "total"}
+    assert graph.upstream({"total"}) == {"total", "price", "quantity"}
+
+
+def test_rejects_cycles():
+    with pytest.raises(ValueError, match="cycle between: \\['a', 'b'\\]"):
+        FieldGraph(
+            ["a", "b", "c"],
+            {"a": {"compute": Expression("b + 1")}, "b": {"visibleWhen": Expression("a > 1")}}
+        )
+
+
+def test_rejects_self_reference():
+    with pytest.raises(ValueError, match="cycle"):
+        FieldGraph(["a"], {"a": {"requiredWhen": Expression("a == 1")}})
+
+
+def test_rejects_unknown_references():
+    with pytest.raises(ValueError, match="unknown fields: \\['missing'\\]"):
+        FieldGraph(["a"], {"a": {"compute": Expression("missing + 1")}})
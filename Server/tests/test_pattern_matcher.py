@@ -0,0 +1,99 @@
+import queue
+import time
+
+import pytest
+
+from models.validators import patternMatcher
+from models.validators.patternMatcher import CompiledPattern, PatternTimeout, find_unsafe_construct
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^\d{3}-\d{4}$",
+    r"^[A-Za-z ]+$",
+    r"^(\d{1,3}\.){3}\d{1,3}$",
+    r"^[\w.+-]+@[\w-]+\.[\w.]+$",
+    r"^(cat|dog){2}$",
+    r"^(?:ab)?c*$",
+    r"^(.*)$",
+    r"^\w+\s\w+$",
+    r"^[a-z]+[0-9]+$",
+    r"^(https?://)?[\w.-]+(/\S*)?$",
+])
+def test_safe_patterns(pattern):
+    assert find_unsafe_construct(pattern) is None
+
+
+@pytest.mark.parametrize("pattern, construct", [
+    (r"^(a+)+$", "nested quantifiers"),
+    (r"^(.*a)*$", "nested quantifiers"),
+    (r"^(.*a){12}$", "nested quantifiers"),
+    (r"^(\w+\s?){2,5}$", "nested quantifiers"),
+    (r"^(?:x(?:a|b)+){3}$", "nested quantifiers"),
+    (r"^(a|a)*$", "ambiguous alternation under a quantifier"),
+    (r"^(a|ab){30}$", "ambiguous alternation under a quantifier"),
+    (r"^(a)\1$", "backreference"),
+    (r"^\w*\w*\w*\w*x$", "overlapping adjacent quantifiers"),
+    (r"^.*a.*$", "overlapping adjacent quantifiers"),
+    (r"^\d+\.?\d*$", "overlapping adjacent quantifiers"),
+    (r"^\w+(\w*)?$", "overlapping adjacent quantifiers"),
+])
+def test_unsafe_patterns(pattern, construct):
+    assert find_unsafe_construct(pattern) == construct
+
+
+def test_single_repeat_of_unbounded_body_is_safe():
+    # {0,1} and ? run the body at most once, so they cannot multiply backtracking
+    assert find_unsafe_construct(r"^(.*a)?$") is None
+    assert find_unsafe_construct(r"^(a+){1}$") is None
+
+
+@pytest.fixture
+def budgeted(monkeypatch):
+    """Force unsafe patterns onto the budgeted engine even where re2 is installed"""
+    monkeypatch.setattr(patternMatcher, "re2", None)
+    monkeypatch.setattr(patternMatcher, "PATTERN_REJECT_UNSAFE", False)
+
+
+def test_safe_pattern_runs_inline():
+    compiled = CompiledPattern(r"^\d{3}-\d{4}$")
+    assert compiled.engine == "re"
+    assert compiled.match("555-1234")
+    assert not compiled.match("5551234")
+
+
+def test_unsafe_pattern_rejected_when_configured(monkeypatch):
+    monkeypatch.setattr(patternMatcher, "re2", None)
+    monkeypatch.setattr(patternMatcher, "PATTERN_REJECT_UNSAFE", True)
+    with pytest.raises(ValueError, match="nested quantifiers"):
+        CompiledPattern(r"^(a+)+$")
+
+
+def test_budgeted_pattern_matches_in_worker(budgeted):
+    compiled = CompiledPattern(r"^\w*\w*\w*\w*x$")
+    assert compiled.engine == "budgeted"
+    assert compiled.match("abcx")
+    assert not compiled.match("abc!")
+    assert compiled.get_metrics()["timeouts"] == 0
+
+
+def test_budgeted_pattern_stops_at_budget(budgeted):
+    patternMatcher.warm_up_budgeted_pool()
+    compiled = CompiledPattern(r"^\w*\w*\w*\w*x$")
+    started = time.monotonic()
+    assert not compiled.match("a" * 400)
+    assert time.monotonic() - started < 1
+    assert compiled.get_metrics()["timeouts"] == 1
+    # The overrunning worker is replaced, so later checks still run
+    deadline = time.monotonic() + 30
+    while not compiled.match("ax"):
+        assert time.monotonic() < deadline
+
+
+def test_budgeted_check_fails_without_free_worker(budgeted, monkeypatch):
+    monkeypatch.setattr(patternMatcher._budgeted_pool, "_get_idle", queue.Queue)
+    monkeypatch.setattr(patternMatcher, "PATTERN_QUEUE_TIMEOUT_MS", 10)
+    with pytest.raises(PatternTimeout, match="No pattern worker became free"):
+        patternMatcher._budgeted_pool.match(r"^(a+)+$", "a")
+    compiled = CompiledPattern(r"^(a+)+$")
+    assert not compiled.match("a")
+    assert compiled.get_metrics()["timeouts"] == 1